@@ -0,0 +1,111 @@
+from superagi.helper.encyption_helper import decrypt_data
+from superagi.helper.token_counter import TokenCounter
+from superagi.lib.logger import logger
+from superagi.models.agent import Agent
+from superagi.models.agent_execution_config import AgentExecutionConfiguration
+from superagi.models.models import Models
+from superagi.models.models_config import ModelsConfig
+from superagi.models.organisation import Organisation
+from superagi.models.project import Project
+
+
+class AgentExecutionContext:
+    """
+    Execution scoped data shared by the step handlers, message builder, tool builder and tools of an agent step.
+
+    Attributes:
+        agent (Agent): The agent being executed.
+        organisation (Organisation): The organisation of the agent.
+        agent_config (dict): Parsed agent configuration.
+        agent_execution_config (dict): Parsed agent execution configuration.
+        model (Models): The model row of the configured agent model.
+        model_provider (str): The provider of the configured agent model.
+        model_api_key (str): The decrypted API key of the model provider.
+    """
+
+    def __init__(self, agent, organisation, agent_config: dict, agent_execution_config: dict, agent_execution_id: int,
+                 model=None, model_provider: str = None, model_api_key: str = None, model_token_limits: dict = None):
+        self.agent = agent
+        self.organisation = organisation
+        self.agent_config = agent_config
+        self.agent_execution_config = agent_execution_config
+        self.agent_execution_id = agent_execution_id
+        self.model = model
+        self.model_provider = model_provider
+        self.model_api_key = model_api_key
+        self.model_token_limits = model_token_limits or {}
+
+    @classmethod
+    def load(cls, session, agent_id: int, agent_execution_id: int):
+        """
+        Load the context of an agent execution.
+
+        Args:
+            session: The database session.
+            agent_id (int): The ID of the agent.
+            agent_execution_id (int): The ID of the agent execution.
+
+        Returns:
+            AgentExecutionContext: The loaded context. Model fields are None if the model is not configured.
+        """
+        agent = session.query(Agent).filter(Agent.id == agent_id).first()
+        organisation = session.query(Organisation).join(Project, Project.organisation_id == Organisation.id) \
+            .filter(Project.id == agent.project_id).first()
+        agent_config = Agent.fetch_configuration(session, agent_id)
+        agent_execution_config = AgentExecutionConfiguration.fetch_configuration(session, agent_execution_id)
+        model_token_limits = dict(session.query(Models.model_name, Models.token_limit)
+                                  .filter(Models.org_id == organisation.id).all())
+
+        context = cls(agent=agent, organisation=organisation, agent_config=agent_config,
+                      agent_execution_config=agent_execution_config, agent_execution_id=agent_execution_id,
+                      model_token_limits=model_token_limits)
+        context._load_model(session)
+        return context
+
+    def _load_model(self, session):
+        model = session.query(Models).filter(Models.org_id == self.organisation.id,
+                                             Models.model_name == self.agent_config["model"]).first()
+        if model is None:
+            return
+        config = session.query(ModelsConfig.provider, ModelsConfig.api_key) \
+            .filter(ModelsConfig.org_id == self.organisation.id, ModelsConfig.id == model.model_provider_id).first()
+        if config is None:
+            return
+        self.model = model
+        self.model_provider = config.provider
+        self.model_api_key = config.api_key if config.provider == 'Local LLM' else decrypt_data(config.api_key)
+
+    def token_limit(self, model: str = "gpt-3.5-turbo-0301") -> int:
+        """
+        Return the token limit for a given model of the organisation.
+
+        Args:
+            model (str): The model to return the token limit for.
+
+        Returns:
+            int: The token limit.
+        """
+        if model not in self.model_token_limits:
+            logger.warning("Warning: model not found. Using cl100k_base encoding.")
+            return 8092
+        return self.model_token_limits[model]
+
+    @staticmethod
+    def model_token_limit(context, session, agent_id: int, model: str) -> int:
+        """
+        Return the token limit of a model for a tool, from the execution context when the tool is run in an agent
+        step, otherwise from the models of the agent organisation.
+
+        Args:
+            context (AgentExecutionContext): The execution context of the tool, None outside of an agent step.
+            session: The database session.
+            agent_id (int): The ID of the agent running the tool.
+            model (str): The model to return the token limit for.
+
+        Returns:
+            int: The token limit.
+        """
+        if context is not None:
+            return context.token_limit(model)
+        organisation = Agent.find_org_by_agent_id(session=session, agent_id=agent_id)
+        return TokenCounter(session=session, organisation_id=organisation.id).token_limit(model)
@@ -0,0 +1,186 @@
+import json
+from typing import List
+
+from superagi.helper.redis_helper import get_redis_client
+from superagi.helper.token_counter import FeedTokenCounter
+from superagi.lib.logger import logger
+from superagi.models.agent_execution import AgentExecution
+from superagi.models.agent_execution_config import AgentExecutionConfiguration
+from superagi.models.agent_execution_feed import AgentExecutionFeed
+
+HISTORY_WINDOW_TTL = 2 * 24 * 60 * 60
+# The default feed group starts with the prompt feeds, which are not part of the history
+DEFAULT_FEED_GROUP_PROMPT_FEEDS = 2
+
+
+class AgentHistoryWindow:
+    """
+    Conversation history of an agent execution that is kept within the prompt token budget across steps.
+
+    Every step only appends the feeds written since the previous step. Messages that no longer fit the budget are
+    evicted from the head and summarised in the background into the long term memory summary. The window is cached
+    in Redis between steps and rebuilt from the feeds when the cache is missing or the feed group changes.
+
+    Attributes:
+        agent_execution_id (int): The ID of the agent execution.
+        feed_group_id (str): The feed group the window was built from.
+        model (str): The model used to count the tokens of the messages.
+        messages (list): The messages in the window with 'role', 'content', 'chat_id' and 'tokens'.
+        feed_count (int): The number of history feeds seen, including the evicted ones.
+        row_count (int): The number of feed rows seen, including the prompt feeds of the default group.
+        last_feed_id (int): The ID of the last feed appended to the window.
+        first_feed_id (int): The ID of the first history feed of the feed group.
+        pending_summary_messages (list): Evicted messages that are not covered by a stored summary yet.
+        ltm_summary (str): The last completed long term memory summary of the evicted messages.
+    """
+
+    def __init__(self, agent_execution_id: int, feed_group_id: str, model: str, messages: list = None,
+                 feed_count: int = 0, row_count: int = 0, last_feed_id: int = 0, first_feed_id: int = None,
+                 pending_summary_messages: list = None):
+        self.agent_execution_id = agent_execution_id
+        self.feed_group_id = feed_group_id
+        self.model = model
+        self.messages = messages or []
+        self.feed_count = feed_count
+        self.row_count = row_count
+        self.last_feed_id = last_feed_id
+        self.first_feed_id = first_feed_id
+        self.pending_summary_messages = pending_summary_messages or []
+        self.ltm_summary = None
+
+    @staticmethod
+    def _cache_key(agent_execution_id: int):
+        return f"agent_execution_{agent_execution_id}_history_window"
+
+    @classmethod
+    def load(cls, session, agent_execution_id: int, model: str):
+        """
+        Load the history window of an agent execution and append the feeds written since it was last saved.
+
+        Args:
+            session: The database session.
+            agent_execution_id (int): The ID of the agent execution.
+            model (str): The model used to count the tokens of the messages.
+
+        Returns:
+            AgentHistoryWindow: The up to date history window.
+        """
+        execution = AgentExecution.find_by_id(session, agent_execution_id)
+        window = cls._load_cached(agent_execution_id)
+        if window is None or window.feed_group_id != execution.current_feed_group_id or window.model != model:
+            window = cls._build(session, agent_execution_id, execution.current_feed_group_id, model)
+        else:
+            window._append_new_feeds(session)
+        window.refresh_ltm_summary(session)
+        return window
+
+    @classmethod
+    def _load_cached(cls, agent_execution_id: int):
+        try:
+            state = get_redis_client().get(cls._cache_key(agent_execution_id))
+        except Exception as e:
+            logger.error(f"Unable to read history window: {e}")
+            return None
+        if state is None:
+            return None
+        return cls(agent_execution_id=agent_execution_id, **json.loads(state))
+
+    @classmethod
+    def _build(cls, session, agent_execution_id: int, feed_group_id: str, model: str):
+        window = cls(agent_execution_id=agent_execution_id, feed_group_id=feed_group_id, model=model)
+        window._append_new_feeds(session)
+        # Feeds up to the last summarised one are already covered by the ltm summary
+        last_summary_feed = AgentExecutionConfiguration.fetch_value(session, agent_execution_id,
+                                                                    "last_agent_feed_ltm_summary_id")
+        if last_summary_feed is not None and last_summary_feed.value:
+            last_summary_feed_id = int(last_summary_feed.value)
+            window.messages = [message for message in window.messages if message["chat_id"] > last_summary_feed_id]
+        return window
+
+    def refresh_ltm_summary(self, session):
+        """
+        Pick up the last completed ltm summary, which is written in the background once evicted messages have
+        been summarised, and drop the pending messages it covers. Summaries of an earlier feed group are ignored.
+
+        Args:
+            session: The database session.
+        """
+        configs = dict(session.query(AgentExecutionConfiguration.key, AgentExecutionConfiguration.value)
+                       .filter(AgentExecutionConfiguration.agent_execution_id == self.agent_execution_id,
+                               AgentExecutionConfiguration.key.in_(["ltm_summary",
+                                                                    "last_agent_feed_ltm_summary_id"]))
+                       .all())
+        last_summary_feed_id = configs.get("last_agent_feed_ltm_summary_id")
+        if self.first_feed_id is None or not last_summary_feed_id or int(last_summary_feed_id) < self.first_feed_id:
+            self.ltm_summary = None
+            return
+        self.ltm_summary = configs.get("ltm_summary")
+        self.pending_summary_messages = [message for message in self.pending_summary_messages
+                                         if message["chat_id"] > int(last_summary_feed_id)]
+
+    def _append_new_feeds(self, session):
+        feeds = AgentExecutionFeed.fetch_feeds_after(session, self.agent_execution_id, self.feed_group_id,
+                                                     self.last_feed_id)
+        if not feeds:
+            return
+        self.last_feed_id = max(feed.id for feed in feeds)
+        prompt_feeds = 0
+        if self.feed_group_id == "DEFAULT":
+            prompt_feeds = max(0, DEFAULT_FEED_GROUP_PROMPT_FEEDS - self.row_count)
+        self.row_count += len(feeds)
+        new_messages = [{'role': feed.role, 'content': feed.feed, 'chat_id': feed.id} for feed in feeds[prompt_feeds:]]
+        token_counts = FeedTokenCounter(self.agent_execution_id, self.model).count_feed_tokens(new_messages)
+        for message, tokens in zip(new_messages, token_counts):
+            message['tokens'] = tokens
+        if new_messages and self.first_feed_id is None:
+            self.first_feed_id = new_messages[0]['chat_id']
+        self.messages.extend(new_messages)
+        self.feed_count += len(new_messages)
+
+    def has_feeds(self) -> bool:
+        """Whether any history feed has been written for the current feed group."""
+        return self.feed_count > 0
+
+    def token_count(self) -> int:
+        return sum(message['tokens'] for message in self.messages)
+
+    def evict(self, token_limit: int, low_watermark: float = 1.0) -> List[dict]:
+        """
+        Evict messages from the head of the window once it exceeds the token limit.
+
+        Args:
+            token_limit (int): The token budget of the history.
+            low_watermark (float): Once over the limit, messages are evicted until the window fits in this fraction
+                of the limit, so summaries are triggered in batches rather than on every step.
+
+        Returns:
+            List[dict]: The evicted messages, oldest first.
+        """
+        window_tokens = self.token_count()
+        if window_tokens <= token_limit:
+            return []
+        evicted_count = 0
+        while evicted_count < len(self.messages) and window_tokens > token_limit * low_watermark:
+            window_tokens -= self.messages[evicted_count]['tokens']
+            evicted_count += 1
+        evicted = self.messages[:evicted_count]
+        self.messages = self.messages[evicted_count:]
+        return evicted
+
+    def save(self):
+        """Cache the window in Redis for the next step."""
+        state = {
+            "feed_group_id": self.feed_group_id,
+            "model": self.model,
+            "messages": self.messages,
+            "feed_count": self.feed_count,
+            "row_count": self.row_count,
+            "last_feed_id": self.last_feed_id,
+            "first_feed_id": self.first_feed_id,
+            "pending_summary_messages": self.pending_summary_messages,
+        }
+        try:
+            get_redis_client().set(self._cache_key(self.agent_execution_id), json.dumps(state),
+                                   ex=HISTORY_WINDOW_TTL)
+        except Exception as e:
+            logger.error(f"Unable to store history window: {e}")
@@ -4,26 +4,25 @@ from sqlalchemy import asc
 from sqlalchemy.sql.operators import and_
 import logging
 import superagi
+from superagi.agent.agent_execution_context import AgentExecutionContext
+from superagi.agent.agent_history_window import AgentHistoryWindow
 from superagi.agent.agent_message_builder import AgentLlmMessageBuilder
 from superagi.agent.agent_prompt_builder import AgentPromptBuilder
 from superagi.agent.output_handler import ToolOutputHandler, get_output_handler
 from superagi.agent.task_queue import TaskQueue
 from superagi.agent.tool_builder import ToolBuilder
+from superagi.agent.workflow_graph import WorkflowGraph
 from superagi.apm.event_handler import EventHandler
 from superagi.config.config import get_config
 from superagi.helper.error_handler import ErrorHandler
 from superagi.helper.token_counter import TokenCounter
 from superagi.lib.logger import logger
-from superagi.models.agent import Agent
-from superagi.models.agent_config import AgentConfiguration
 from superagi.models.agent_execution import AgentExecution
-from superagi.models.agent_execution_config import AgentExecutionConfiguration
 from superagi.models.agent_execution_feed import AgentExecutionFeed
 from superagi.models.agent_execution_permission import AgentExecutionPermission
 from superagi.models.organisation import Organisation
 from superagi.models.tool import Tool
 from superagi.models.workflows.agent_workflow import AgentWorkflow
-from superagi.models.workflows.agent_workflow_step import AgentWorkflowStep
 from superagi.models.workflows.iteration_workflow import IterationWorkflow
 from superagi.models.workflows.iteration_workflow_step import IterationWorkflowStep
 from superagi.resource_manager.resource_summary import ResourceSummarizer
@@ -34,29 +33,32 @@ from superagi.apm.call_log_helper import CallLogHelper
 
 class AgentIterationStepHandler:
     """ Handles iteration workflow steps in the agent workflow."""
-    def __init__(self, session, llm, agent_id: int, agent_execution_id: int, memory=None):
+    def __init__(self, session, llm, agent_id: int, agent_execution_id: int, memory=None,
+                 context: AgentExecutionContext = None):
         self.session = session
         self.llm = llm
         self.agent_execution_id = agent_execution_id
         self.agent_id = agent_id
         self.memory = memory
-        self.organisation = Agent.find_org_by_agent_id(self.session, agent_id=self.agent_id)
+        self.context = context or AgentExecutionContext.load(self.session, self.agent_id, self.agent_execution_id)
+        self.organisation = self.context.organisation
         self.task_queue = TaskQueue(str(self.agent_execution_id))
 
     def execute_step(self):
-        agent_config = Agent.fetch_configuration(self.session, self.agent_id)
+        agent_config = self.context.agent_config
         execution = AgentExecution.get_agent_execution_from_id(self.session, self.agent_execution_id)
-        iteration_workflow_step = IterationWorkflowStep.find_by_id(self.session, execution.iteration_workflow_step_id)
-        agent_execution_config = AgentExecutionConfiguration.fetch_configuration(self.session, self.agent_execution_id)
+        iteration_workflow_step = WorkflowGraph.get_iteration_step(self.session, execution.iteration_workflow_step_id)
+        agent_execution_config = self.context.agent_execution_config
         if not self._handle_wait_for_permission(execution, agent_config, agent_execution_config,
                                                 iteration_workflow_step):
             return
 
-        workflow_step = AgentWorkflowStep.find_by_id(self.session, execution.current_agent_step_id)
-        organisation = Agent.find_org_by_agent_id(self.session, agent_id=self.agent_id)
-        iteration_workflow = IterationWorkflow.find_by_id(self.session, workflow_step.action_reference_id)
-        agent_feeds = AgentExecutionFeed.fetch_agent_execution_feeds(self.session, self.agent_execution_id)
-        if not agent_feeds:
+        workflow_step = WorkflowGraph.get_step(self.session, execution.current_agent_step_id)
+        organisation = self.organisation
+        iteration_workflow = WorkflowGraph.get_iteration_workflow(self.session,
+                                                                  workflow_step.action_reference_id).workflow
+        history_window = AgentHistoryWindow.load(self.session, self.agent_execution_id, self.llm.get_model())
+        if not history_window.has_feeds():
             self.task_queue.clear_tasks()
 
         agent_tools = self._build_tools(agent_config, agent_execution_config)
@@ -65,14 +67,18 @@ class AgentIterationStepHandler:
                                           agent_execution_config=agent_execution_config,
                                           prompt=iteration_workflow_step.prompt,
                                           agent_tools=agent_tools)
+        max_tool_calls = int(get_config("MAX_PARALLEL_TOOL_CALLS", 1))
+        if iteration_workflow_step.output_type == "tools" and max_tool_calls > 1:
+            prompt = AgentPromptBuilder.add_multi_tool_calls_instruction(prompt, max_tool_calls)
 
-        messages = AgentLlmMessageBuilder(self.session, self.llm, self.llm.get_model(), self.agent_id, self.agent_execution_id) \
-            .build_agent_messages(prompt, agent_feeds, history_enabled=iteration_workflow_step.history_enabled,
+        messages = AgentLlmMessageBuilder(self.session, self.llm, self.llm.get_model(), self.agent_id, self.agent_execution_id,
+                                          context=self.context) \
+            .build_agent_messages(prompt, history_window, history_enabled=iteration_workflow_step.history_enabled,
                                   completion_prompt=iteration_workflow_step.completion_prompt)
 
         logger.debug("Prompt messages:", messages)
         current_tokens = TokenCounter.count_message_tokens(messages = messages, model = self.llm.get_model())
-        response = self.llm.chat_completion(messages, TokenCounter(session=self.session, organisation_id=organisation.id).token_limit(self.llm.get_model()) - current_tokens)
+        response = self.llm.chat_completion(messages, self.context.token_limit(self.llm.get_model()) - current_tokens)
 
         if 'error' in response and response['message'] is not None:
             ErrorHandler.handle_openai_errors(self.session, self.agent_id, self.agent_execution_id, response['message'])
@@ -86,6 +92,8 @@ class AgentIterationStepHandler:
             content = json.loads(response['content'])
             tool = content.get('tool', {})
             tool_name = tool.get('name', '') if tool else ''
+            if content.get('tools'):
+                tool_name = ", ".join(tool.get('name', '') for tool in content['tools'])
         except json.JSONDecodeError:
             print("Decoding JSON has failed")
             tool_name = ''
@@ -122,7 +130,7 @@ class AgentIterationStepHandler:
 
     def _update_agent_execution_next_step(self, execution, next_step_id, step_response: str = "default"):
         if next_step_id == -1:
-            next_step = AgentWorkflowStep.fetch_next_step(self.session, execution.current_agent_step_id, step_response)
+            next_step = WorkflowGraph.fetch_next_step(self.session, execution.current_agent_step_id, step_response)
             if str(next_step) == "COMPLETE":
                 execution.current_agent_step_id = -1
                 execution.status = "COMPLETED"
@@ -141,21 +149,22 @@ class AgentIterationStepHandler:
                                                            agent_config["constraints"], agent_tools,
                                                            (not iteration_workflow.has_task_queue))
         if iteration_workflow.has_task_queue:
-            response = self.task_queue.get_last_task_details()
+            pending_tasks = self.task_queue.get_tasks()
+            completed_tasks = self.task_queue.get_completed_tasks(
+                limit=int(get_config("MAX_COMPLETED_TASKS_IN_PROMPT", 50)))
+            response = completed_tasks[0] if completed_tasks else None
             last_task, last_task_result = (response["task"], response["response"]) if response is not None else ("", "")
-            current_task = self.task_queue.get_first_task() or ""
-            token_limit = TokenCounter(session=self.session, organisation_id=self.organisation.id).token_limit() - max_token_limit
+            current_task = pending_tasks[0] if pending_tasks else ""
+            token_limit = self.context.token_limit() - max_token_limit
             prompt = AgentPromptBuilder.replace_task_based_variables(prompt, current_task, last_task, last_task_result,
-                                                                     self.task_queue.get_tasks(),
-                                                                     self.task_queue.get_completed_tasks(), token_limit)
+                                                                     pending_tasks, completed_tasks, token_limit)
         return prompt
 
     def _build_tools(self, agent_config: dict, agent_execution_config: dict):
         agent_tools = [ThinkingTool()]
 
-        config_data = AgentConfiguration.get_model_api_key(self.session, self.agent_id, agent_config["model"])
-        model_api_key = config_data['api_key']
-        tool_builder = ToolBuilder(self.session, self.agent_id, self.agent_execution_id)
+        model_api_key = self.context.model_api_key
+        tool_builder = ToolBuilder(self.session, self.agent_id, self.agent_execution_id, context=self.context)
         resource_summary = ResourceSummarizer(session=self.session, agent_id=self.agent_id, model=agent_config['model']).fetch_or_create_agent_resource_summary(default_summary=agent_config.get("resource_summary"))
         if resource_summary is not None:
             agent_tools.append(QueryResourceTool())
@@ -1,76 +1,79 @@
 import time
-from typing import Tuple, List
-from sqlalchemy import asc
+from typing import List
 
+from superagi.agent.agent_execution_context import AgentExecutionContext
+from superagi.agent.agent_history_window import AgentHistoryWindow
 from superagi.config.config import get_config
 from superagi.helper.error_handler import ErrorHandler
 from superagi.helper.prompt_reader import PromptReader
+from superagi.helper.redis_helper import get_redis_client
 from superagi.helper.token_counter import TokenCounter
+from superagi.lib.logger import logger
 from superagi.models.agent_execution import AgentExecution
 from superagi.models.agent_execution_feed import AgentExecutionFeed
 from superagi.types.common import BaseMessage
 from superagi.models.agent_execution_config import AgentExecutionConfiguration
-from superagi.models.agent import Agent
+from superagi.worker import summarize_agent_history
+
+# Upper bound of a background summary, the lock is released earlier once the summary is stored
+LTM_SUMMARY_LOCK_TTL = 10 * 60
 
 
 class AgentLlmMessageBuilder:
     """Agent message builder for LLM agent."""
-    def __init__(self, session, llm, llm_model: str, agent_id: int, agent_execution_id: int):
+    def __init__(self, session, llm, llm_model: str, agent_id: int, agent_execution_id: int,
+                 context: AgentExecutionContext = None):
         self.session = session
         self.llm = llm
         self.llm_model = llm_model
         self.agent_id = agent_id
         self.agent_execution_id = agent_execution_id
-        self.organisation = Agent.find_org_by_agent_id(self.session, self.agent_id)
+        self.context = context or AgentExecutionContext.load(self.session, self.agent_id, self.agent_execution_id)
+        self.organisation = self.context.organisation
 
-    def build_agent_messages(self, prompt: str, agent_feeds: list, history_enabled=False,
+    def build_agent_messages(self, prompt: str, history_window: AgentHistoryWindow, history_enabled=False,
                              completion_prompt: str = None):
         """ Build agent messages for LLM agent.
 
         Args:
             prompt (str): The prompt to be used for generating the agent messages.
-            agent_feeds (list): The list of agent feeds.
+            history_window (AgentHistoryWindow): The history window of the agent execution.
             history_enabled (bool): Whether to use history or not.
             completion_prompt (str): The completion prompt to be used for generating the agent messages.
         """
-        token_limit = TokenCounter(session=self.session, organisation_id=self.organisation.id).token_limit(self.llm_model)
+        token_limit = self.context.token_limit(self.llm_model)
         max_output_token_limit = int(get_config("MAX_TOOL_TOKEN_LIMIT", 800))
         messages = [{"role": "system", "content": prompt}]
-        if history_enabled:
+        if not history_enabled:
+            # The window is kept within the budget, the evicted messages are summarised by the next step with history
+            base_token_limit = TokenCounter.count_message_tokens(messages, self.llm_model)
+            history_window.pending_summary_messages.extend(
+                history_window.evict(((token_limit - base_token_limit - max_output_token_limit) // 4) * 3))
+        else:
             messages.append({"role": "system", "content": f"The current time and date is {time.strftime('%c')}"})
             base_token_limit = TokenCounter.count_message_tokens(messages, self.llm_model)
-            full_message_history = [{'role': agent_feed.role, 'content': agent_feed.feed, 'chat_id': agent_feed.id}
-                                                for agent_feed in agent_feeds]
-            past_messages, current_messages = self._split_history(full_message_history,
-                                                              ((token_limit - base_token_limit - max_output_token_limit) // 4) * 3)
-            if past_messages:
-                ltm_summary = self._build_ltm_summary(past_messages=past_messages,
-                                                                   output_token_limit=(token_limit - base_token_limit - max_output_token_limit) // 4)
-                messages.append({"role": "assistant", "content": ltm_summary})
-
-            for history in current_messages:
+            evicted_messages = history_window.evict(
+                ((token_limit - base_token_limit - max_output_token_limit) // 4) * 3,
+                low_watermark=float(get_config("HISTORY_WINDOW_LOW_WATERMARK", 0.8)))
+            history_window.pending_summary_messages.extend(evicted_messages)
+            if history_window.pending_summary_messages:
+                self._schedule_ltm_summary(history_window,
+                                           (token_limit - base_token_limit - max_output_token_limit) // 4)
+            # Until the background summary completes, the last completed summary is used
+            if history_window.ltm_summary:
+                messages.append({"role": "assistant", "content": history_window.ltm_summary})
+
+            for history in history_window.messages:
                 messages.append({"role": history["role"], "content": history["content"]})
             messages.append({"role": "user", "content": completion_prompt})
+        history_window.save()
 
         # insert initial agent feeds
-        self._add_initial_feeds(agent_feeds, messages)
+        self._add_initial_feeds(history_window, messages)
         return messages
 
-    def _split_history(self, history: List, pending_token_limit: int) -> Tuple[List[BaseMessage], List[BaseMessage]]:
-        hist_token_count = 0
-        i = len(history)
-        for message in reversed(history):
-            token_count = TokenCounter.count_message_tokens([{"role": message["role"], "content": message["content"]}],
-                                                            self.llm_model)
-            hist_token_count += token_count
-            if hist_token_count > pending_token_limit:
-                self._add_or_update_last_agent_feed_ltm_summary_id(str(history[i-1]['chat_id']))
-                return history[:i], history[i:]
-            i -= 1
-        return [], history
-
-    def _add_initial_feeds(self, agent_feeds: list, messages: list):
-        if agent_feeds:
+    def _add_initial_feeds(self, history_window: AgentHistoryWindow, messages: list):
+        if history_window.has_feeds():
             return
         for message in messages:
             agent_execution_feed = AgentExecutionFeed(agent_execution_id=self.agent_execution_id,
@@ -81,43 +84,69 @@ class AgentLlmMessageBuilder:
             self.session.add(agent_execution_feed)
             self.session.commit()
 
-    def _add_or_update_last_agent_feed_ltm_summary_id(self, last_agent_feed_ltm_summary_id):
-        execution = AgentExecution(id=self.agent_execution_id)
-        agent_execution_configs = {"last_agent_feed_ltm_summary_id": last_agent_feed_ltm_summary_id}
-        AgentExecutionConfiguration.add_or_update_agent_execution_config(self.session, execution,
-                                                                         agent_execution_configs)
+    def _schedule_ltm_summary(self, history_window: AgentHistoryWindow, output_token_limit: int):
+        """
+        Hand the pending evicted messages to a background summary. Only one summary runs per agent execution at a
+        time, messages evicted meanwhile stay pending until a later step. The messages stay pending in the window
+        until the summary covering them is stored, so a summary that fails is scheduled again with them once its
+        lock is released.
 
+        Args:
+            history_window (AgentHistoryWindow): The history window of the agent execution.
+            output_token_limit (int): The token limit of the summary.
+        """
+        try:
+            acquired = get_redis_client().set(self._ltm_summary_lock_key(self.agent_execution_id), 1, nx=True,
+                                              ex=LTM_SUMMARY_LOCK_TTL)
+        except Exception as e:
+            logger.error(f"Unable to lock the ltm summary, summarizing in the step: {e}")
+            history_window.ltm_summary = self.build_ltm_summary(history_window.pending_summary_messages,
+                                                                output_token_limit, history_window.ltm_summary)
+            history_window.pending_summary_messages = []
+            return
+        if not acquired:
+            return
+
+        try:
+            summarize_agent_history.delay(self.agent_execution_id, history_window.pending_summary_messages,
+                                          output_token_limit, history_window.ltm_summary)
+        except Exception as e:
+            logger.error(f"Unable to schedule the ltm summary: {e}")
+            self.release_ltm_summary_lock(self.agent_execution_id)
 
-    def _build_ltm_summary(self, past_messages, output_token_limit) -> str:
-        ltm_prompt = self._build_prompt_for_ltm_summary(past_messages=past_messages,
-                                                        token_limit=output_token_limit)
+    @staticmethod
+    def _ltm_summary_lock_key(agent_execution_id: int):
+        return f"agent_execution_{agent_execution_id}_ltm_summary_lock"
 
-        summary = AgentExecutionConfiguration.fetch_value(self.session, self.agent_execution_id, "ltm_summary")
-        previous_ltm_summary = summary.value if summary is not None else ""
+    @classmethod
+    def release_ltm_summary_lock(cls, agent_execution_id: int):
+        get_redis_client().delete(cls._ltm_summary_lock_key(agent_execution_id))
+
+    def build_ltm_summary(self, past_messages, output_token_limit, previous_ltm_summary: str = None) -> str:
+        """
+        Summarize evicted messages into the long term memory summary and store it with the last summarised feed.
 
+        Args:
+            past_messages (list): The evicted messages, oldest first.
+            output_token_limit (int): The token limit of the summary.
+            previous_ltm_summary (str): The summary the messages are merged into.
+
+        Returns:
+            str: The new ltm summary.
+        """
+        ltm_prompt = self._build_ltm_summary_prompt(past_messages, output_token_limit, previous_ltm_summary)
+
+        # Leave out the oldest messages if the summary prompt does not fit the model
         ltm_summary_base_token_limit = 10
-        if ((TokenCounter.count_text_tokens(ltm_prompt) + ltm_summary_base_token_limit + output_token_limit)
-            - TokenCounter(session=self.session, organisation_id=self.organisation.id).token_limit(self.llm_model)) > 0:
-            last_agent_feed_ltm_summary_id = AgentExecutionConfiguration.fetch_value(self.session,
-                                                       self.agent_execution_id, "last_agent_feed_ltm_summary_id")
-            last_agent_feed_ltm_summary_id = (
-                int(last_agent_feed_ltm_summary_id.value)
-                if last_agent_feed_ltm_summary_id is not None and last_agent_feed_ltm_summary_id.value is not None
-                else 0
-            )
-            past_messages = self.session.query(AgentExecutionFeed.role, AgentExecutionFeed.feed,
-                                               AgentExecutionFeed.id) \
-                .filter(AgentExecutionFeed.agent_execution_id == self.agent_execution_id,
-                        AgentExecutionFeed.id > last_agent_feed_ltm_summary_id) \
-                .order_by(asc(AgentExecutionFeed.created_at)) \
-                .all()
-
-            past_messages = [
-                {'role': past_message.role, 'content': past_message.feed, 'chat_id': past_message.id}
-                for past_message in past_messages]
-
-            ltm_prompt = self._build_prompt_for_recursive_ltm_summary_using_previous_ltm_summary(
-                previous_ltm_summary=previous_ltm_summary, past_messages=past_messages, token_limit=output_token_limit)
+        excess_tokens = (TokenCounter.count_text_tokens(ltm_prompt) + ltm_summary_base_token_limit + output_token_limit
+                         - self.context.token_limit(self.llm_model))
+        if excess_tokens > 0:
+            dropped_messages, dropped_tokens = 0, 0
+            while dropped_messages < len(past_messages) - 1 and dropped_tokens < excess_tokens:
+                dropped_tokens += past_messages[dropped_messages]['tokens']
+                dropped_messages += 1
+            ltm_prompt = self._build_ltm_summary_prompt(past_messages[dropped_messages:], output_token_limit,
+                                                        previous_ltm_summary)
 
         msgs = [{"role": "system", "content": "You are GPT Prompt writer"},
                 {"role": "assistant", "content": ltm_prompt}]
@@ -127,35 +156,34 @@ class AgentLlmMessageBuilder:
             ErrorHandler.handle_openai_errors(self.session, self.agent_id, self.agent_execution_id, ltm_summary['message'])
 
         execution = AgentExecution(id=self.agent_execution_id)
-        agent_execution_configs = {"ltm_summary": ltm_summary["content"]}
+        agent_execution_configs = {"ltm_summary": ltm_summary["content"],
+                                   "last_agent_feed_ltm_summary_id": str(past_messages[-1]['chat_id'])}
         AgentExecutionConfiguration.add_or_update_agent_execution_config(session=self.session, execution=execution,
                                                                  agent_execution_configs=agent_execution_configs)
 
         return ltm_summary["content"]
 
-    def _build_prompt_for_ltm_summary(self, past_messages: List[BaseMessage], token_limit: int):
-        ltm_summary_prompt = PromptReader.read_agent_prompt(__file__, "agent_summary.txt")
+    def _build_ltm_summary_prompt(self, past_messages: List[BaseMessage], token_limit: int,
+                                  previous_ltm_summary: str = None):
+        if previous_ltm_summary:
+            return self._build_prompt_for_recursive_ltm_summary_using_previous_ltm_summary(
+                previous_ltm_summary=previous_ltm_summary, past_messages=past_messages, token_limit=token_limit)
+        return self._build_prompt_for_ltm_summary(past_messages=past_messages, token_limit=token_limit)
 
+    def _build_prompt_for_ltm_summary(self, past_messages: List[BaseMessage], token_limit: int):
         past_messages_prompt = ""
         for past_message in past_messages:
             past_messages_prompt += past_message["role"] + ": " + past_message["content"] + "\n"
-        ltm_summary_prompt = ltm_summary_prompt.replace("{past_messages}", past_messages_prompt)
-
-        ltm_summary_prompt = ltm_summary_prompt.replace("{char_limit}", str(token_limit*4))
 
-        return ltm_summary_prompt
+        return PromptReader.read_agent_template(__file__, "agent_summary.txt").render(
+            past_messages=past_messages_prompt, char_limit=token_limit*4)
 
     def _build_prompt_for_recursive_ltm_summary_using_previous_ltm_summary(self, previous_ltm_summary: str,
                                                                     past_messages: List[BaseMessage], token_limit: int):
-        ltm_summary_prompt = PromptReader.read_agent_prompt(__file__, "agent_recursive_summary.txt")
-
-        ltm_summary_prompt = ltm_summary_prompt.replace("{previous_ltm_summary}", previous_ltm_summary)
-
         past_messages_prompt = ""
         for past_message in past_messages:
             past_messages_prompt += past_message["role"] + ": " + past_message["content"] + "\n"
-        ltm_summary_prompt = ltm_summary_prompt.replace("{past_messages}", past_messages_prompt)
-
-        ltm_summary_prompt = ltm_summary_prompt.replace("{char_limit}", str(token_limit*4))
 
-        return ltm_summary_prompt
+        return PromptReader.read_agent_template(__file__, "agent_recursive_summary.txt").render(
+            previous_ltm_summary=previous_ltm_summary, past_messages=past_messages_prompt,
+            char_limit=token_limit*4)
@@ -3,6 +3,7 @@ import re
 
 from pydantic.types import List
 
+from superagi.helper.prompt_reader import PromptReader
 from superagi.helper.token_counter import TokenCounter
 from superagi.tools.base_tool import BaseTool
 
@@ -92,6 +93,17 @@ class AgentPromptBuilder:
         super_agi_prompt = super_agi_prompt.replace("{tools}", tools_string)
         return super_agi_prompt
 
+    @classmethod
+    def add_multi_tool_calls_instruction(cls, super_agi_prompt: str, max_tool_calls: int):
+        """Allow the agent to respond with multiple independent tool calls.
+
+        Args:
+            super_agi_prompt (str): The super agi prompt.
+            max_tool_calls (int): The maximum number of tool calls run in parallel.
+        """
+        instruction = PromptReader.read_agent_prompt(__file__, "multi_tool_calls.txt")
+        return super_agi_prompt + "\n\n" + instruction.replace("{max_tool_calls}", str(max_tool_calls))
+
     @classmethod
     def replace_task_based_variables(cls, super_agi_prompt: str, current_task: str, last_task: str,
                                      last_task_result: str, pending_tasks: List[str], completed_tasks: list, token_limit: int):
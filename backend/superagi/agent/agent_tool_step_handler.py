@@ -1,20 +1,20 @@
 import json
 
 from superagi.agent.task_queue import TaskQueue
+from superagi.agent.agent_execution_context import AgentExecutionContext
+from superagi.agent.agent_history_window import AgentHistoryWindow
 from superagi.agent.agent_message_builder import AgentLlmMessageBuilder
 from superagi.agent.agent_prompt_builder import AgentPromptBuilder
 from superagi.agent.output_handler import ToolOutputHandler
 from superagi.agent.output_parser import AgentSchemaToolOutputParser
 from superagi.agent.queue_step_handler import QueueStepHandler
 from superagi.agent.tool_builder import ToolBuilder
+from superagi.agent.workflow_graph import WorkflowGraph
 from superagi.helper.error_handler import ErrorHandler
 from superagi.helper.prompt_reader import PromptReader
 from superagi.helper.token_counter import TokenCounter
 from superagi.lib.logger import logger
-from superagi.models.agent import Agent
-from superagi.models.agent_config import AgentConfiguration
 from superagi.models.agent_execution import AgentExecution
-from superagi.models.agent_execution_config import AgentExecutionConfiguration
 from superagi.models.agent_execution_feed import AgentExecutionFeed
 from superagi.models.agent_execution_permission import AgentExecutionPermission
 from superagi.models.tool import Tool
@@ -27,29 +27,32 @@ from sqlalchemy import and_
 
 class AgentToolStepHandler:
     """Handles the tools steps in the agent workflow"""
-    def __init__(self, session, llm, agent_id: int, agent_execution_id: int, memory=None):
+    def __init__(self, session, llm, agent_id: int, agent_execution_id: int, memory=None,
+                 context: AgentExecutionContext = None):
         self.session = session
         self.llm = llm
         self.agent_execution_id = agent_execution_id
         self.agent_id = agent_id
         self.memory = memory
         self.task_queue = TaskQueue(str(self.agent_execution_id))
-        self.organisation = Agent.find_org_by_agent_id(self.session, self.agent_id)
+        self.context = context or AgentExecutionContext.load(self.session, self.agent_id, self.agent_execution_id)
+        self.organisation = self.context.organisation
 
     def execute_step(self):
         execution = AgentExecution.get_agent_execution_from_id(self.session, self.agent_execution_id)
-        workflow_step = AgentWorkflowStep.find_by_id(self.session, execution.current_agent_step_id)
-        step_tool = AgentWorkflowStepTool.find_by_id(self.session, workflow_step.action_reference_id)
-        agent_config = Agent.fetch_configuration(self.session, self.agent_id)
-        agent_execution_config = AgentExecutionConfiguration.fetch_configuration(self.session, self.agent_execution_id)
+        workflow_step = WorkflowGraph.get_step(self.session, execution.current_agent_step_id)
+        step_tool = WorkflowGraph.get_step_tool(self.session, workflow_step)
+        agent_config = self.context.agent_config
+        agent_execution_config = self.context.agent_execution_config
         # print(agent_execution_config)
 
         if not self._handle_wait_for_permission(execution, workflow_step):
             return
 
         if step_tool.tool_name == "TASK_QUEUE":
-            step_response = QueueStepHandler(self.session, self.llm, self.agent_id, self.agent_execution_id).execute_step()
-            next_step = AgentWorkflowStep.fetch_next_step(self.session, workflow_step.id, step_response)
+            step_response = QueueStepHandler(self.session, self.llm, self.agent_id, self.agent_execution_id,
+                                             context=self.context).execute_step()
+            next_step = WorkflowGraph.fetch_next_step(self.session, workflow_step.id, step_response)
             self._handle_next_step(next_step)
             return
 
@@ -67,7 +70,7 @@ class AgentToolStepHandler:
         if step_tool.output_instruction:
             step_response = self._process_output_instruction(final_response.result, step_tool, workflow_step)
 
-        next_step = AgentWorkflowStep.fetch_next_step(self.session, workflow_step.id, step_response)
+        next_step = WorkflowGraph.fetch_next_step(self.session, workflow_step.id, step_response)
         self._handle_next_step(next_step)
         self.session.flush()
 
@@ -99,13 +102,14 @@ class AgentToolStepHandler:
         tool_obj = self._build_tool_obj(agent_config, agent_execution_config, step_tool.tool_name)
         prompt = self._build_tool_input_prompt(step_tool, tool_obj, agent_execution_config)
         logger.info("Prompt: ", prompt)
-        agent_feeds = AgentExecutionFeed.fetch_agent_execution_feeds(self.session, self.agent_execution_id)
-        messages = AgentLlmMessageBuilder(self.session, self.llm, self.llm.get_model(), self.agent_id, self.agent_execution_id) \
-            .build_agent_messages(prompt, agent_feeds, history_enabled=step_tool.history_enabled,
+        history_window = AgentHistoryWindow.load(self.session, self.agent_execution_id, self.llm.get_model())
+        messages = AgentLlmMessageBuilder(self.session, self.llm, self.llm.get_model(), self.agent_id, self.agent_execution_id,
+                                          context=self.context) \
+            .build_agent_messages(prompt, history_window, history_enabled=step_tool.history_enabled,
                                   completion_prompt=step_tool.completion_prompt)
         # print(messages)
         current_tokens = TokenCounter.count_message_tokens(messages, self.llm.get_model())
-        response = self.llm.chat_completion(messages, TokenCounter(session=self.session, organisation_id=self.organisation.id).token_limit(self.llm.get_model()) - current_tokens)
+        response = self.llm.chat_completion(messages, self.context.token_limit(self.llm.get_model()) - current_tokens)
 
         if 'error' in response and response['message'] is not None:
             ErrorHandler.handle_openai_errors(self.session, self.agent_id, self.agent_execution_id, response['message'])
@@ -118,8 +122,8 @@ class AgentToolStepHandler:
         return assistant_reply
 
     def _build_tool_obj(self, agent_config, agent_execution_config, tool_name: str):
-        model_api_key = AgentConfiguration.get_model_api_key(self.session, self.agent_id, agent_config["model"])['api_key']
-        tool_builder = ToolBuilder(self.session, self.agent_id, self.agent_execution_id)
+        model_api_key = self.context.model_api_key
+        tool_builder = ToolBuilder(self.session, self.agent_id, self.agent_execution_id, context=self.context)
         resource_summary = ""
         if tool_name == "QueryResourceTool":
             resource_summary = ResourceSummarizer(session=self.session,
@@ -127,8 +131,7 @@ class AgentToolStepHandler:
                                                   model=agent_config["model"]).fetch_or_create_agent_resource_summary(
                 default_summary=agent_config.get("resource_summary"))
 
-        organisation = Agent.find_org_by_agent_id(self.session, self.agent_id)
-        tool = self.session.query(Tool).join(Toolkit, and_(Tool.toolkit_id == Toolkit.id, Toolkit.organisation_id == organisation.id, Tool.name == tool_name)).first()
+        tool = self.session.query(Tool).join(Toolkit, and_(Tool.toolkit_id == Toolkit.id, Toolkit.organisation_id == self.organisation.id, Tool.name == tool_name)).first()
         tool_obj = tool_builder.build_tool(tool)
         tool_obj = tool_builder.set_default_params_tool(tool_obj, agent_config, agent_execution_config, model_api_key,
                                                         resource_summary,self.memory)
@@ -139,8 +142,7 @@ class AgentToolStepHandler:
         prompt = self._build_tool_output_prompt(step_tool, final_response, workflow_step)
         messages = [{"role": "system", "content": prompt}]
         current_tokens = TokenCounter.count_message_tokens(messages, self.llm.get_model())
-        response = self.llm.chat_completion(messages,
-                                            TokenCounter(session=self.session, organisation_id=self.organisation.id).token_limit(self.llm.get_model()) - current_tokens)
+        response = self.llm.chat_completion(messages, self.context.token_limit(self.llm.get_model()) - current_tokens)
 
         if 'error' in response and response['message'] is not None:
             ErrorHandler.handle_openai_errors(self.session, self.agent_id, self.agent_execution_id, response['message'])
@@ -154,31 +156,26 @@ class AgentToolStepHandler:
         return step_response
 
     def _build_tool_input_prompt(self, step_tool: AgentWorkflowStepTool, tool: BaseTool, agent_execution_config: dict):
-        super_agi_prompt = PromptReader.read_agent_prompt(__file__, "agent_tool_input.txt")
-        super_agi_prompt = super_agi_prompt.replace("{goals}", AgentPromptBuilder.add_list_items_to_string(
-            agent_execution_config["goal"]))
-        super_agi_prompt = super_agi_prompt.replace("{tool_name}", step_tool.tool_name)
-        super_agi_prompt = super_agi_prompt.replace("{instruction}", step_tool.input_instruction)
-
         tool_schema = f"\"{tool.name}\": {tool.description}, args json schema: {json.dumps(tool.args)}"
-        super_agi_prompt = super_agi_prompt.replace("{tool_schema}", tool_schema)
-        return super_agi_prompt
+        return PromptReader.read_agent_template(__file__, "agent_tool_input.txt").render(
+            goals=AgentPromptBuilder.add_list_items_to_string(agent_execution_config["goal"]),
+            tool_name=step_tool.tool_name,
+            instruction=step_tool.input_instruction,
+            tool_schema=tool_schema)
 
     def _get_step_responses(self, workflow_step: AgentWorkflowStep):
         return [step["step_response"] for step in workflow_step.next_steps]
 
     def _build_tool_output_prompt(self, step_tool: AgentWorkflowStepTool, tool_output: str,
                                   workflow_step: AgentWorkflowStep):
-        super_agi_prompt = PromptReader.read_agent_prompt(__file__, "agent_tool_output.txt")
-        super_agi_prompt = super_agi_prompt.replace("{tool_output}", tool_output)
-        super_agi_prompt = super_agi_prompt.replace("{tool_name}", step_tool.tool_name)
-        super_agi_prompt = super_agi_prompt.replace("{instruction}", step_tool.output_instruction)
-
         step_responses = self._get_step_responses(workflow_step)
         if "default" in step_responses:
             step_responses.remove("default")
-        super_agi_prompt = super_agi_prompt.replace("{output_options}", str(step_responses))
-        return super_agi_prompt
+        return PromptReader.read_agent_template(__file__, "agent_tool_output.txt").render(
+            tool_output=tool_output,
+            tool_name=step_tool.tool_name,
+            instruction=step_tool.output_instruction,
+            output_options=str(step_responses))
 
     def _handle_wait_for_permission(self, agent_execution, workflow_step: AgentWorkflowStep):
         """
@@ -199,9 +196,9 @@ class AgentToolStepHandler:
             logger.error("handle_wait_for_permission: Permission is still pending")
             return False
         if agent_execution_permission.status == "APPROVED":
-            next_step = AgentWorkflowStep.fetch_next_step(self.session, workflow_step.id, "YES")
+            next_step = WorkflowGraph.fetch_next_step(self.session, workflow_step.id, "YES")
         else:
-            next_step = AgentWorkflowStep.fetch_next_step(self.session, workflow_step.id, "NO")
+            next_step = WorkflowGraph.fetch_next_step(self.session, workflow_step.id, "NO")
             result = f"{' User has given the following feedback : ' + agent_execution_permission.user_feedback if agent_execution_permission.user_feedback else ''}"
 
 
@@ -0,0 +1,103 @@
+import time
+from datetime import timedelta
+from typing import List, Tuple
+
+from superagi.agent.types.agent_execution_status import AgentExecutionStatus
+from superagi.agent.types.wait_step_status import AgentWorkflowStepWaitStatus
+from superagi.config.config import get_config_int
+from superagi.helper.redis_helper import get_redis_client, claim_due_members
+from superagi.lib.logger import logger
+from superagi.models.agent_execution import AgentExecution
+from superagi.models.workflows.agent_workflow_step import AgentWorkflowStep
+from superagi.models.workflows.agent_workflow_step_wait import AgentWorkflowStepWait
+
+WAKEUPS_KEY = "agent_wait_step_wakeups"
+
+# Removes a wake-up unless it has been scheduled again since it was claimed
+COMPLETE_SCRIPT = """
+if tonumber(redis.call('ZSCORE', KEYS[1], ARGV[1])) == tonumber(ARGV[2]) then
+    return redis.call('ZREM', KEYS[1], ARGV[1])
+end
+return 0
+"""
+
+
+class AgentWaitScheduler:
+    """
+    Wakes up agent executions at the end of their wait step.
+
+    The deadline of every wait is kept in a Redis sorted set, scored by its epoch time. A delayed task is queued
+    for each deadline, and execute_waiting_workflows also runs every WAIT_STEP_POLL_INTERVAL seconds in case
+    that task is lost. Claimed wake-ups are pushed past a claim timeout and only removed once the execution has
+    resumed, so a worker restart does not lose them. reconcile rebuilds the set from the database if Redis loses it.
+    """
+
+    @staticmethod
+    def _redis_client():
+        return get_redis_client()
+
+    @classmethod
+    def schedule(cls, agent_execution_id: int, deadline: float):
+        """
+        Schedule the wake-up of an agent execution.
+
+        Args:
+            agent_execution_id (int): The ID of the agent execution.
+            deadline (float): The epoch time at which the wait is over.
+        """
+        cls._redis_client().zadd(WAKEUPS_KEY, {str(agent_execution_id): deadline})
+        from superagi.worker import execute_waiting_workflows
+        try:
+            execute_waiting_workflows.apply_async(countdown=max(0.0, deadline - time.time()))
+        except Exception as e:
+            logger.error(f"Unable to queue the wake-up of agent execution {agent_execution_id}: {e}")
+
+    @classmethod
+    def claim_due(cls, limit: int = 100) -> List[Tuple[int, float]]:
+        """
+        Claim the wake-ups that are due.
+
+        Args:
+            limit (int): The maximum number of wake-ups claimed.
+
+        Returns:
+            List[Tuple[int, float]]: The agent execution IDs with the claim, to pass to complete once resumed.
+        """
+        members, claim = claim_due_members(cls._redis_client(), WAKEUPS_KEY,
+                                           get_config_int("WAIT_STEP_CLAIM_TIMEOUT", 300), limit)
+        return [(int(member), claim) for member in members]
+
+    @classmethod
+    def complete(cls, agent_execution_id: int, claim: float):
+        """Remove a claimed wake-up, unless the execution has been scheduled again."""
+        redis_client = cls._redis_client()
+        redis_client.register_script(COMPLETE_SCRIPT)(keys=[WAKEUPS_KEY],
+                                                      args=[str(agent_execution_id), claim])
+
+    @classmethod
+    def reconcile(cls, session) -> int:
+        """
+        Schedule every execution waiting in the database that has no wake-up, for example after Redis lost them.
+
+        Args:
+            session: The database session.
+
+        Returns:
+            int: The number of wake-ups added.
+        """
+        waits = session.query(AgentExecution.id, AgentWorkflowStepWait.wait_begin_time, AgentWorkflowStepWait.delay) \
+            .join(AgentWorkflowStep, AgentWorkflowStep.id == AgentExecution.current_agent_step_id) \
+            .join(AgentWorkflowStepWait, AgentWorkflowStepWait.id == AgentWorkflowStep.action_reference_id) \
+            .filter(AgentExecution.status == AgentExecutionStatus.WAIT_STEP.value,
+                    AgentWorkflowStepWait.status == AgentWorkflowStepWaitStatus.WAITING.value).all()
+        wakeups = {str(wait.id): cls.deadline(wait.wait_begin_time, wait.delay) for wait in waits}
+        if not wakeups:
+            return 0
+        return cls._redis_client().zadd(WAKEUPS_KEY, wakeups, nx=True)
+
+    @staticmethod
+    def deadline(wait_begin_time, delay: int) -> float:
+        """Return the epoch time at which a wait begun at wait_begin_time, in local time, is over."""
+        if wait_begin_time is None:
+            return time.time()
+        return (wait_begin_time + timedelta(seconds=delay or 0)).timestamp()
@@ -1,9 +1,10 @@
 from datetime import datetime
 
+from superagi.agent.agent_wait_scheduler import AgentWaitScheduler
 from superagi.agent.types.agent_execution_status import AgentExecutionStatus
+from superagi.agent.workflow_graph import WorkflowGraph
 from superagi.lib.logger import logger
 from superagi.models.agent_execution import AgentExecution
-from superagi.models.workflows.agent_workflow_step import AgentWorkflowStep
 from superagi.models.workflows.agent_workflow_step_wait import AgentWorkflowStepWait
 from superagi.agent.types.wait_step_status import AgentWorkflowStepWaitStatus
 
@@ -20,7 +21,7 @@ class AgentWaitStepHandler:
 
         logger.info("Executing Wait Step")
         execution = AgentExecution.get_agent_execution_from_id(self.session, self.agent_execution_id)
-        workflow_step = AgentWorkflowStep.find_by_id(self.session, execution.current_agent_step_id)
+        workflow_step = WorkflowGraph.get_step(self.session, execution.current_agent_step_id)
         step_wait = AgentWorkflowStepWait.find_by_id(self.session, workflow_step.action_reference_id)
         if step_wait is not None:
             step_wait.wait_begin_time = datetime.now()
@@ -28,14 +29,16 @@ class AgentWaitStepHandler:
             execution.status = AgentExecutionStatus.WAIT_STEP.value
 
             self.session.commit()
+            AgentWaitScheduler.schedule(self.agent_execution_id,
+                                        AgentWaitScheduler.deadline(step_wait.wait_begin_time, step_wait.delay))
 
     def handle_next_step(self):
         """Handle next step of agent workflow in case of wait step."""
 
         execution = AgentExecution.get_agent_execution_from_id(self.session, self.agent_execution_id)
-        workflow_step = AgentWorkflowStep.find_by_id(self.session, execution.current_agent_step_id)
+        workflow_step = WorkflowGraph.get_step(self.session, execution.current_agent_step_id)
         step_response = "default"
-        next_step = AgentWorkflowStep.fetch_next_step(self.session, workflow_step.id, step_response)
+        next_step = WorkflowGraph.fetch_next_step(self.session, workflow_step.id, step_response)
         if str(next_step) == "COMPLETE":
             agent_execution = AgentExecution.get_agent_execution_from_id(self.session, self.agent_execution_id)
             agent_execution.current_agent_step_id = -1
@@ -1,8 +1,11 @@
 import json
+from typing import List
+
 from superagi.agent.common_types import TaskExecutorResponse, ToolExecutorResponse
-from superagi.agent.output_parser import AgentSchemaOutputParser
+from superagi.agent.output_parser import AgentGPTAction, AgentSchemaOutputParser
 from superagi.agent.task_queue import TaskQueue
 from superagi.agent.tool_executor import ToolExecutor
+from superagi.config.config import get_config
 from superagi.helper.json_cleaner import JsonCleaner
 from superagi.lib.logger import logger
 from langchain.text_splitter import TokenTextSplitter
@@ -38,6 +41,10 @@ class ToolOutputHandler:
             session (Session): The database session.
             assistant_reply (str): The assistant reply.
         """
+        actions = self._parse_tool_calls(assistant_reply)
+        if len(actions) > 1:
+            return self._handle_tool_calls(session, assistant_reply, actions)
+
         response = self._check_permission_in_restricted_mode(session, assistant_reply)
         if response.is_permission_required:
             return response
@@ -65,6 +72,101 @@ class ToolOutputHandler:
         self.add_text_to_memory(assistant_reply, tool_response.result)
         return tool_response
 
+    def _parse_tool_calls(self, assistant_reply: str) -> List[AgentGPTAction]:
+        """Returns the tool calls of the reply, empty when the reply is handled as a single tool call."""
+        if int(get_config("MAX_PARALLEL_TOOL_CALLS", 1)) <= 1:
+            return []
+        try:
+            return self.output_parser.parse_actions(assistant_reply)
+        except Exception:
+            # Parsing errors are reported by the single tool call handling
+            return []
+
+    def _handle_tool_calls(self, session, assistant_reply: str, actions: List[AgentGPTAction]):
+        """Handles a reply with multiple independent tool calls.
+
+        The calls are run concurrently and their results are written as feeds in the order they were proposed.
+        Permission is checked per call, the first call that needs it waits for permission and later calls that
+        need it are not run. Calls beyond MAX_PARALLEL_TOOL_CALLS are not run either. Every call that is not run
+        gets a feed saying so, for the model to call it again in a later step.
+
+        Args:
+            session (Session): The database session.
+            assistant_reply (str): The assistant reply.
+            actions (List[AgentGPTAction]): The tool calls of the reply.
+        """
+        max_tool_calls = int(get_config("MAX_PARALLEL_TOOL_CALLS", 1))
+        responses = [None] * len(actions)
+        permission_response = None
+        runnable = []
+        for i, action in enumerate(actions):
+            if i >= max_tool_calls:
+                responses[i] = ToolExecutorResponse(
+                    status="ERROR", retry=True,
+                    result=f"Tool {action.name} was not run: MAX_PARALLEL_TOOL_CALLS={max_tool_calls}, "
+                           f"call it again in a later step")
+            elif not self._is_permission_required(action):
+                runnable.append(i)
+            elif permission_response is None:
+                permission_response = self._request_permission(session, action.name,
+                                                               self._build_tool_call_reply(assistant_reply, action))
+                responses[i] = ToolExecutorResponse(status="PENDING",
+                                                    result=f"Tool {action.name} is waiting for permission")
+            else:
+                responses[i] = ToolExecutorResponse(
+                    status="ERROR", retry=True,
+                    result=f"Tool {action.name} was not run as another tool is waiting for permission, "
+                           f"call it again in a later step")
+
+        executed = self._build_tool_executor(session).execute_parallel(
+            session, [actions[i] for i in runnable], timeout=float(get_config("TOOL_CALL_TIMEOUT", 300)))
+        for i, response in zip(runnable, executed):
+            responses[i] = response
+
+        agent_execution = AgentExecution.find_by_id(session, self.agent_execution_id)
+        session.add(AgentExecutionFeed(agent_execution_id=self.agent_execution_id,
+                                       agent_id=self.agent_config["agent_id"],
+                                       feed=assistant_reply,
+                                       role="assistant",
+                                       feed_group_id=agent_execution.current_feed_group_id))
+        for response in responses:
+            session.add(AgentExecutionFeed(agent_execution_id=self.agent_execution_id,
+                                           agent_id=self.agent_config["agent_id"],
+                                           feed=response.result,
+                                           role="system",
+                                           feed_group_id=agent_execution.current_feed_group_id))
+        session.commit()
+
+        tool_response = self._merge_tool_responses(responses)
+        self.add_text_to_memory(assistant_reply, tool_response.result)
+        if permission_response is not None:
+            return permission_response
+        if not tool_response.retry:
+            tool_response = self._check_for_completion(tool_response)
+        return tool_response
+
+    @staticmethod
+    def _build_tool_call_reply(assistant_reply: str, action: AgentGPTAction) -> str:
+        """Builds a single tool call reply, which is run once the permission for the call is approved."""
+        try:
+            thoughts = json.loads(JsonCleaner.extract_json_section(assistant_reply)).get("thoughts", {})
+        except Exception:
+            thoughts = {}
+        return json.dumps({"thoughts": thoughts, "tool": {"name": action.name, "args": action.args}})
+
+    @staticmethod
+    def _merge_tool_responses(responses: List[ToolExecutorResponse]) -> ToolExecutorResponse:
+        statuses = [response.status for response in responses]
+        if "COMPLETE" in statuses:
+            status = "COMPLETE"
+        elif all(status == "ERROR" for status in statuses):
+            status = "ERROR"
+        else:
+            status = "SUCCESS"
+        return ToolExecutorResponse(status=status,
+                                    result="\n".join(response.result for response in responses if response.result),
+                                    retry=all(response.retry for response in responses))
+
     def add_text_to_memory(self, assistant_reply,tool_response_result):
         """
         Adds the text generated by the assistant and tool response to the memory.
@@ -84,7 +186,8 @@ class ToolOutputHandler:
                 prompt = task_description + final_tool_response
                 text_splitter = TokenTextSplitter(chunk_size=1024, chunk_overlap=10)
                 chunk_response = text_splitter.split_text(prompt)
-                metadata = {"agent_execution_id": self.agent_execution_id}
+                metadata = {"agent_execution_id": self.agent_execution_id,
+                            "agent_id": self.agent_config.get("agent_id")}
                 metadatas = []
                 for _ in chunk_response:
                     metadatas.append(metadata)
@@ -98,38 +201,46 @@ class ToolOutputHandler:
     def handle_tool_response(self, session, assistant_reply):
         """Only handle processing of tool response"""
         action = self.output_parser.parse(assistant_reply)
+        tool_executor = self._build_tool_executor(session)
+        return tool_executor.execute(session, action.name, action.args)
+
+    def _build_tool_executor(self, session):
         agent = session.query(Agent).filter(Agent.id == self.agent_config["agent_id"]).first()
         organisation = agent.get_agent_organisation(session)
-        tool_executor = ToolExecutor(organisation_id=organisation.id, agent_id=agent.id, tools=self.tools, agent_execution_id=self.agent_execution_id)
-        return tool_executor.execute(session, action.name, action.args)
+        return ToolExecutor(organisation_id=organisation.id, agent_id=agent.id, tools=self.tools, agent_execution_id=self.agent_execution_id)
 
     def _check_permission_in_restricted_mode(self, session, assistant_reply: str):
         action = self.output_parser.parse(assistant_reply)
+        if self._is_permission_required(action):
+            return self._request_permission(session, action.name, assistant_reply)
+        return ToolExecutorResponse(status="PENDING", is_permission_required=False)
+
+    def _is_permission_required(self, action: AgentGPTAction) -> bool:
         tools = {t.name: t for t in self.tools}
 
         excluded_tools = [ToolExecutor.FINISH, '', None]
 
-        if self.agent_config["permission_type"].upper() == "RESTRICTED" and action.name not in excluded_tools and \
-                tools.get(action.name) and tools[action.name].permission_required:
-            new_agent_execution_permission = AgentExecutionPermission(
-                agent_execution_id=self.agent_execution_id,
-                status="PENDING",
-                agent_id=self.agent_config["agent_id"],
-                tool_name=action.name,
-                assistant_reply=assistant_reply)
-
-            session.add(new_agent_execution_permission)
-            session.commit()
-            return ToolExecutorResponse(is_permission_required=True, status="WAITING_FOR_PERMISSION",
-                                        permission_id=new_agent_execution_permission.id)
-        return ToolExecutorResponse(status="PENDING", is_permission_required=False)
+        return bool(self.agent_config["permission_type"].upper() == "RESTRICTED" and action.name not in excluded_tools
+                    and tools.get(action.name) and tools[action.name].permission_required)
+
+    def _request_permission(self, session, tool_name: str, assistant_reply: str):
+        new_agent_execution_permission = AgentExecutionPermission(
+            agent_execution_id=self.agent_execution_id,
+            status="PENDING",
+            agent_id=self.agent_config["agent_id"],
+            tool_name=tool_name,
+            assistant_reply=assistant_reply)
+
+        session.add(new_agent_execution_permission)
+        session.commit()
+        return ToolExecutorResponse(is_permission_required=True, status="WAITING_FOR_PERMISSION",
+                                    permission_id=new_agent_execution_permission.id)
 
     def _check_for_completion(self, tool_response):
-        self.task_queue.complete_task(tool_response.result)
-        current_tasks = self.task_queue.get_tasks()
-        if self.task_queue.get_completed_tasks() and len(current_tasks) == 0:
+        pending_count, completed_count = self.task_queue.complete_task(tool_response.result)
+        if completed_count and pending_count == 0:
             tool_response.status = "COMPLETE"
-        if current_tasks and tool_response.status == "COMPLETE":
+        if pending_count and tool_response.status == "COMPLETE":
             tool_response.status = "PENDING"
         return tool_response
 
@@ -148,8 +259,7 @@ class TaskOutputHandler:
         assistant_reply = JsonCleaner.extract_json_array_section(assistant_reply)
         tasks = eval(assistant_reply)
         tasks = np.array(tasks).flatten().tolist()
-        for task in reversed(tasks):
-            self.task_queue.add_task(task)
+        pending_count = self.task_queue.add_tasks(list(reversed(tasks)))
         if len(tasks) > 0:
             logger.info("Adding task to queue: " + str(tasks))
         agent_execution = AgentExecution.find_by_id(session, self.agent_execution_id)
@@ -160,7 +270,7 @@ class TaskOutputHandler:
                                                       role="system",
                                                       feed_group_id=agent_execution.current_feed_group_id)
             session.add(agent_execution_feed)
-        status = "COMPLETE" if len(self.task_queue.get_tasks()) == 0 else "PENDING"
+        status = "COMPLETE" if pending_count == 0 else "PENDING"
         session.commit()
         return TaskExecutorResponse(status=status, retry=False)
 
@@ -178,12 +288,10 @@ class ReplaceTaskOutputHandler:
     def handle(self, session, assistant_reply):
         assistant_reply = JsonCleaner.extract_json_array_section(assistant_reply)
         tasks = eval(assistant_reply)
-        self.task_queue.clear_tasks()
-        for task in reversed(tasks):
-            self.task_queue.add_task(task)
+        pending_count = self.task_queue.replace_tasks(list(reversed(tasks)))
         if len(tasks) > 0:
             logger.info("Tasks reprioritized in order: " + str(tasks))
-        status = "COMPLETE" if len(self.task_queue.get_tasks()) == 0 else "PENDING"
+        status = "COMPLETE" if pending_count == 0 else "PENDING"
         session.commit()
         return TaskExecutorResponse(status=status, retry=False)
 
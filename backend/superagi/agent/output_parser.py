@@ -23,10 +23,18 @@ class BaseOutputParser(ABC):
     def parse(self, text: str) -> AgentGPTAction:
         """Return AgentGPTAction"""
 
+    def parse_actions(self, text: str) -> List[AgentGPTAction]:
+        """Return all the AgentGPTActions of the response, in the order they were proposed"""
+        return [self.parse(text)]
+
 
 class AgentSchemaOutputParser(BaseOutputParser):
     """Parses the output from the agent schema"""
     def parse(self, response: str) -> AgentGPTAction:
+        return self.parse_actions(response)[0]
+
+    def parse_actions(self, response: str) -> List[AgentGPTAction]:
+        """Parses the tool calls of the response, either a single "tool" or a list of "tools"."""
         if response.startswith("```") and response.endswith("```"):
             response = "```".join(response.split("```")[1:-1])
         response = JsonCleaner.extract_json_section(response)
@@ -37,11 +45,9 @@ class AgentSchemaOutputParser(BaseOutputParser):
         try:
             logger.debug("AgentSchemaOutputParser: ", response)
             response_obj = ast.literal_eval(response)
-            args = response_obj['tool']['args'] if 'args' in response_obj['tool'] else {}
-            return AgentGPTAction(
-                name=response_obj['tool']['name'],
-                args=args,
-            )
+            tool_calls = response_obj['tools'] if response_obj.get('tools') else [response_obj['tool']]
+            return [AgentGPTAction(name=tool_call['name'], args=tool_call['args'] if 'args' in tool_call else {})
+                    for tool_call in tool_calls]
         except BaseException as e:
             logger.info(f"AgentSchemaOutputParser: Error parsing JSON response {e}")
             raise e
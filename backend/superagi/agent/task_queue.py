@@ -1,26 +1,74 @@
+import ast
 import json
+from typing import List
 
-import redis
+from superagi.helper.redis_helper import get_redis_client
+from superagi.lib.logger import logger
 
-from superagi.config.config import get_config
+# Moves the first pending task to the completed tasks and reports the pending and completed counts
+COMPLETE_TASK_SCRIPT = """
+local task = redis.call('LPOP', KEYS[1])
+if task then
+    redis.call('LPUSH', KEYS[2], cjson.encode({task = task, response = cjson.decode(ARGV[1])}))
+end
+return {redis.call('LLEN', KEYS[1]), redis.call('LLEN', KEYS[2])}
+"""
 
-redis_url = get_config('REDIS_URL') or "localhost:6379"
 """TaskQueue manages current tasks and past tasks in Redis """
 class TaskQueue:
     def __init__(self, queue_name: str):
         self.queue_name = queue_name + "_q"
         self.completed_tasks = queue_name + "_q_completed"
-        self.db = redis.Redis.from_url("redis://" + redis_url + "/0", decode_responses=True)
+        self.db = get_redis_client()
+        self._complete_task_script = self.db.register_script(COMPLETE_TASK_SCRIPT)
 
     def add_task(self, task: str):
         self.db.lpush(self.queue_name, task)
-        # print("Added task. New tasks:", str(self.get_tasks()))
+
+    def add_tasks(self, tasks: List[str]) -> int:
+        """
+        Add tasks in a single round trip, the same as calling add_task for each of them in order.
+
+        Args:
+            tasks (List[str]): The tasks to add.
+
+        Returns:
+            int: The number of pending tasks.
+        """
+        if not tasks:
+            return self.count_tasks()
+        return self.db.lpush(self.queue_name, *tasks)
+
+    def replace_tasks(self, tasks: List[str]) -> int:
+        """
+        Atomically replace the pending tasks, the same as clear_tasks followed by add_tasks.
+
+        Args:
+            tasks (List[str]): The new tasks.
+
+        Returns:
+            int: The number of pending tasks.
+        """
+        pipeline = self.db.pipeline(transaction=True)
+        pipeline.delete(self.queue_name)
+        if tasks:
+            pipeline.lpush(self.queue_name, *tasks)
+        pipeline.llen(self.queue_name)
+        return pipeline.execute()[-1]
 
     def complete_task(self, response):
-        if len(self.get_tasks()) <= 0:
-            return
-        task = self.db.lpop(self.queue_name)
-        self.db.lpush(self.completed_tasks, str({"task": task, "response": response}))
+        """
+        Atomically move the first pending task to the completed tasks with its response.
+
+        Args:
+            response: The response of the task, must be JSON serializable.
+
+        Returns:
+            tuple: The number of pending tasks and the number of completed tasks.
+        """
+        pending_count, completed_count = self._complete_task_script(keys=[self.queue_name, self.completed_tasks],
+                                                                    args=[json.dumps(response, default=str)])
+        return pending_count, completed_count
 
     def get_first_task(self):
         return self.db.lindex(self.queue_name, 0)
@@ -28,9 +76,26 @@ class TaskQueue:
     def get_tasks(self):
         return self.db.lrange(self.queue_name, 0, -1)
 
-    def get_completed_tasks(self):
-        tasks = self.db.lrange(self.completed_tasks, 0, -1)
-        return [eval(task) for task in tasks]
+    def count_tasks(self) -> int:
+        return self.db.llen(self.queue_name)
+
+    def get_completed_tasks(self, start: int = 0, limit: int = None):
+        """
+        Get completed tasks, most recent first.
+
+        Args:
+            start (int): The number of most recent completed tasks to skip.
+            limit (int): The maximum number of completed tasks to return, None returns all of them.
+
+        Returns:
+            list: The completed tasks as dicts with 'task' and 'response'.
+        """
+        end = -1 if limit is None else start + limit - 1
+        tasks = self.db.lrange(self.completed_tasks, start, end)
+        return [self._decode_completed_task(task) for task in tasks]
+
+    def count_completed_tasks(self) -> int:
+        return self.db.llen(self.completed_tasks)
 
     def clear_tasks(self):
         self.db.delete(self.queue_name)
@@ -40,7 +105,7 @@ class TaskQueue:
         if response is None:
             return None
 
-        return eval(response)
+        return self._decode_completed_task(response)
 
     def set_status(self, status):
         self.db.set(self.queue_name + "_status", status)
@@ -48,3 +113,14 @@ class TaskQueue:
     def get_status(self):
         return self.db.get(self.queue_name + "_status")
 
+    @staticmethod
+    def _decode_completed_task(task: str):
+        try:
+            return json.loads(task)
+        except json.JSONDecodeError:
+            # Completed tasks written before the JSON encoding were stored as python literals
+            try:
+                return ast.literal_eval(task)
+            except (ValueError, SyntaxError):
+                logger.error(f"Unable to decode completed task: {task}")
+                return {"task": task, "response": None}
@@ -1,14 +1,12 @@
-import importlib
-import os
+from superagi.agent.tool_registry import ToolRegistry
 from superagi.config.config import get_config
 from superagi.llms.llm_model_factory import get_model
 from superagi.models.tool import Tool
-from superagi.models.tool_config import ToolConfig
 from superagi.models.agent import Agent
 from superagi.resource_manager.file_manager import FileManager
 from superagi.tools.base_tool import BaseToolkitConfiguration
 from superagi.tools.tool_response_query_manager import ToolResponseQueryManager
-from superagi.helper.encyption_helper import decrypt_data, is_encrypted
+from superagi.helper.toolkit_config_cache import ToolkitConfigCache
 
 class DBToolkitConfiguration(BaseToolkitConfiguration):
     session = None
@@ -17,21 +15,22 @@ class DBToolkitConfiguration(BaseToolkitConfiguration):
     def __init__(self, session=None, toolkit_id=None):
         self.session = session
         self.toolkit_id = toolkit_id
+        self._configs = None
 
     def get_tool_config(self, key: str):
-        tool_config = self.session.query(ToolConfig).filter_by(key=key, toolkit_id=self.toolkit_id).first()
-        if tool_config and tool_config.value:
-            if is_encrypted(tool_config.value):
-                return decrypt_data(tool_config.value)
-            else:
-                return tool_config.value
+        if self._configs is None:
+            self._configs = ToolkitConfigCache.get_configs(self.session, self.toolkit_id)
+        value = self._configs.get(key)
+        if value:
+            return value
         return super().get_tool_config(key=key)
 
 class ToolBuilder:
-    def __init__(self, session, agent_id: int, agent_execution_id: int = None):
+    def __init__(self, session, agent_id: int, agent_execution_id: int = None, context=None):
         self.session = session
         self.agent_id = agent_id
         self.agent_execution_id = agent_execution_id
+        self.context = context
 
     def __validate_filename(self, filename):
         """
@@ -59,22 +58,8 @@ class ToolBuilder:
         """
         file_name = self.__validate_filename(filename=tool.file_name)
 
-        tools_dir=""
-        tool_paths = ["superagi/tools", "superagi/tools/external_tools", "superagi/tools/marketplace_tools"]
-        for tool_path in tool_paths:
-            if os.path.exists(os.path.join(os.getcwd(), tool_path) + '/' + tool.folder_name):
-                tools_dir = tool_path
-                break
-        parsed_tools_dir = tools_dir.rstrip("/")
-        module_name = ".".join(parsed_tools_dir.split("/") + [tool.folder_name, file_name])
-
-        # module_name = f"superagi.tools.{folder_name}.{file_name}"
-
-        # Load the module dynamically
-        module = importlib.import_module(module_name)
-
-        # Get the class from the loaded module
-        obj_class = getattr(module, tool.class_name)
+        # Get the class from the process-wide registry, which imports the module on the first use
+        obj_class = ToolRegistry.get_tool_class(tool.folder_name, file_name, tool.class_name)
 
         # Create an instance of the class
         new_object = obj_class()
@@ -96,7 +81,10 @@ class ToolBuilder:
         Returns:
             list: The list of tools with default parameters.
         """
-        organisation = Agent.find_org_by_agent_id(self.session, agent_id=agent_config['agent_id'])
+        if self.context is not None:
+            organisation = self.context.organisation
+        else:
+            organisation = Agent.find_org_by_agent_id(self.session, agent_id=agent_config['agent_id'])
         if hasattr(tool, 'goals'):
             tool.goals = agent_execution_config["goal"]
         if hasattr(tool, 'instructions'):
@@ -110,6 +98,8 @@ class ToolBuilder:
             tool.agent_id = self.agent_id
         if hasattr(tool, 'agent_execution_id'):
             tool.agent_execution_id = self.agent_execution_id
+        if hasattr(tool, 'agent_execution_context'):
+            tool.agent_execution_context = self.context
         if hasattr(tool, 'resource_manager'):
             tool.resource_manager = FileManager(session=self.session, agent_id=self.agent_id,
                                                 agent_execution_id=self.agent_execution_id)
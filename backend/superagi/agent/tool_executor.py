@@ -1,6 +1,13 @@
+import copy
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import List
+
 from pydantic import ValidationError
+from sqlalchemy.orm import Session
 
 from superagi.agent.common_types import ToolExecutorResponse
+from superagi.agent.output_parser import AgentGPTAction
 from superagi.apm.event_handler import EventHandler
 from superagi.lib.logger import logger
 
@@ -64,6 +71,62 @@ class ToolExecutor:
         logger.info("Tool Response : " + str(output) + "\n")
         return output
 
+    def execute_parallel(self, session, actions: List[AgentGPTAction], timeout: float) -> List[ToolExecutorResponse]:
+        """Executes independent tool calls concurrently, each with its own database session.
+
+        Args:
+            session (Session): The database session, its engine is used for the sessions of the tool calls.
+            actions (List[AgentGPTAction]): The tool calls to execute, one thread is used per call.
+            timeout (float): Seconds after which a tool call that has not returned is reported as timed out.
+
+        Returns:
+            List[ToolExecutorResponse]: The responses in the order of the actions.
+        """
+        if not actions:
+            return []
+        bind = session.get_bind()
+        thread_pool = ThreadPoolExecutor(max_workers=len(actions))
+        try:
+            futures = [thread_pool.submit(self._execute_in_own_session, bind, action.name, action.args)
+                       for action in actions]
+            deadline = time.monotonic() + timeout
+            responses = []
+            for action, future in zip(actions, futures):
+                try:
+                    responses.append(future.result(timeout=max(0, deadline - time.monotonic())))
+                except TimeoutError:
+                    logger.error(f"Tool {action.name} timed out after {timeout} seconds")
+                    responses.append(ToolExecutorResponse(
+                        status="ERROR", result=f"Tool {action.name} timed out after {timeout} seconds", retry=True))
+            return responses
+        finally:
+            # Timed out calls keep running in the background and close their session when done
+            thread_pool.shutdown(wait=False)
+
+    def _execute_in_own_session(self, bind, tool_name, tool_args):
+        session = Session(bind=bind)
+        try:
+            tool_key = tool_name.lower().replace(" ", "")
+            tools = [self._bind_session(tool, session) if tool.name.lower().replace(" ", "") == tool_key else tool
+                     for tool in self.tools]
+            tool_executor = ToolExecutor(organisation_id=self.organisation_id, agent_id=self.agent_id, tools=tools,
+                                         agent_execution_id=self.agent_execution_id)
+            return tool_executor.execute(session, tool_name, tool_args)
+        finally:
+            session.close()
+
+    @staticmethod
+    def _bind_session(tool, session):
+        # Sessions are not thread safe, so the tool and the helpers holding the step session get a copy
+        tool = tool.copy()
+        for attribute in ("toolkit_config", "resource_manager", "tool_response_manager"):
+            value = getattr(tool, attribute, None)
+            if value is not None and hasattr(value, "session"):
+                value = copy.copy(value)
+                value.session = session
+                setattr(tool, attribute, value)
+        return tool
+
     def clean_tool_args(self, args):
         parsed_args = {}
         for key in args.keys():
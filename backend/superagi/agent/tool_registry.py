@@ -0,0 +1,112 @@
+import importlib
+import os
+import sys
+import threading
+import time
+
+from superagi.config.config import get_config_int
+from superagi.lib.logger import logger
+
+TOOL_PATHS = ["superagi/tools", "superagi/tools/external_tools", "superagi/tools/marketplace_tools"]
+# Order in which the tool folders are added to sys.path
+SYS_PATH_TOOL_PATHS = ["superagi/tools", "superagi/tools/marketplace_tools", "superagi/tools/external_tools"]
+
+
+class ToolRegistry:
+    """
+    Process-wide registry of the tool classes, resolved once per (folder, file, class).
+
+    The tool directories are checked for changes at most every TOOL_REGISTRY_CHECK_INTERVAL seconds. Installed or
+    removed tool folders are added to sys.path and tool classes whose file changed are imported again on their
+    next lookup.
+    """
+
+    _classes = {}
+    _sys_path_folders = set()
+    _root_mtimes = None
+    _last_check = 0.0
+    _lock = threading.RLock()
+
+    @classmethod
+    def get_tool_class(cls, folder_name: str, file_name: str, class_name: str):
+        """
+        Get the class of a tool, importing its module on the first lookup.
+
+        Args:
+            folder_name (str): The folder of the tool.
+            file_name (str): The module of the tool, without the .py extension.
+            class_name (str): The name of the tool class.
+
+        Returns:
+            type: The tool class.
+        """
+        cls.check_for_changes()
+        key = (folder_name, file_name, class_name)
+        entry = cls._classes.get(key)
+        if entry is not None:
+            return entry["class"]
+        with cls._lock:
+            entry = cls._classes.get(key)
+            if entry is None:
+                module_name, module_path = cls._resolve_module(folder_name, file_name)
+                module = importlib.import_module(module_name)
+                entry = {"class": getattr(module, class_name), "module_name": module_name,
+                         "module_path": module_path, "mtime": cls._mtime(module_path)}
+                cls._classes[key] = entry
+            return entry["class"]
+
+    @classmethod
+    def add_tool_folders_to_sys_path(cls):
+        """Add every tool folder to sys.path once, so tools can import the modules next to them."""
+        with cls._lock:
+            for tool_path in SYS_PATH_TOOL_PATHS:
+                if not os.path.exists(tool_path):
+                    continue
+                for folder_name in os.listdir(tool_path):
+                    folder_dir = os.path.join(tool_path, folder_name)
+                    if folder_dir not in cls._sys_path_folders and os.path.isdir(folder_dir):
+                        sys.path.append(folder_dir)
+                        cls._sys_path_folders.add(folder_dir)
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._classes.clear()
+            cls._root_mtimes = None
+
+    @staticmethod
+    def _resolve_module(folder_name: str, file_name: str):
+        for tool_path in TOOL_PATHS:
+            if os.path.exists(os.path.join(os.getcwd(), tool_path, folder_name)):
+                module_name = ".".join(tool_path.split("/") + [folder_name, file_name])
+                return module_name, os.path.join(os.getcwd(), tool_path, folder_name, file_name + ".py")
+        # Tools outside of the tool directories are imported from the tool folders added to sys.path
+        return f"{folder_name}.{file_name}", None
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return os.stat(path).st_mtime if path else None
+        except OSError:
+            return None
+
+    @classmethod
+    def check_for_changes(cls):
+        """Pick up installed, removed and changed tools, at most every TOOL_REGISTRY_CHECK_INTERVAL seconds."""
+        now = time.monotonic()
+        if now - cls._last_check < get_config_int("TOOL_REGISTRY_CHECK_INTERVAL", 10):
+            return
+        with cls._lock:
+            if now - cls._last_check < get_config_int("TOOL_REGISTRY_CHECK_INTERVAL", 10):
+                return
+            cls._last_check = now
+            root_mtimes = {tool_path: cls._mtime(tool_path) for tool_path in TOOL_PATHS}
+            if root_mtimes != cls._root_mtimes:
+                # Tool folders were installed or removed
+                cls._root_mtimes = root_mtimes
+                cls.add_tool_folders_to_sys_path()
+            for key, entry in list(cls._classes.items()):
+                if cls._mtime(entry["module_path"]) != entry["mtime"]:
+                    logger.info(f"Tool module {entry['module_name']} changed, importing it again")
+                    del cls._classes[key]
+                    sys.modules.pop(entry["module_name"], None)
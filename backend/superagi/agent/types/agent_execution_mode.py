@@ -0,0 +1,15 @@
+from enum import Enum
+
+
+class AgentExecutionMode(Enum):
+    STEP = 'STEP'
+    PERSISTENT = 'PERSISTENT'
+
+    @classmethod
+    def get_agent_execution_mode(cls, mode):
+        if mode is None:
+            raise ValueError("Execution mode cannot be None.")
+        mode = mode.upper()
+        if mode in cls.__members__:
+            return cls[mode]
+        raise ValueError(f"{mode} is not a valid execution mode.")
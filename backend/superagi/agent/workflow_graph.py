@@ -0,0 +1,293 @@
+import threading
+import time
+from types import MappingProxyType
+from typing import NamedTuple, Optional, Union
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from superagi.config.config import get_config_float
+from superagi.helper.redis_helper import get_redis_client
+from superagi.lib.logger import logger
+from superagi.models.workflows.agent_workflow import AgentWorkflow
+from superagi.models.workflows.agent_workflow_step import AgentWorkflowStep
+from superagi.models.workflows.agent_workflow_step_tool import AgentWorkflowStepTool
+from superagi.models.workflows.iteration_workflow import IterationWorkflow
+from superagi.models.workflows.iteration_workflow_step import IterationWorkflowStep
+
+WORKFLOW_GRAPH_VERSION_KEY = "agent_workflow_graph_version"
+WORKFLOW_CHANGED = "workflow_changed"
+COMPLETE = "COMPLETE"
+
+
+class WorkflowStepNode(NamedTuple):
+    id: int
+    agent_workflow_id: int
+    unique_id: str
+    step_type: str
+    action_type: str
+    action_reference_id: int
+    next_steps: tuple
+
+
+class WorkflowStepToolNode(NamedTuple):
+    id: int
+    tool_name: str
+    unique_id: str
+    input_instruction: str
+    output_instruction: str
+    history_enabled: bool
+    completion_prompt: str
+
+
+class IterationWorkflowNode(NamedTuple):
+    id: int
+    name: str
+    description: str
+    has_task_queue: bool
+
+
+class IterationWorkflowStepNode(NamedTuple):
+    id: int
+    iteration_workflow_id: int
+    unique_id: str
+    prompt: str
+    variables: str
+    output_type: str
+    step_type: str
+    next_step_id: int
+    history_enabled: bool
+    completion_prompt: str
+
+
+def _node(node_class, row):
+    values = {field: getattr(row, field) for field in node_class._fields}
+    if "next_steps" in values:
+        values["next_steps"] = tuple(MappingProxyType(dict(step)) for step in values["next_steps"] or [])
+    return node_class(**values)
+
+
+class CompiledWorkflow:
+    """An agent workflow with its steps and step tools, and its edges indexed by step and step response."""
+
+    def __init__(self, agent_workflow_id: int, steps: list, step_tools: list):
+        self.agent_workflow_id = agent_workflow_id
+        self.steps = MappingProxyType({step.id: step for step in steps})
+        self.steps_by_unique_id = MappingProxyType({step.unique_id: step for step in steps})
+        self.step_tools = MappingProxyType({step_tool.id: step_tool for step_tool in step_tools})
+        transitions = {}
+        for step in steps:
+            edges = {}
+            for next_step in step.next_steps:
+                # The first edge of a response wins, as when next_steps was scanned in order
+                edges.setdefault(str(next_step["step_response"]).lower(), str(next_step["step_id"]))
+            transitions[step.id] = MappingProxyType(edges)
+        self.transitions = MappingProxyType(transitions)
+
+    def next_step_unique_id(self, step_id: int, step_response: str) -> Optional[str]:
+        """Get the unique ID of the step following a step response, '-1' when the workflow is complete."""
+        edges = self.transitions.get(step_id, {})
+        unique_id = edges.get(step_response.lower())
+        if unique_id is None:
+            logger.info(f"Could not find next step for step_id: {step_id} and step_response: {step_response}")
+            unique_id = edges.get("default")
+        return unique_id
+
+
+class CompiledIterationWorkflow:
+    """An iteration workflow with its steps."""
+
+    def __init__(self, workflow: IterationWorkflowNode, steps: list):
+        self.workflow = workflow
+        self.steps = MappingProxyType({step.id: step for step in steps})
+        self.trigger_step = next((step for step in steps if step.step_type == "TRIGGER"), None)
+
+
+class WorkflowGraph:
+    """
+    Process-wide cache of the compiled agent and iteration workflows, used by the step handlers instead of
+    reading the workflow tables on every step.
+
+    A workflow is compiled with one query per table into immutable nodes, with its next_steps edges indexed so
+    a transition is a dictionary lookup. Commits that change a workflow table increment a version counter in
+    Redis, and every process drops its compiled workflows once it sees a new version. The version is read at most
+    every WORKFLOW_GRAPH_VERSION_CHECK_INTERVAL seconds.
+    """
+
+    _workflows = {}
+    _iteration_workflows = {}
+    _step_workflow_ids = {}
+    _iteration_step_workflow_ids = {}
+    _version = None
+    _version_checked_at = 0.0
+    _lock = threading.RLock()
+
+    @classmethod
+    def _check_version(cls):
+        now = time.monotonic()
+        if now - cls._version_checked_at < get_config_float("WORKFLOW_GRAPH_VERSION_CHECK_INTERVAL", 5):
+            return
+        try:
+            version = get_redis_client().get(WORKFLOW_GRAPH_VERSION_KEY)
+        except Exception as e:
+            logger.error(f"Unable to read the workflow graph version: {e}")
+            return
+        with cls._lock:
+            cls._version_checked_at = now
+            if version != cls._version:
+                cls._version = version
+                cls.clear()
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._workflows.clear()
+            cls._iteration_workflows.clear()
+            cls._step_workflow_ids.clear()
+            cls._iteration_step_workflow_ids.clear()
+
+    @classmethod
+    def invalidate(cls):
+        """Drop the compiled workflows in every process, after a workflow has been changed."""
+        cls.clear()
+        try:
+            get_redis_client().incr(WORKFLOW_GRAPH_VERSION_KEY)
+        except Exception as e:
+            logger.error(f"Unable to invalidate the workflow graph: {e}")
+
+    @classmethod
+    def get_workflow(cls, session, agent_workflow_id: int) -> CompiledWorkflow:
+        """
+        Get a compiled agent workflow, compiling it on the first use.
+
+        Args:
+            session: The database session.
+            agent_workflow_id (int): The ID of the agent workflow.
+
+        Returns:
+            CompiledWorkflow: The compiled workflow.
+        """
+        cls._check_version()
+        workflow = cls._workflows.get(agent_workflow_id)
+        if workflow is not None:
+            return workflow
+        steps = [_node(WorkflowStepNode, step) for step in session.query(AgentWorkflowStep).filter(
+            AgentWorkflowStep.agent_workflow_id == agent_workflow_id).all()]
+        step_tool_ids = {step.action_reference_id for step in steps if step.action_type == "TOOL"}
+        step_tools = [_node(WorkflowStepToolNode, step_tool) for step_tool in session.query(AgentWorkflowStepTool)
+                      .filter(AgentWorkflowStepTool.id.in_(step_tool_ids)).all()] if step_tool_ids else []
+        workflow = CompiledWorkflow(agent_workflow_id, steps, step_tools)
+        with cls._lock:
+            cls._workflows[agent_workflow_id] = workflow
+            for step in steps:
+                cls._step_workflow_ids[step.id] = agent_workflow_id
+        return workflow
+
+    @classmethod
+    def get_iteration_workflow(cls, session, iteration_workflow_id: int) -> CompiledIterationWorkflow:
+        """
+        Get a compiled iteration workflow, compiling it on the first use.
+
+        Args:
+            session: The database session.
+            iteration_workflow_id (int): The ID of the iteration workflow.
+
+        Returns:
+            CompiledIterationWorkflow: The compiled iteration workflow, None if it does not exist.
+        """
+        cls._check_version()
+        iteration_workflow = cls._iteration_workflows.get(iteration_workflow_id)
+        if iteration_workflow is not None:
+            return iteration_workflow
+        workflow = IterationWorkflow.find_by_id(session, iteration_workflow_id)
+        if workflow is None:
+            return None
+        steps = [_node(IterationWorkflowStepNode, step) for step in session.query(IterationWorkflowStep).filter(
+            IterationWorkflowStep.iteration_workflow_id == iteration_workflow_id).all()]
+        iteration_workflow = CompiledIterationWorkflow(_node(IterationWorkflowNode, workflow), steps)
+        with cls._lock:
+            cls._iteration_workflows[iteration_workflow_id] = iteration_workflow
+            for step in steps:
+                cls._iteration_step_workflow_ids[step.id] = iteration_workflow_id
+        return iteration_workflow
+
+    @classmethod
+    def get_step(cls, session, step_id: int) -> Optional[WorkflowStepNode]:
+        """Get an agent workflow step by ID."""
+        cls._check_version()
+        agent_workflow_id = cls._step_workflow_ids.get(step_id)
+        if agent_workflow_id is None:
+            agent_workflow_id = session.query(AgentWorkflowStep.agent_workflow_id) \
+                .filter(AgentWorkflowStep.id == step_id).scalar()
+            if agent_workflow_id is None:
+                return None
+        return cls.get_workflow(session, agent_workflow_id).steps.get(step_id)
+
+    @classmethod
+    def get_step_tool(cls, session, step: WorkflowStepNode) -> Optional[WorkflowStepToolNode]:
+        """Get the tool of an agent workflow step."""
+        return cls.get_workflow(session, step.agent_workflow_id).step_tools.get(step.action_reference_id)
+
+    @classmethod
+    def fetch_next_step(cls, session, step_id: int, step_response: str) -> Union[WorkflowStepNode, str, None]:
+        """
+        Get the step following a step response, see AgentWorkflowStep.fetch_next_step.
+
+        Args:
+            session: The database session.
+            step_id (int): The ID of the current agent workflow step.
+            step_response (str): The response of the current step.
+
+        Returns:
+            The next step, "COMPLETE" if the workflow is complete or None if the step has no matching edge.
+        """
+        step = cls.get_step(session, step_id)
+        if step is None:
+            return None
+        workflow = cls.get_workflow(session, step.agent_workflow_id)
+        unique_id = workflow.next_step_unique_id(step_id, step_response)
+        if unique_id is None:
+            return None
+        if unique_id == "-1":
+            return COMPLETE
+        next_step = workflow.steps_by_unique_id.get(unique_id)
+        if next_step is None:
+            # Edges to the steps of another workflow are resolved from the database
+            next_step = AgentWorkflowStep.find_by_unique_id(session, unique_id)
+            return cls.get_step(session, next_step.id) if next_step is not None else None
+        return next_step
+
+    @classmethod
+    def get_iteration_step(cls, session, iteration_step_id: int) -> Optional[IterationWorkflowStepNode]:
+        """Get an iteration workflow step by ID."""
+        cls._check_version()
+        iteration_workflow_id = cls._iteration_step_workflow_ids.get(iteration_step_id)
+        if iteration_workflow_id is None:
+            iteration_workflow_id = session.query(IterationWorkflowStep.iteration_workflow_id) \
+                .filter(IterationWorkflowStep.id == iteration_step_id).scalar()
+            if iteration_workflow_id is None:
+                return None
+        iteration_workflow = cls.get_iteration_workflow(session, iteration_workflow_id)
+        return iteration_workflow.steps.get(iteration_step_id) if iteration_workflow is not None else None
+
+
+def _workflow_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info[WORKFLOW_CHANGED] = True
+
+
+for _model in [AgentWorkflow, AgentWorkflowStep, AgentWorkflowStepTool, IterationWorkflow, IterationWorkflowStep]:
+    for _event_name in ["after_insert", "after_update", "after_delete"]:
+        event.listen(_model, _event_name, _workflow_changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop(WORKFLOW_CHANGED, False):
+        WorkflowGraph.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop(WORKFLOW_CHANGED, None)
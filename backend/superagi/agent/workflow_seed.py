@@ -1,5 +1,7 @@
 from superagi.agent.agent_prompt_builder import AgentPromptBuilder
 from superagi.agent.agent_prompt_template import AgentPromptTemplate
+# Registers the listeners that invalidate the compiled workflows when the seeds change them
+import superagi.agent.workflow_graph  # noqa: F401
 from superagi.models.workflows.agent_workflow import AgentWorkflow
 from superagi.models.workflows.agent_workflow_step import AgentWorkflowStep
 from superagi.models.workflows.iteration_workflow import IterationWorkflow
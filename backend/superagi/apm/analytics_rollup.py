@@ -0,0 +1,380 @@
+import argparse
+import sys
+from datetime import datetime
+from typing import List, Dict
+
+from sqlalchemy import func, Integer
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import sessionmaker
+
+from superagi.helper.redis_helper import get_redis_client
+from superagi.lib.logger import logger
+from superagi.models.analytics_agent_rollup import AnalyticsAgentRollup
+from superagi.models.analytics_daily_rollup import AnalyticsDailyRollup
+from superagi.models.analytics_run_rollup import AnalyticsRunRollup
+from superagi.models.db import connect_db, create_tables
+from superagi.models.events import Event
+
+RUN_END_EVENTS = ('run_completed', 'run_iteration_limit_crossed')
+ROLLUP_MODELS = (AnalyticsAgentRollup, AnalyticsRunRollup, AnalyticsDailyRollup)
+BACKFILL_PENDING_KEY = "analytics_rollups_backfill_pending"
+BACKFILL_LOCK_KEY = "analytics_rollups_backfill_lock"
+BACKFILL_LOCK_TTL = 60 * 60
+
+
+class AnalyticsRollup:
+    """
+    Maintains the analytics rollup tables from the events, so the analytics endpoints do not aggregate the raw
+    events table on every request.
+
+    Events are applied in a savepoint of the transaction that inserts them, so the rollups are committed with the
+    events, and a failed rollup update only leaves the rollups to be backfilled. Counters are upserted with
+    INSERT ... ON CONFLICT DO UPDATE, which keeps concurrent writers consistent. The rollup tables are created by
+    create_tables, when a worker starts and before a backfill or a check. Tables created on a deployment that
+    already has events are backfilled once from the events by backfill_if_pending, so the analytics do not drop to
+    zero after an upgrade.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    @staticmethod
+    def create_tables() -> bool:
+        """
+        Create the rollup tables that do not exist yet, and mark the rollups for a backfill if any was created.
+
+        Returns:
+            bool: True if a backfill of the rollups is pending.
+        """
+        redis_client = get_redis_client()
+        if create_tables(ROLLUP_MODELS):
+            redis_client.set(BACKFILL_PENDING_KEY, 1)
+            return True
+        return bool(redis_client.exists(BACKFILL_PENDING_KEY))
+
+    def backfill_if_pending(self) -> int:
+        """
+        Rebuild the rollups from the events if a backfill is pending. Only one backfill runs at a time, and a
+        backfill that fails stays pending.
+
+        Returns:
+            int: The number of events applied, 0 if no backfill was pending.
+        """
+        redis_client = get_redis_client()
+        if not redis_client.set(BACKFILL_LOCK_KEY, 1, nx=True, ex=BACKFILL_LOCK_TTL):
+            return 0
+        try:
+            if not redis_client.exists(BACKFILL_PENDING_KEY):
+                return 0
+            applied = self.rebuild()
+            redis_client.delete(BACKFILL_PENDING_KEY)
+            return applied
+        finally:
+            redis_client.delete(BACKFILL_LOCK_KEY)
+
+    @staticmethod
+    def event_values(event: Event) -> dict:
+        """Return the values of an Event row in the form accepted by apply."""
+        return {"event_name": event.event_name, "event_property": event.event_property, "agent_id": event.agent_id,
+                "org_id": event.org_id, "created_at": event.created_at}
+
+    def apply(self, events: List[dict]):
+        """
+        Apply events to the rollups, in order. The caller commits the session.
+
+        Args:
+            events (List[dict]): The events with 'event_name', 'event_property', 'agent_id', 'org_id' and
+                'created_at'.
+        """
+        events = [event for event in events if event.get("org_id") is not None and event.get("agent_id") is not None]
+        if not events:
+            return
+        self._apply_agents_created([event for event in events if event["event_name"] == "agent_created"])
+        self._apply_runs_created([event for event in events if event["event_name"] == "run_created"])
+        self._apply_runs_ended([event for event in events if event["event_name"] in RUN_END_EVENTS])
+        self._apply_daily_counters(events)
+
+    def _apply_agents_created(self, events: List[dict]):
+        agents = {}
+        for event in events:
+            event_property = event["event_property"] or {}
+            agents[(event["org_id"], event["agent_id"])] = {
+                "org_id": event["org_id"], "agent_id": event["agent_id"],
+                "agent_name": event_property.get("agent_name"), "model": event_property.get("model"),
+                "runs_completed": 0, "total_tokens": 0, "total_calls": 0, "run_time_total": 0, "run_time_count": 0,
+            }
+        self._upsert(AnalyticsAgentRollup, 'uq_analytics_agent_rollups_agent', list(agents.values()),
+                     lambda table, excluded: {"agent_name": excluded.agent_name, "model": excluded.model})
+
+    def _apply_runs_created(self, events: List[dict]):
+        runs = {}
+        for event in events:
+            agent_execution_id = self._agent_execution_id(event)
+            if agent_execution_id is None:
+                continue
+            key = (event["org_id"], agent_execution_id)
+            started_at = event["created_at"]
+            if key in runs:
+                started_at = min(started_at, runs[key]["started_at"])
+            runs[key] = {"org_id": event["org_id"], "agent_id": event["agent_id"],
+                         "agent_execution_id": agent_execution_id,
+                         "agent_execution_name": (event["event_property"] or {}).get("agent_execution_name"),
+                         "started_at": started_at, "ended_at": None, "tokens_consumed": None, "calls": None}
+        self._upsert(AnalyticsRunRollup, 'uq_analytics_run_rollups_execution', list(runs.values()),
+                     lambda table, excluded: {
+                         "agent_execution_name": excluded.agent_execution_name,
+                         # least ignores NULLs, so runs ended before their run_created event get their start
+                         "started_at": func.least(table.c.started_at, excluded.started_at),
+                     })
+
+    def _apply_runs_ended(self, events: List[dict]):
+        events = [event for event in events if self._agent_execution_id(event) is not None]
+        if not events:
+            return
+        keys = {(event["org_id"], self._agent_execution_id(event)) for event in events}
+        existing_runs = self.session.query(AnalyticsRunRollup.org_id, AnalyticsRunRollup.agent_execution_id,
+                                           AnalyticsRunRollup.started_at, AnalyticsRunRollup.ended_at) \
+            .filter(AnalyticsRunRollup.org_id.in_({org_id for org_id, _ in keys}),
+                    AnalyticsRunRollup.agent_execution_id.in_({run_id for _, run_id in keys})) \
+            .with_for_update().all()
+        run_times = {(run.org_id, run.agent_execution_id): (run.started_at, run.ended_at) for run in existing_runs}
+
+        runs = {}
+        agents = {}
+        for event in events:
+            event_property = event["event_property"] or {}
+            key = (event["org_id"], self._agent_execution_id(event))
+            tokens, calls = self._int_property(event_property, "tokens_consumed"), \
+                self._int_property(event_property, "calls")
+            started_at, ended_at = run_times.get(key, (None, None))
+            agent = agents.setdefault((event["org_id"], event["agent_id"]), {
+                "org_id": event["org_id"], "agent_id": event["agent_id"], "agent_name": None, "model": None,
+                "runs_completed": 0, "total_tokens": 0, "total_calls": 0, "run_time_total": 0, "run_time_count": 0,
+            })
+            agent["runs_completed"] += 1
+            agent["total_tokens"] += tokens
+            agent["total_calls"] += calls
+            # The run time of a run is only counted once, from its start to its first end event
+            if started_at is not None and ended_at is None:
+                agent["run_time_total"] += (event["created_at"] - started_at).total_seconds()
+                agent["run_time_count"] += 1
+            run_times[key] = (started_at, event["created_at"])
+            runs[key] = {"org_id": event["org_id"], "agent_id": event["agent_id"], "agent_execution_id": key[1],
+                         "agent_execution_name": event_property.get("name"), "started_at": None,
+                         "ended_at": event["created_at"], "tokens_consumed": tokens, "calls": calls}
+
+        self._upsert(AnalyticsRunRollup, 'uq_analytics_run_rollups_execution', list(runs.values()),
+                     lambda table, excluded: {
+                         "agent_execution_name": func.coalesce(table.c.agent_execution_name,
+                                                               excluded.agent_execution_name),
+                         "ended_at": func.greatest(table.c.ended_at, excluded.ended_at),
+                         "tokens_consumed": excluded.tokens_consumed,
+                         "calls": excluded.calls,
+                     })
+        self._upsert(AnalyticsAgentRollup, 'uq_analytics_agent_rollups_agent', list(agents.values()),
+                     lambda table, excluded: {
+                         counter: getattr(table.c, counter) + getattr(excluded, counter)
+                         for counter in ("runs_completed", "total_tokens", "total_calls", "run_time_total",
+                                         "run_time_count")
+                     })
+
+    def _apply_daily_counters(self, events: List[dict]):
+        agent_ids = {event["agent_id"] for event in events}
+        models = {(row.org_id, row.agent_id): row.model or '' for row in
+                  self.session.query(AnalyticsAgentRollup.org_id, AnalyticsAgentRollup.agent_id,
+                                     AnalyticsAgentRollup.model)
+                  .filter(AnalyticsAgentRollup.agent_id.in_(agent_ids)).all()}
+        counters = {}
+        for event in events:
+            event_property = event["event_property"] or {}
+            tool_name, knowledge_name = '', ''
+            if event["event_name"] == "tool_used":
+                tool_name = event_property.get("tool_name") or ''
+            elif event["event_name"] == "knowledge_picked":
+                knowledge_name = event_property.get("knowledge_name") or ''
+            elif event["event_name"] not in RUN_END_EVENTS:
+                continue
+            model = models.get((event["org_id"], event["agent_id"]), '')
+            key = (event["org_id"], event["created_at"].date(), event["agent_id"], model, tool_name, knowledge_name)
+            row = counters.setdefault(key, dict(zip(("org_id", "day", "agent_id", "model", "tool_name",
+                                                     "knowledge_name"), key),
+                                                runs_completed=0, tokens=0, calls=0, tool_calls=0,
+                                                knowledge_picks=0))
+            if event["event_name"] == "tool_used":
+                row["tool_calls"] += 1
+            elif event["event_name"] == "knowledge_picked":
+                row["knowledge_picks"] += 1
+            else:
+                row["runs_completed"] += 1
+                row["tokens"] += self._int_property(event_property, "tokens_consumed")
+                row["calls"] += self._int_property(event_property, "calls")
+        self._upsert(AnalyticsDailyRollup, 'uq_analytics_daily_rollups_key', list(counters.values()),
+                     lambda table, excluded: {
+                         counter: getattr(table.c, counter) + getattr(excluded, counter)
+                         for counter in ("runs_completed", "tokens", "calls", "tool_calls", "knowledge_picks")
+                     })
+
+    def _upsert(self, model, constraint: str, rows: List[dict], build_update):
+        # Rows are aggregated by key beforehand, ON CONFLICT cannot update the same row twice in one statement
+        if not rows:
+            return
+        now = datetime.utcnow()
+        for row in rows:
+            row.setdefault("created_at", now)
+            row["updated_at"] = now
+        statement = pg_insert(model.__table__)
+        update = build_update(model.__table__, statement.excluded)
+        update["updated_at"] = statement.excluded.updated_at
+        self.session.execute(statement.values(rows).on_conflict_do_update(constraint=constraint, set_=update))
+
+    @staticmethod
+    def _agent_execution_id(event: dict):
+        agent_execution_id = (event["event_property"] or {}).get("agent_execution_id")
+        try:
+            return int(agent_execution_id) if agent_execution_id is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _int_property(event_property: dict, key: str) -> int:
+        try:
+            return int(event_property.get(key) or 0)
+        except (TypeError, ValueError):
+            return 0
+
+    def rebuild(self, org_id: int = None, batch_size: int = 1000) -> int:
+        """
+        Rebuild the rollups from the raw events, in a single transaction.
+
+        Args:
+            org_id (int): The organisation to rebuild, None rebuilds every organisation.
+            batch_size (int): The number of events read per query.
+
+        Returns:
+            int: The number of events applied.
+        """
+        try:
+            for model in ROLLUP_MODELS:
+                query = self.session.query(model)
+                if org_id is not None:
+                    query = query.filter(model.org_id == org_id)
+                query.delete(synchronize_session=False)
+
+            applied = 0
+            last_event_id = 0
+            while True:
+                query = self.session.query(Event).filter(Event.id > last_event_id)
+                if org_id is not None:
+                    query = query.filter(Event.org_id == org_id)
+                events = query.order_by(Event.id).limit(batch_size).all()
+                if not events:
+                    break
+                self.apply([self.event_values(event) for event in events])
+                applied += len(events)
+                last_event_id = events[-1].id
+                self.session.expunge_all()
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return applied
+
+    def check_consistency(self, org_id: int = None) -> Dict[str, List[dict]]:
+        """
+        Compare the rollup counters with aggregates of the raw events.
+
+        Args:
+            org_id (int): The organisation to check, None checks every organisation.
+
+        Returns:
+            Dict[str, List[dict]]: The mismatches of the 'agents', 'tools' and 'knowledge' counters, each with the
+                value computed from the events and the value of the rollup. Empty lists mean the rollups are
+                consistent.
+        """
+        def by_org(query, model):
+            return query.filter(model.org_id == org_id) if org_id is not None else query
+
+        agent_events = by_org(self.session.query(
+            Event.org_id, Event.agent_id,
+            func.count(Event.id),
+            func.coalesce(func.sum(Event.event_property['tokens_consumed'].astext.cast(Integer)), 0),
+            func.coalesce(func.sum(Event.event_property['calls'].astext.cast(Integer)), 0),
+        ).filter(Event.event_name.in_(RUN_END_EVENTS), Event.agent_id.isnot(None)), Event) \
+            .group_by(Event.org_id, Event.agent_id).all()
+        agent_rollups = by_org(self.session.query(
+            AnalyticsAgentRollup.org_id, AnalyticsAgentRollup.agent_id, AnalyticsAgentRollup.runs_completed,
+            AnalyticsAgentRollup.total_tokens, AnalyticsAgentRollup.total_calls,
+        ), AnalyticsAgentRollup).all()
+
+        tool_events = by_org(self.session.query(
+            Event.org_id, Event.event_property['tool_name'].astext, func.count(Event.id)
+        ).filter(Event.event_name == 'tool_used', Event.agent_id.isnot(None)), Event) \
+            .group_by(Event.org_id, Event.event_property['tool_name'].astext).all()
+        tool_rollups = by_org(self.session.query(
+            AnalyticsDailyRollup.org_id, AnalyticsDailyRollup.tool_name, func.sum(AnalyticsDailyRollup.tool_calls)
+        ).filter(AnalyticsDailyRollup.tool_name != ''), AnalyticsDailyRollup) \
+            .group_by(AnalyticsDailyRollup.org_id, AnalyticsDailyRollup.tool_name).all()
+
+        knowledge_events = by_org(self.session.query(
+            Event.org_id, Event.event_property['knowledge_name'].astext, func.count(Event.id)
+        ).filter(Event.event_name == 'knowledge_picked', Event.agent_id.isnot(None)), Event) \
+            .group_by(Event.org_id, Event.event_property['knowledge_name'].astext).all()
+        knowledge_rollups = by_org(self.session.query(
+            AnalyticsDailyRollup.org_id, AnalyticsDailyRollup.knowledge_name,
+            func.sum(AnalyticsDailyRollup.knowledge_picks)
+        ).filter(AnalyticsDailyRollup.knowledge_name != ''), AnalyticsDailyRollup) \
+            .group_by(AnalyticsDailyRollup.org_id, AnalyticsDailyRollup.knowledge_name).all()
+
+        return {
+            "agents": self._compare({(row[0], row[1]): tuple(row[2:]) for row in agent_events},
+                                    {(row[0], row[1]): tuple(row[2:]) for row in agent_rollups if row[2]},
+                                    ("org_id", "agent_id"), ("runs_completed", "total_tokens", "total_calls")),
+            "tools": self._compare({(row[0], row[1] or ''): (row[2],) for row in tool_events},
+                                   {(row[0], row[1]): (row[2],) for row in tool_rollups},
+                                   ("org_id", "tool_name"), ("tool_calls",)),
+            "knowledge": self._compare({(row[0], row[1] or ''): (row[2],) for row in knowledge_events},
+                                       {(row[0], row[1]): (row[2],) for row in knowledge_rollups},
+                                       ("org_id", "knowledge_name"), ("knowledge_picks",)),
+        }
+
+    @staticmethod
+    def _compare(event_counters: dict, rollup_counters: dict, key_names: tuple, counter_names: tuple) -> List[dict]:
+        mismatches = []
+        for key in sorted(set(event_counters) | set(rollup_counters), key=str):
+            event_values = event_counters.get(key, (0,) * len(counter_names))
+            rollup_values = rollup_counters.get(key, (0,) * len(counter_names))
+            for name, event_value, rollup_value in zip(counter_names, event_values, rollup_values):
+                if int(event_value or 0) != int(rollup_value or 0):
+                    mismatches.append({**dict(zip(key_names, key)), "counter": name, "events": int(event_value or 0),
+                                       "rollup": int(rollup_value or 0)})
+        return mismatches
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Backfill or check the analytics rollups.")
+    parser.add_argument("command", choices=["backfill", "check"])
+    parser.add_argument("--org-id", type=int, default=None, help="Only process this organisation.")
+    args = parser.parse_args(argv)
+
+    AnalyticsRollup.create_tables()
+    Session = sessionmaker(bind=connect_db())
+    with Session() as session:
+        rollup = AnalyticsRollup(session)
+        if args.command == "backfill":
+            applied = rollup.rebuild(org_id=args.org_id)
+            if args.org_id is None:
+                get_redis_client().delete(BACKFILL_PENDING_KEY)
+            logger.info(f"Rebuilt the analytics rollups from {applied} events")
+            return 0
+        mismatches = rollup.check_consistency(org_id=args.org_id)
+    for name, counter_mismatches in mismatches.items():
+        for mismatch in counter_mismatches:
+            logger.warning(f"Analytics rollup mismatch in {name}: {mismatch}")
+    if any(mismatches.values()):
+        return 1
+    logger.info("The analytics rollups are consistent with the events")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+import json
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from superagi.apm.analytics_rollup import AnalyticsRollup
+from superagi.config.config import get_config
+from superagi.helper.redis_helper import get_redis_client
+from superagi.lib.logger import logger
+from superagi.models.call_logs import CallLogs
+from superagi.models.events import Event
+from superagi.types.apm_write_mode import ApmWriteMode
+
+APM_BUFFER_KEY = "apm_buffer"
+APM_PROCESSING_KEY = "apm_buffer_processing"
+APM_FLUSH_LOCK_KEY = "apm_buffer_flush_lock"
+APM_FLUSH_LOCK_TTL = 60
+
+# Moves up to ARGV[1] rows from the head of the buffer to the processing list and returns them
+CLAIM_BATCH_SCRIPT = """
+local rows = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #rows > 0 then
+    redis.call('RPUSH', KEYS[2], unpack(rows))
+    redis.call('LTRIM', KEYS[1], #rows, -1)
+end
+return rows
+"""
+
+
+class ApmWriter:
+    """
+    Buffers APM rows (events and call logs) in Redis and writes them to Postgres in bulk.
+
+    Rows are appended to a Redis list and flushed with multi-row INSERTs by the flush_apm_buffer task, once the
+    buffer holds APM_FLUSH_SIZE rows or every APM_FLUSH_INTERVAL seconds. A batch is moved to a processing list
+    before it is inserted and only dropped after the commit, so a crashed flush is replayed by the next one
+    (at-least-once). APM_WRITE_MODE=SYNC writes rows with the caller's session instead, which tests rely on.
+    Events are applied to the analytics rollups in a savepoint after they are inserted, so a rollup failure never
+    loses an event.
+    """
+
+    MODELS = {Event.__tablename__: Event, CallLogs.__tablename__: CallLogs}
+
+    def __init__(self, session):
+        self.session = session
+
+    @staticmethod
+    def is_buffered() -> bool:
+        return ApmWriteMode.get_apm_write_mode(get_config("APM_WRITE_MODE", "BUFFERED")) == ApmWriteMode.BUFFERED
+
+    def write(self, model, **values):
+        """
+        Write an APM row, buffered unless APM_WRITE_MODE is SYNC or Redis is unavailable.
+
+        Args:
+            model: The model of the row, Event or CallLogs.
+            **values: The column values of the row.
+
+        Returns:
+            The row written with the session in sync mode, None when buffered.
+        """
+        if self.is_buffered():
+            now = datetime.utcnow().isoformat()
+            row = json.dumps({"table": model.__tablename__, "values": {"created_at": now, "updated_at": now,
+                                                                       **values}})
+            try:
+                buffer_size = get_redis_client().rpush(APM_BUFFER_KEY, row)
+            except Exception as e:
+                logger.error(f"Unable to buffer APM row, writing it synchronously: {e}")
+            else:
+                if buffer_size >= int(get_config("APM_FLUSH_SIZE", 500)):
+                    self._schedule_flush()
+                return None
+        return self._write_sync(model, values)
+
+    def _write_sync(self, model, values: dict):
+        try:
+            row = model(**values)
+            self.session.add(row)
+            if model is Event:
+                self.session.flush()
+                self._apply_rollups(self.session, [AnalyticsRollup.event_values(row)])
+            self.session.commit()
+            return row
+        except SQLAlchemyError as err:
+            self.session.rollback()
+            logger.error(f"Error while writing {model.__tablename__}: {str(err)}")
+            return None
+
+    @staticmethod
+    def _apply_rollups(session, events: list):
+        """Apply inserted events to the analytics rollups in a savepoint, which is rolled back on its own on failure."""
+        if not events:
+            return
+        try:
+            with session.begin_nested():
+                AnalyticsRollup(session).apply(events)
+        except SQLAlchemyError as err:
+            logger.error(f"Unable to apply {len(events)} events to the analytics rollups, run the rollup backfill: "
+                         f"{str(err)}")
+
+    @staticmethod
+    def _schedule_flush():
+        from superagi.worker import flush_apm_buffer
+        try:
+            flush_apm_buffer.delay()
+        except Exception as e:
+            logger.error(f"Unable to schedule APM flush: {e}")
+
+    @classmethod
+    def flush(cls, session, batch_size: int = None, max_batches: int = 100) -> int:
+        """
+        Insert the buffered rows into Postgres in batches. Only one flush runs at a time.
+
+        Args:
+            session: The database session.
+            batch_size (int): The number of rows inserted per batch, APM_FLUSH_SIZE by default.
+            max_batches (int): The maximum number of batches written by this flush.
+
+        Returns:
+            int: The number of rows written.
+        """
+        batch_size = batch_size or int(get_config("APM_FLUSH_SIZE", 500))
+        redis_client = get_redis_client()
+        if not redis_client.set(APM_FLUSH_LOCK_KEY, 1, nx=True, ex=APM_FLUSH_LOCK_TTL):
+            return 0
+        claim_batch = redis_client.register_script(CLAIM_BATCH_SCRIPT)
+        written = 0
+        try:
+            for _ in range(max_batches):
+                # Rows left in the processing list were claimed by a flush that did not commit
+                rows = redis_client.lrange(APM_PROCESSING_KEY, 0, -1) or \
+                    claim_batch(keys=[APM_BUFFER_KEY, APM_PROCESSING_KEY], args=[batch_size])
+                if not rows:
+                    break
+                cls._insert_rows(session, rows)
+                redis_client.delete(APM_PROCESSING_KEY)
+                redis_client.expire(APM_FLUSH_LOCK_KEY, APM_FLUSH_LOCK_TTL)
+                written += len(rows)
+        finally:
+            redis_client.delete(APM_FLUSH_LOCK_KEY)
+        return written
+
+    @classmethod
+    def _insert_rows(cls, session, rows: list):
+        values_by_table = {}
+        for row in rows:
+            row = json.loads(row)
+            values = row["values"]
+            values["created_at"] = datetime.fromisoformat(values["created_at"])
+            values["updated_at"] = datetime.fromisoformat(values["updated_at"])
+            values_by_table.setdefault(row["table"], []).append(values)
+        try:
+            for table, values in values_by_table.items():
+                session.execute(insert(cls.MODELS[table]), values)
+            cls._apply_rollups(session, values_by_table.get(Event.__tablename__, []))
+            session.commit()
+            return
+        except SQLAlchemyError as err:
+            session.rollback()
+            logger.error(f"Error while writing APM batch, writing rows one by one: {str(err)}")
+        # Rows that cannot be written on their own are dropped, so they do not block the buffer
+        for table, values in values_by_table.items():
+            for row_values in values:
+                cls._insert_row(session, table, row_values)
+
+    @classmethod
+    def _insert_row(cls, session, table: str, values: dict):
+        try:
+            session.execute(insert(cls.MODELS[table]), [values])
+            if table == Event.__tablename__:
+                cls._apply_rollups(session, [values])
+            session.commit()
+        except SQLAlchemyError as err:
+            session.rollback()
+            logger.error(f"Dropping APM row of {table}: {str(err)}")
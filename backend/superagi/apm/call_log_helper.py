@@ -3,6 +3,8 @@ from typing import Optional
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 from sqlalchemy import func, distinct
+
+from superagi.apm.apm_writer import ApmWriter
 from superagi.models.call_logs import CallLogs
 from superagi.models.agent import Agent
 from superagi.models.tool import Tool
@@ -15,21 +17,13 @@ class CallLogHelper:
         self.organisation_id = organisation_id
 
     def create_call_log(self, agent_execution_name: str, agent_id: int, tokens_consumed: int, tool_used: str, model: str) -> Optional[CallLogs]:
-        try:
-            call_log = CallLogs(
-                agent_execution_name=agent_execution_name,
-                agent_id=agent_id,
-                tokens_consumed=tokens_consumed,
-                tool_used=tool_used,
-                model=model,
-                org_id=self.organisation_id,
-            )
-            self.session.add(call_log)
-            self.session.commit()
-            return call_log
-        except SQLAlchemyError as err:
-            logging.error(f"Error while creating call log: {str(err)}")
-            return None
+        return ApmWriter(self.session).write(CallLogs,
+                                             agent_execution_name=agent_execution_name,
+                                             agent_id=agent_id,
+                                             tokens_consumed=tokens_consumed,
+                                             tool_used=tool_used,
+                                             model=model,
+                                             org_id=self.organisation_id)
 
     def fetch_data(self, model: str):
         try:
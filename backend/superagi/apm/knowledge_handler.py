@@ -1,11 +1,11 @@
 from sqlalchemy.orm import Session
+from superagi.models.analytics_daily_rollup import AnalyticsDailyRollup
 from superagi.models.events import Event
 from superagi.models.knowledges import Knowledges
 from sqlalchemy import Integer, or_, label, case, and_
 from fastapi import HTTPException
 from typing import List, Dict, Union, Any
 from sqlalchemy.sql import func
-from sqlalchemy.orm import aliased
 from superagi.models.agent_config import AgentConfiguration
 from superagi.models.agent_execution_config import AgentExecutionConfiguration
 import pytz
@@ -23,36 +23,28 @@ class KnowledgeHandler:
         is_knowledge_valid = self.session.query(Knowledges.id).filter_by(name=knowledge_name).filter(Knowledges.organisation_id == self.organisation_id).first()
         if not is_knowledge_valid:
             raise HTTPException(status_code=404, detail="Knowledge not found")
-        EventAlias = aliased(Event)
+        knowledge_agents = self.session.query(AnalyticsDailyRollup.agent_id).filter(
+            AnalyticsDailyRollup.org_id == self.organisation_id,
+            AnalyticsDailyRollup.knowledge_name == knowledge_name,
+            AnalyticsDailyRollup.knowledge_picks > 0
+        )
 
-        knowledge_used_event = self.session.query(
-            Event.event_property['knowledge_name'].label('knowledge_name'),
-            func.count(Event.agent_id.distinct()).label('knowledge_unique_agents')
-        ).filter(
-            Event.event_name == 'knowledge_picked',
-            Event.org_id == self.organisation_id,
-            Event.event_property['knowledge_name'].astext == knowledge_name
-        ).group_by(
-            Event.event_property['knowledge_name']
-        ).first()
+        knowledge_unique_agents = knowledge_agents.distinct().count()
 
-        if knowledge_used_event is None:
+        if not knowledge_unique_agents:
             return {}
 
+        knowledge_calls = self.session.query(
+            func.coalesce(func.sum(AnalyticsDailyRollup.tool_calls), 0)
+        ).filter(
+            AnalyticsDailyRollup.org_id == self.organisation_id,
+            AnalyticsDailyRollup.tool_name == 'Knowledge Search',
+            AnalyticsDailyRollup.agent_id.in_(knowledge_agents)
+        ).scalar()
+
         knowledge_data = {
-                'knowledge_unique_agents': knowledge_used_event.knowledge_unique_agents,
-                'knowledge_calls': self.session.query(
-                    EventAlias
-                ).filter(
-                    EventAlias.event_property['tool_name'].astext == 'Knowledge Search',
-                    EventAlias.event_name == 'tool_used',
-                    EventAlias.org_id == self.organisation_id,
-                    EventAlias.agent_id.in_(self.session.query(Event.agent_id).filter(
-                        Event.event_name == 'knowledge_picked',
-                        Event.org_id == self.organisation_id,
-                        Event.event_property['knowledge_name'].astext == knowledge_name
-                    ))
-                ).count()
+                'knowledge_unique_agents': knowledge_unique_agents,
+                'knowledge_calls': int(knowledge_calls)
             }
 
         return knowledge_data
@@ -1,8 +1,9 @@
 from typing import List, Dict, Union
 from sqlalchemy import func, distinct, and_
 from sqlalchemy.orm import Session
-from sqlalchemy import Integer, String
+from sqlalchemy import Integer
 from fastapi import HTTPException
+from superagi.models.analytics_daily_rollup import AnalyticsDailyRollup
 from superagi.models.events import Event
 from superagi.models.tool import Tool
 from superagi.models.toolkit import Toolkit
@@ -27,26 +28,14 @@ class ToolsHandler:
 
     def calculate_tool_usage(self) -> List[Dict[str, int]]:
         tool_usage = []
-        tool_used_subquery = self.session.query(
-            Event.event_property['tool_name'].label('tool_name'),
-            Event.agent_id
-        ).filter_by(event_name="tool_used", org_id=self.organisation_id).subquery()
-
-        agent_count = self.session.query(
-            tool_used_subquery.c.tool_name,
-            func.count(func.distinct(tool_used_subquery.c.agent_id)).label('unique_agents')
-        ).group_by(tool_used_subquery.c.tool_name).subquery()
-
-        total_usage = self.session.query(
-            tool_used_subquery.c.tool_name,
-            func.count(tool_used_subquery.c.tool_name).label('total_usage')
-        ).group_by(tool_used_subquery.c.tool_name).subquery()
-
         query = self.session.query(
-            agent_count.c.tool_name,
-            agent_count.c.unique_agents,
-            total_usage.c.total_usage,
-        ).join(total_usage, total_usage.c.tool_name == agent_count.c.tool_name)
+            AnalyticsDailyRollup.tool_name,
+            func.count(func.distinct(AnalyticsDailyRollup.agent_id)).label('unique_agents'),
+            func.sum(AnalyticsDailyRollup.tool_calls).label('total_usage')
+        ).filter(
+            AnalyticsDailyRollup.org_id == self.organisation_id,
+            AnalyticsDailyRollup.tool_name != ''
+        ).group_by(AnalyticsDailyRollup.tool_name)
 
         tool_and_toolkit = self.get_tool_and_toolkit()
 
@@ -70,22 +59,18 @@ class ToolsHandler:
             raise HTTPException(status_code=404, detail="Tool not found")
 
         tool_name_event = self.session.query(
-            Event.event_property['tool_name'].cast(String).label('tool_name'), 
-            func.count(Event.id).label('tool_calls'),
-            func.count(distinct(Event.agent_id)).label('tool_unique_agents')
+            func.sum(AnalyticsDailyRollup.tool_calls).label('tool_calls'),
+            func.count(distinct(AnalyticsDailyRollup.agent_id)).label('tool_unique_agents')
         ).filter(
-            Event.event_name == 'tool_used',
-            Event.org_id == self.organisation_id,
-            Event.event_property['tool_name'].astext == tool_name
-        ).group_by(
-            Event.event_property['tool_name'].cast(String)
+            AnalyticsDailyRollup.org_id == self.organisation_id,
+            AnalyticsDailyRollup.tool_name == tool_name
         ).first()
 
         tool_data = {}
         tool_calls = 0
         tool_unique_agents = 0
 
-        if tool_name_event:
+        if tool_name_event and tool_name_event.tool_calls:
             tool_calls += tool_name_event.tool_calls
             tool_unique_agents += tool_name_event.tool_unique_agents
 
@@ -0,0 +1,26 @@
+"""
+Micro-benchmark of config lookups, run with `python -m superagi.config.benchmark`.
+
+Compares a lookup through the pydantic settings dict, which config lookups used before, with a lookup in the
+config snapshot used by get_config.
+"""
+import timeit
+
+from superagi.config import config
+
+
+def _per_lookup_microseconds(lookup, number: int) -> float:
+    return min(timeit.repeat(lookup, number=number, repeat=5)) / number * 1e6
+
+
+def run(key: str = "REDIS_URL", number: int = 10000):
+    settings_dict = _per_lookup_microseconds(lambda: config._config_instance.get_config(key), number)
+    snapshot = _per_lookup_microseconds(lambda: config.get_config(key), number)
+    print(f"config keys: {len(config._config_snapshot)}")
+    print(f"settings dict lookup: {settings_dict:.3f} us")
+    print(f"snapshot lookup:      {snapshot:.3f} us")
+    print(f"speedup:              {settings_dict / snapshot:.0f}x")
+
+
+if __name__ == "__main__":
+    run()
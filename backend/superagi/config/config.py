@@ -1,4 +1,9 @@
 import os
+import threading
+import time
+from types import MappingProxyType
+from typing import Callable, Mapping
+
 from pydantic import BaseSettings
 from pathlib import Path
 import yaml
@@ -44,8 +49,103 @@ class Config(BaseSettings):
 
 
 ROOT_DIR = os.path.dirname(Path(__file__).parent.parent)
-_config_instance = Config(ROOT_DIR + "/" + CONFIG_FILE)
+CONFIG_FILE_PATH = ROOT_DIR + "/" + CONFIG_FILE
+_TRUE_VALUES = {"true", "1", "yes", "on"}
+
+_config_instance = Config(CONFIG_FILE_PATH)
+# Immutable snapshot of the config file and the environment, lookups do not rebuild the settings dict
+_config_snapshot = MappingProxyType(_config_instance.dict())
+_reload_hooks = []
+_reload_lock = threading.Lock()
 
 
 def get_config(key: str, default: str = None) -> str:
-    return _config_instance.get_config(key, default)
\ No newline at end of file
+    return _config_snapshot.get(key, default)
+
+
+def get_config_int(key: str, default: int = None) -> int:
+    value = _config_snapshot.get(key)
+    return default if value is None or value == "" else int(value)
+
+
+def get_config_float(key: str, default: float = None) -> float:
+    value = _config_snapshot.get(key)
+    return default if value is None or value == "" else float(value)
+
+
+def get_config_bool(key: str, default: bool = False) -> bool:
+    value = _config_snapshot.get(key)
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in _TRUE_VALUES
+
+
+
+def register_config_reload_hook(hook: Callable[[Mapping], None]):
+    """
+    Register a callback that is called with the new config snapshot after every reload.
+
+    Args:
+        hook (Callable): Called with the new read-only config mapping.
+    """
+    _reload_hooks.append(hook)
+
+
+def reload_config() -> Mapping:
+    """
+    Read the config file and the environment again and swap in a new snapshot.
+
+    Lookups made after the reload see the new values. Values that modules read once, at import time or when
+    building long lived clients, keep their old value unless a reload hook updates them.
+
+    Returns:
+        Mapping: The new read-only config mapping.
+    """
+    global _config_instance, _config_snapshot
+    with _reload_lock:
+        _config_instance = Config(CONFIG_FILE_PATH)
+        _config_snapshot = MappingProxyType(_config_instance.dict())
+        snapshot = _config_snapshot
+    for hook in list(_reload_hooks):
+        try:
+            hook(snapshot)
+        except Exception as e:
+            logger.error(f"Config reload hook failed: {e}")
+    return snapshot
+
+
+def watch_config(interval: float = 30) -> threading.Thread:
+    """
+    Reload the config in a background thread whenever the config file changes.
+
+    Args:
+        interval (float): Seconds between checks of the config file.
+
+    Returns:
+        threading.Thread: The daemon thread watching the config file.
+    """
+    def _watch():
+        last_modified = _modified_time()
+        while True:
+            time.sleep(interval)
+            modified = _modified_time()
+            if modified != last_modified:
+                last_modified = modified
+                logger.info("Config file changed, reloading config")
+                try:
+                    reload_config()
+                except Exception as e:
+                    logger.error(f"Unable to reload config: {e}")
+
+    watcher = threading.Thread(target=_watch, name="config-watcher", daemon=True)
+    watcher.start()
+    return watcher
+
+
+def _modified_time():
+    try:
+        return os.path.getmtime(CONFIG_FILE_PATH)
+    except OSError:
+        return None
@@ -4,18 +4,20 @@ import time
 from typing import Optional
 
 from fastapi import APIRouter, BackgroundTasks
-from fastapi import HTTPException, Depends
+from fastapi import HTTPException, Depends, Header, Query
+from fastapi.responses import StreamingResponse
 from fastapi_jwt_auth import AuthJWT
 from fastapi_sqlalchemy import db
 from pydantic import BaseModel
 
-from sqlalchemy.sql import asc
+from sqlalchemy.sql import asc, desc
 
 from superagi.agent.task_queue import TaskQueue
+from superagi.helper.agent_execution_stream import AgentExecutionStream
 from superagi.helper.auth import check_auth
+from superagi.helper.redis_helper import get_async_redis_client
 from superagi.helper.time_helper import get_time_difference
 from superagi.models.agent_execution_permission import AgentExecutionPermission
-from superagi.helper.feed_parser import parse_feed
 from superagi.models.agent_execution import AgentExecution
 from superagi.models.agent_execution_feed import AgentExecutionFeed
 from superagi.lib.logger import logger
@@ -23,7 +25,6 @@ from superagi.agent.types.agent_workflow_step_action_types import AgentWorkflowS
 from superagi.models.workflows.agent_workflow_step import AgentWorkflowStep
 from superagi.models.workflows.agent_workflow_step_wait import AgentWorkflowStepWait
 
-import re
 # from superagi.types.db import AgentExecutionFeedOut, AgentExecutionFeedIn
 
 router = APIRouter()
@@ -148,6 +149,63 @@ def update_agent_execution_feed(agent_execution_feed_id: int,
     return db_agent_execution_feed
 
 
+def _refresh_error_state(agent_execution: AgentExecution) -> str:
+    """
+    Pause the execution on a new error feed and return the error to show.
+
+    Args:
+        agent_execution (AgentExecution): The agent execution.
+
+    Returns:
+        str: The error message of the last error feed while the execution is paused on it, "" otherwise.
+    """
+    error_feed = db.session.query(AgentExecutionFeed.id, AgentExecutionFeed.error_message).filter(
+        AgentExecutionFeed.agent_execution_id == agent_execution.id,
+        AgentExecutionFeed.error_message.isnot(None),
+        AgentExecutionFeed.error_message != "").order_by(desc(AgentExecutionFeed.id)).first()
+    if error_feed is None:
+        return ""
+    if agent_execution.last_shown_error_id is None or error_feed.id > agent_execution.last_shown_error_id:
+        # new error occured
+        agent_execution.last_shown_error_id = error_feed.id
+        agent_execution.status = "ERROR_PAUSED"
+        db.session.commit()
+        return error_feed.error_message
+    if error_feed.id == agent_execution.last_shown_error_id and agent_execution.status == "ERROR_PAUSED":
+        return error_feed.error_message
+    return ""
+
+
+def _get_permissions(agent_execution_id: int) -> list:
+    execution_permissions = db.session.query(AgentExecutionPermission).\
+        filter_by(agent_execution_id=agent_execution_id). \
+        order_by(asc(AgentExecutionPermission.created_at)).all()
+    return [AgentExecutionStream.permission_event(permission) for permission in execution_permissions]
+
+
+def _get_waiting_period(agent_execution: AgentExecution):
+    if agent_execution.status != AgentWorkflowStepAction.WAIT_STEP.value:
+        return None
+    workflow_step = AgentWorkflowStep.find_by_id(db.session, agent_execution.current_agent_step_id)
+    return (AgentWorkflowStepWait.find_by_id(db.session, workflow_step.action_reference_id)).delay
+
+
+def _fetch_feeds_after(agent_execution_id: int, after_id: int, limit: int = None) -> list:
+    query = db.session.query(AgentExecutionFeed.id, AgentExecutionFeed.role, AgentExecutionFeed.feed,
+                             AgentExecutionFeed.updated_at, AgentExecutionFeed.error_message).filter(
+        AgentExecutionFeed.agent_execution_id == agent_execution_id,
+        AgentExecutionFeed.id > after_id).order_by(asc(AgentExecutionFeed.id))
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+
+def _build_feed_events(agent_execution_id: int, feeds: list) -> list:
+    parsed_feeds = AgentExecutionStream.get_parsed_feeds(agent_execution_id, feeds)
+    return [AgentExecutionStream.feed_event(feed.id, parsed_feeds[feed.id], feed.updated_at, feed.error_message)
+            for feed in feeds if parsed_feeds[feed.id]["visible"]]
+
+
 @router.get("/get/execution/{agent_execution_id}")
 def get_agent_execution_feed(agent_execution_id: int,
                                          Authorize: AuthJWT = Depends(check_auth)):
@@ -167,57 +225,108 @@ def get_agent_execution_feed(agent_execution_id: int,
     agent_execution = db.session.query(AgentExecution).filter(AgentExecution.id == agent_execution_id).first()
     if agent_execution is None:
         raise HTTPException(status_code=400, detail="Agent Run not found!")
-    feeds = db.session.query(AgentExecutionFeed).filter_by(agent_execution_id=agent_execution_id).order_by(
-        asc(AgentExecutionFeed.created_at)).all()
-    # # parse json
-    final_feeds = []
-    error = ""
-    for feed in feeds:
-        if feed.error_message:
-            if (agent_execution.last_shown_error_id is None) or (feed.id > agent_execution.last_shown_error_id):
-                #new error occured
-                error = feed.error_message
-                agent_execution.last_shown_error_id = feed.id
-                agent_execution.status = "ERROR_PAUSED"
-                db.session.commit()
-            if feed.id == agent_execution.last_shown_error_id and agent_execution.status == "ERROR_PAUSED":
-                error = feed.error_message
-        if feed.feed != "" and re.search(r"The current time and date is\s(\w{3}\s\w{3}\s\s?\d{1,2}\s\d{2}:\d{2}:\d{2}\s\d{4})",feed.feed) == None :
-            final_feeds.append(parse_feed(feed))
-
-    # get all permissions
-    execution_permissions = db.session.query(AgentExecutionPermission).\
-        filter_by(agent_execution_id=agent_execution_id). \
-        order_by(asc(AgentExecutionPermission.created_at)).all()
-
-    permissions = [
-        {
-                "id": permission.id,
-                "created_at": permission.created_at,
-                "response": permission.user_feedback,
-                "status": permission.status,
-                "tool_name": permission.tool_name,
-                "question": permission.question,
-                "user_feedback": permission.user_feedback,
-                "time_difference": get_time_difference(permission.created_at, str(datetime.now()))
-        } for permission in execution_permissions
-    ]
-
-    waiting_period = None
-
-    if agent_execution.status == AgentWorkflowStepAction.WAIT_STEP.value:
-        workflow_step = AgentWorkflowStep.find_by_id(db.session, agent_execution.current_agent_step_id)
-        waiting_period = (AgentWorkflowStepWait.find_by_id(db.session, workflow_step.action_reference_id)).delay
+    feeds = db.session.query(AgentExecutionFeed.id, AgentExecutionFeed.role, AgentExecutionFeed.feed,
+                             AgentExecutionFeed.updated_at).filter_by(agent_execution_id=agent_execution_id) \
+        .order_by(asc(AgentExecutionFeed.created_at)).all()
+    parsed_feeds = AgentExecutionStream.get_parsed_feeds(agent_execution_id, feeds)
+    final_feeds = [{"role": parsed_feeds[feed.id]["role"], "feed": parsed_feeds[feed.id]["feed"],
+                    "updated_at": feed.updated_at,
+                    "time_difference": get_time_difference(feed.updated_at, str(datetime.now()))}
+                   for feed in feeds if parsed_feeds[feed.id]["visible"]]
+    error = _refresh_error_state(agent_execution)
 
     return {
         "status": agent_execution.status,
         "feeds": final_feeds,
-        "permissions": permissions,
-        "waiting_period": waiting_period,
+        "permissions": _get_permissions(agent_execution_id),
+        "waiting_period": _get_waiting_period(agent_execution),
         "errors": error
     }
 
 
+@router.get("/get/execution/{agent_execution_id}/feeds")
+def get_agent_execution_feeds_after(agent_execution_id: int,
+                                    after_id: int = Query(0, ge=0),
+                                    limit: int = Query(100, ge=1, le=500),
+                                    Authorize: AuthJWT = Depends(check_auth)):
+    """
+    Get the feeds of an agent execution written after a feed, with the other execution details.
+
+    Args:
+        agent_execution_id (int): The ID of the agent execution.
+        after_id (int): Only feeds with a greater ID are returned, 0 returns the feeds from the start.
+        limit (int): The maximum number of feeds read.
+
+    Returns:
+        dict: The agent execution status, the feeds with their 'id', the 'next_cursor' to pass as after_id on the
+            next request and whether more feeds are available.
+
+    Raises:
+        HTTPException (Status Code=400): If the agent run is not found.
+    """
+    agent_execution = db.session.query(AgentExecution).filter(AgentExecution.id == agent_execution_id).first()
+    if agent_execution is None:
+        raise HTTPException(status_code=400, detail="Agent Run not found!")
+    feeds = _fetch_feeds_after(agent_execution_id, after_id, limit + 1)
+    has_more = len(feeds) > limit
+    feeds = feeds[:limit]
+    error = _refresh_error_state(agent_execution)
+
+    return {
+        "status": agent_execution.status,
+        "feeds": _build_feed_events(agent_execution_id, feeds),
+        "next_cursor": feeds[-1].id if feeds else after_id,
+        "has_more": has_more,
+        "permissions": _get_permissions(agent_execution_id),
+        "waiting_period": _get_waiting_period(agent_execution),
+        "errors": error
+    }
+
+
+@router.get("/get/execution/{agent_execution_id}/stream")
+async def stream_agent_execution_feed(agent_execution_id: int,
+                                      after_id: int = Query(0, ge=0),
+                                      last_event_id: Optional[str] = Header(None),
+                                      Authorize: AuthJWT = Depends(check_auth)):
+    """
+    Stream the feeds, permission requests and status changes of an agent execution as server-sent events.
+
+    The stream starts with the current status, the permissions and the feeds written after after_id, then pushes
+    'feed', 'permission' and 'status' events as they are written. Feed events carry the feed ID as event ID, so a
+    reconnecting client resumes from the Last-Event-ID header.
+
+    Args:
+        agent_execution_id (int): The ID of the agent execution.
+        after_id (int): Only feeds with a greater ID are sent.
+        last_event_id (str): The Last-Event-ID header sent by reconnecting clients.
+
+    Returns:
+        StreamingResponse: The text/event-stream response.
+
+    Raises:
+        HTTPException (Status Code=400): If the agent run is not found.
+    """
+    agent_execution = db.session.query(AgentExecution).filter(AgentExecution.id == agent_execution_id).first()
+    if agent_execution is None:
+        raise HTTPException(status_code=400, detail="Agent Run not found!")
+    if last_event_id is not None and last_event_id.isdigit():
+        after_id = max(after_id, int(last_event_id))
+
+    # Subscribe before loading the current state, the stream skips feeds it has sent already
+    pubsub = get_async_redis_client().pubsub()
+    await pubsub.subscribe(AgentExecutionStream.channel(agent_execution_id))
+    error = _refresh_error_state(agent_execution)
+    initial_events = [("status", {"status": agent_execution.status, "errors": error,
+                                  "waiting_period": _get_waiting_period(agent_execution)})]
+    initial_events += [("permission", permission) for permission in _get_permissions(agent_execution_id)]
+    initial_events += [("feed", feed) for feed in
+                       _build_feed_events(agent_execution_id, _fetch_feeds_after(agent_execution_id, after_id))]
+
+    return StreamingResponse(AgentExecutionStream.event_stream(pubsub, initial_events, after_id),
+                             media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 @router.get("/get/tasks/{agent_execution_id}")
 def get_execution_tasks(agent_execution_id: int,
                         Authorize: AuthJWT = Depends(check_auth)):
@@ -2,18 +2,19 @@ from fastapi_sqlalchemy import db
 from fastapi import HTTPException, Depends, Query, status
 from fastapi import APIRouter
 from datetime import datetime
-from superagi.config.config import get_config
+from superagi.config.config import get_config, get_config_int
 from superagi.helper.auth import get_user_organisation
 from superagi.models.knowledges import Knowledges
 from superagi.models.marketplace_stats import MarketPlaceStats
 from superagi.models.knowledge_configs import KnowledgeConfigs
+from superagi.models.knowledge_installs import KnowledgeInstalls
 from superagi.models.vector_db_indices import VectordbIndices
 from superagi.models.vector_dbs import Vectordbs
-from superagi.helper.s3_helper import S3Helper
 from superagi.models.vector_db_configs import VectordbConfigs
 from superagi.vector_store.vector_factory import VectorFactory
-from superagi.vector_embeddings.vector_embedding_factory import VectorEmbeddingFactory
 from superagi.helper.time_helper import get_time_difference
+from superagi.types.knowledge_install_status import KnowledgeInstallStatus
+from superagi.worker import install_knowledge
 
 router = APIRouter()
 
@@ -121,34 +122,32 @@ def delete_user_knowledge(knowledge_id: int):
 
 @router.get("/install/{knowledge_name}/index/{vector_db_index_id}")
 def install_selected_knowledge(knowledge_name: str, vector_db_index_id: int, organisation = Depends(get_user_organisation)):
+    """
+    Queue the installation of a marketplace knowledge into a vector db index.
+    Installing a knowledge whose previous installation failed resumes it.
+
+    Args:
+        knowledge_name (str): The marketplace name of the knowledge.
+        vector_db_index_id (int): The ID of the vector db index.
+
+    Returns:
+        dict: The installation progress, polled with /install/status/{install_id}.
+    """
     vector_db_index = VectordbIndices.get_vector_index_from_id(db.session, vector_db_index_id)
-    selected_knowledge = Knowledges.fetch_knowledge_details_marketplace(knowledge_name)
-    selected_knowledge_config = KnowledgeConfigs.fetch_knowledge_config_details_marketplace(selected_knowledge['id'])
-    file_chunks = S3Helper().get_json_file(selected_knowledge_config["file_path"])
-    vector = Vectordbs.get_vector_db_from_id(db.session, vector_db_index.vector_db_id)
-    db_creds = VectordbConfigs.get_vector_db_config_from_db_id(db.session, vector.id)
-    upsert_data = VectorEmbeddingFactory.build_vector_storage(vector.db_type, file_chunks).get_vector_embeddings_from_chunks()
-    try:
-        vector_db_storage = VectorFactory.build_vector_storage(vector.db_type, vector_db_index.name, **db_creds)
-        vector_db_storage.add_embeddings_to_vector_db(upsert_data)
-    except Exception as err:
-        raise HTTPException(status_code=400, detail=err)
-    selected_knowledge_data = {
-        "id": -1,
-        "name": selected_knowledge["name"],
-        "description": selected_knowledge["description"],
-        "index_id": vector_db_index_id,
-        "organisation_id": organisation.id,
-        "contributed_by": selected_knowledge["contributed_by"],
-    }
-    new_knowledge = Knowledges.add_update_knowledge(db.session, selected_knowledge_data)
-    removable_key = 'file_path'
-    selected_knowledge_config.pop(removable_key)
-    configs = selected_knowledge_config
-    KnowledgeConfigs.add_update_knowledge_config(db.session, new_knowledge.id, configs)
-    VectordbIndices.update_vector_index_state(db.session, vector_db_index_id, "Marketplace")
-    install_number = MarketPlaceStats.get_knowledge_installation_number(selected_knowledge["id"])
-    MarketPlaceStats.update_knowledge_install_number(db.session, selected_knowledge["id"], int(install_number) + 1)
+    if vector_db_index is None:
+        raise HTTPException(status_code=404, detail="Vector db index not found")
+    install = KnowledgeInstalls.find_or_create(db.session, organisation.id, knowledge_name, vector_db_index_id)
+    if install.status == KnowledgeInstallStatus.PENDING.value or \
+            install.is_stale(get_config_int("KNOWLEDGE_INSTALL_STALE_SECONDS", 600)):
+        install_knowledge.delay(install.id)
+    return install.get_progress()
+
+@router.get("/install/status/{install_id}")
+def get_knowledge_install_status(install_id: int, organisation = Depends(get_user_organisation)):
+    install = KnowledgeInstalls.find_by_id(db.session, install_id)
+    if install is None or install.organisation_id != organisation.id:
+        raise HTTPException(status_code=404, detail="Knowledge install not found")
+    return install.get_progress()
 
 @router.post("/uninstall/{knowledge_name}")
 def uninstall_selected_knowledge(knowledge_name: str, organisation = Depends(get_user_organisation)):
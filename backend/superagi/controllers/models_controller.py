@@ -12,6 +12,7 @@ from fastapi_sqlalchemy import db
 import logging
 from pydantic import BaseModel
 from superagi.helper.llm_loader import LLMLoader
+from superagi.llms.llm_model_factory import invalidate_model_cache
 
 router = APIRouter()
 
@@ -37,7 +38,9 @@ class ModelName (BaseModel):
 @router.post("/store_api_keys", status_code=200)
 async def store_api_keys(request: ValidateAPIKeyRequest, organisation=Depends(get_user_organisation)):
     try:
-        return ModelsConfig.store_api_key(db.session, organisation.id, request.model_provider, request.model_api_key)
+        result = ModelsConfig.store_api_key(db.session, organisation.id, request.model_provider, request.model_api_key)
+        invalidate_model_cache(organisation.id)
+        return result
     except Exception as e:
         logging.error(f"Error while storing API key: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
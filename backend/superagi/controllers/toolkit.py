@@ -9,6 +9,7 @@ from superagi.helper.auth import get_user_organisation
 from superagi.helper.tool_helper import get_readme_content_from_code_link, download_tool, process_files, \
     add_tool_to_json
 from superagi.helper.github_helper import GithubHelper
+from superagi.helper.toolkit_config_cache import ToolkitConfigCache
 from superagi.models.organisation import Organisation
 from superagi.models.tool import Tool
 from superagi.models.tool_config import ToolConfig
@@ -158,7 +159,8 @@ def install_toolkit_from_marketplace(toolkit_name: str,
                            toolkit_id=db_toolkit.id)
     for config in toolkit['configs']:
         ToolConfig.add_or_update(session=db.session, toolkit_id=db_toolkit.id, key=config['key'], value=config['value'], key_type = config['key_type'], is_secret = config['is_secret'], is_required = config['is_required'])    
-    
+    ToolkitConfigCache.invalidate(db_toolkit.id)
+
     return {"message": "ToolKit installed successfully"}
 
 
@@ -365,3 +367,4 @@ def update_toolkit(toolkit_name: str, organisation: Organisation = Depends(get_u
 
     for tool_config_key in marketplace_toolkit["configs"]:
         ToolConfig.add_or_update(db.session, toolkit_id=update_toolkit.id, key=tool_config_key["key"], key_type = tool_config_key['key_type'], is_secret = tool_config_key['is_secret'], is_required = tool_config_key['is_required'])
+    ToolkitConfigCache.invalidate(update_toolkit.id)
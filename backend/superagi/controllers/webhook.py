@@ -8,6 +8,7 @@ from pydantic import BaseModel
 
 # from superagi.types.db import AgentOut, AgentIn
 from superagi.helper.auth import check_auth, get_user_organisation
+from superagi.helper.webhook_dispatcher import WebhookDispatcher
 from superagi.models.webhooks import Webhooks
 
 router = APIRouter()
@@ -66,6 +67,7 @@ def create_webhook(webhook: WebHookIn, Authorize: AuthJWT = Depends(check_auth),
     db.session.add(db_webhook)
     db.session.commit()
     db.session.flush()
+    WebhookDispatcher.invalidate_org_webhooks(organisation.id)
     return db_webhook
 
 @router.get("/get", response_model=Optional[WebHookOut])
@@ -111,5 +113,6 @@ def edit_webhook(
     webhook.filters = updated_webhook.filters
 
     db.session.commit()
+    WebhookDispatcher.invalidate_org_webhooks(organisation.id)
 
     return webhook
\ No newline at end of file
@@ -0,0 +1,216 @@
+import json
+from datetime import datetime
+from typing import Dict, List
+
+from sqlalchemy import event
+
+from superagi.helper.feed_parser import render_feed, is_visible_feed
+from superagi.helper.redis_helper import get_redis_client
+from superagi.helper.time_helper import get_time_difference
+from superagi.lib.logger import logger
+from superagi.models.agent_execution import AgentExecution
+from superagi.models.agent_execution_feed import AgentExecutionFeed
+from superagi.models.agent_execution_permission import AgentExecutionPermission
+
+PARSED_FEEDS_TTL = 2 * 24 * 60 * 60
+STREAM_KEEPALIVE_INTERVAL = 15
+
+
+class AgentExecutionStream:
+    """
+    Publishes the feeds, permission requests and status changes of agent executions as they are written.
+
+    Feeds are rendered once when they are inserted or updated and the rendered feeds are cached in a Redis hash per
+    execution, so reading the execution feed does not parse every feed again. Every change is also published on
+    the Redis channel of the execution, which the feed stream endpoint forwards as server-sent events.
+    """
+
+    @staticmethod
+    def channel(agent_execution_id: int) -> str:
+        return f"agent_execution_{agent_execution_id}_stream"
+
+    @staticmethod
+    def _parsed_feeds_key(agent_execution_id: int) -> str:
+        return f"agent_execution_{agent_execution_id}_parsed_feeds"
+
+    @staticmethod
+    def parse(role: str, feed: str) -> dict:
+        """
+        Render a feed for the execution feed.
+
+        Args:
+            role (str): The role of the feed.
+            feed (str): The feed content.
+
+        Returns:
+            dict: The 'role', the rendered 'feed' and whether the feed is 'visible'.
+        """
+        feed = feed or ""
+        return {"role": role, "feed": render_feed(role, feed), "visible": is_visible_feed(feed)}
+
+    @classmethod
+    def feed_event(cls, feed_id: int, parsed: dict, updated_at: datetime, error_message: str = None) -> dict:
+        """Build the feed event of a parsed feed, in the format of the execution feed endpoints."""
+        return {"id": feed_id, "role": parsed["role"], "feed": parsed["feed"], "updated_at": updated_at,
+                "time_difference": get_time_difference(updated_at, str(datetime.now())),
+                "error_message": error_message}
+
+    @classmethod
+    def get_parsed_feeds(cls, agent_execution_id: int, feeds: list) -> Dict[int, dict]:
+        """
+        Get the rendered feeds, parsing and caching the feeds written before the cache existed.
+
+        Args:
+            agent_execution_id (int): The ID of the agent execution.
+            feeds (list): Feed rows with id, role and feed.
+
+        Returns:
+            Dict[int, dict]: The parsed feeds by feed ID, see parse.
+        """
+        if not feeds:
+            return {}
+        key = cls._parsed_feeds_key(agent_execution_id)
+        parsed_feeds = {}
+        try:
+            cached = get_redis_client().hmget(key, [feed.id for feed in feeds])
+        except Exception as e:
+            logger.error(f"Unable to read parsed feeds: {e}")
+            cached = [None] * len(feeds)
+        missing = {}
+        for feed, parsed in zip(feeds, cached):
+            if parsed is not None:
+                parsed_feeds[feed.id] = json.loads(parsed)
+                continue
+            parsed_feeds[feed.id] = missing[feed.id] = cls.parse(feed.role, feed.feed)
+        if missing:
+            try:
+                pipeline = get_redis_client().pipeline(transaction=False)
+                pipeline.hset(key, mapping={feed_id: json.dumps(parsed) for feed_id, parsed in missing.items()})
+                pipeline.expire(key, PARSED_FEEDS_TTL)
+                pipeline.execute()
+            except Exception as e:
+                logger.error(f"Unable to cache parsed feeds: {e}")
+        return parsed_feeds
+
+    @classmethod
+    def publish(cls, agent_execution_id: int, event_type: str, data: dict):
+        """
+        Publish an event of an agent execution to its stream.
+
+        Args:
+            agent_execution_id (int): The ID of the agent execution.
+            event_type (str): The event type, 'feed', 'feed_update', 'permission' or 'status'.
+            data (dict): The event data, must be JSON serializable with str as default.
+        """
+        try:
+            get_redis_client().publish(cls.channel(agent_execution_id),
+                                       json.dumps({"type": event_type, "data": data}, default=str))
+        except Exception as e:
+            logger.error(f"Unable to publish {event_type} of agent execution {agent_execution_id}: {e}")
+
+    @classmethod
+    def _cache_parsed_feed(cls, feed: AgentExecutionFeed) -> dict:
+        parsed = cls.parse(feed.role, feed.feed)
+        key = cls._parsed_feeds_key(feed.agent_execution_id)
+        try:
+            pipeline = get_redis_client().pipeline(transaction=False)
+            pipeline.hset(key, feed.id, json.dumps(parsed))
+            pipeline.expire(key, PARSED_FEEDS_TTL)
+            pipeline.execute()
+        except Exception as e:
+            logger.error(f"Unable to cache parsed feed: {e}")
+        return parsed
+
+    @classmethod
+    def on_feed_inserted(cls, feed: AgentExecutionFeed):
+        parsed = cls._cache_parsed_feed(feed)
+        if parsed["visible"] or feed.error_message:
+            cls.publish(feed.agent_execution_id, "feed",
+                        cls.feed_event(feed.id, parsed, feed.updated_at, feed.error_message))
+
+    @classmethod
+    def on_feed_updated(cls, feed: AgentExecutionFeed):
+        """Render an edited feed again, streams have sent the feed already so the update has its own event."""
+        parsed = cls._cache_parsed_feed(feed)
+        cls.publish(feed.agent_execution_id, "feed_update",
+                    cls.feed_event(feed.id, parsed, feed.updated_at, feed.error_message))
+
+    @staticmethod
+    def permission_event(permission: AgentExecutionPermission) -> dict:
+        return {
+            "id": permission.id,
+            "created_at": permission.created_at,
+            "response": permission.user_feedback,
+            "status": permission.status,
+            "tool_name": permission.tool_name,
+            "question": permission.question,
+            "user_feedback": permission.user_feedback,
+            "time_difference": get_time_difference(permission.created_at, str(datetime.now()))
+        }
+
+    @staticmethod
+    def format_event(event_type: str, data: dict, event_id: int = None) -> str:
+        """Format an event as a server-sent event, feed events carry their feed ID to resume the stream."""
+        message = f"event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+        if event_id is not None:
+            message = f"id: {event_id}\n" + message
+        return message
+
+    @classmethod
+    async def event_stream(cls, pubsub, initial_events: List[tuple], last_feed_id: int = 0):
+        """
+        Stream the events of an agent execution as server-sent events.
+
+        Args:
+            pubsub: An asyncio pubsub already subscribed to the channel of the execution, so no event written
+                while the initial events were loaded is missed.
+            initial_events (List[tuple]): The (event_type, data) pairs sent first.
+            last_feed_id (int): Feeds up to this ID have been sent already and are skipped.
+        """
+        try:
+            for event_type, data in initial_events:
+                if event_type == "feed":
+                    last_feed_id = max(last_feed_id, data["id"])
+                yield cls.format_event(event_type, data, data["id"] if event_type == "feed" else None)
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True,
+                                                   timeout=STREAM_KEEPALIVE_INTERVAL)
+                if message is None:
+                    # Comments keep proxies from closing idle streams
+                    yield ": keepalive\n\n"
+                    continue
+                stream_event = json.loads(message["data"])
+                data = stream_event["data"]
+                if stream_event["type"] == "feed":
+                    if data["id"] <= last_feed_id:
+                        continue
+                    last_feed_id = data["id"]
+                    yield cls.format_event("feed", data, data["id"])
+                    continue
+                yield cls.format_event(stream_event["type"], data)
+        finally:
+            await pubsub.unsubscribe()
+            await pubsub.close()
+
+
+@event.listens_for(AgentExecutionFeed, "after_insert")
+def _feed_inserted(mapper, connection, target):
+    AgentExecutionStream.on_feed_inserted(target)
+
+
+@event.listens_for(AgentExecutionFeed, "after_update")
+def _feed_updated(mapper, connection, target):
+    AgentExecutionStream.on_feed_updated(target)
+
+
+@event.listens_for(AgentExecutionPermission, "after_insert")
+@event.listens_for(AgentExecutionPermission, "after_update")
+def _permission_changed(mapper, connection, target):
+    AgentExecutionStream.publish(target.agent_execution_id, "permission",
+                                 AgentExecutionStream.permission_event(target))
+
+
+@event.listens_for(AgentExecution.status, "set")
+def _status_changed(target, value, old_value, initiator):
+    if target.id is not None and value != old_value:
+        AgentExecutionStream.publish(target.id, "status", {"status": value})
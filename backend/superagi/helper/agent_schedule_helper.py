@@ -1,49 +1,147 @@
-from superagi.models.db import connect_db
+from datetime import datetime, timedelta
+
+import pytz
+from sqlalchemy import event
 from sqlalchemy.orm import sessionmaker
+
+from superagi.config.config import get_config_int
+from superagi.helper.redis_helper import get_redis_client, claim_due_members
+from superagi.helper.time_helper import parse_interval_to_seconds
+from superagi.lib.logger import logger
 from superagi.models.agent_config import AgentConfiguration
 from superagi.models.agent_schedule import AgentSchedule
-from datetime import datetime, timedelta
-from superagi.helper.time_helper import parse_interval_to_seconds
-import pytz
+from superagi.models.db import connect_db
 
 engine = connect_db()
 Session = sessionmaker(bind=engine)
 
+SCHEDULE_INDEX_KEY = "agent_schedule_next_fire"
+
 
 class AgentScheduleHelper:
+    """
+    Fires the agent schedules at their next scheduled time.
+
+    The next fire time of every SCHEDULED schedule is kept in a Redis sorted set, which listeners on AgentSchedule
+    update whenever a schedule is written. run_scheduled_agents runs every SCHEDULE_POLL_INTERVAL seconds and only
+    loads the schedules that are due. It locks them with SKIP LOCKED and re-checks their next time under the lock,
+    so overlapping runs never fire a schedule twice. The executions of all due schedules are created in bulk and
+    committed together with the updated schedules.
+    """
     AGENT_SCHEDULE_TIME_INTERVAL = 300
 
-    def run_scheduled_agents(self):
-        """
-        Execute all eligible scheduled agent tasks since last five minutes.
+    @staticmethod
+    def index_schedule(schedule: AgentSchedule):
         """
+        Update the next fire time of a schedule in the index, schedules that are not SCHEDULED are removed.
 
-        now = datetime.now()
-        last_five_minutes = now - timedelta(minutes=5)
-
-        session = Session()
-        scheduled_agents = session.query(AgentSchedule).filter(
-            AgentSchedule.next_scheduled_time.between(last_five_minutes, now), AgentSchedule.status == "SCHEDULED").all()
+        Args:
+            schedule (AgentSchedule): The schedule.
+        """
+        if schedule.status != "SCHEDULED" or schedule.next_scheduled_time is None:
+            AgentScheduleHelper.remove_from_index(schedule.id)
+            return
+        try:
+            get_redis_client().zadd(SCHEDULE_INDEX_KEY, {str(schedule.id): schedule.next_scheduled_time.timestamp()})
+        except Exception as e:
+            logger.error(f"Unable to index agent schedule {schedule.id}: {e}")
+
+    @staticmethod
+    def remove_from_index(schedule_id: int):
+        try:
+            get_redis_client().zrem(SCHEDULE_INDEX_KEY, str(schedule_id))
+        except Exception as e:
+            logger.error(f"Unable to remove agent schedule {schedule_id} from the index: {e}")
+
+    def reconcile_index(self, session) -> int:
+        """
+        Rebuild the next fire time index from the database, for schedules written while Redis was unavailable.
 
-        for agent in scheduled_agents:
-            interval = agent.recurrence_interval
-            interval_in_seconds = 0  # default value
-            if interval is not None:
-                interval_in_seconds = parse_interval_to_seconds(interval)
-            agent_id = agent.agent_id
-            agent_execution_name = self.__create_execution_name_for_scheduling(agent_id)
+        Args:
+            session: The database session.
 
-            should_execute_agent = self.__should_execute_agent(agent, interval)
+        Returns:
+            int: The number of indexed schedules.
+        """
+        schedules = session.query(AgentSchedule.id, AgentSchedule.next_scheduled_time) \
+            .filter(AgentSchedule.status == "SCHEDULED", AgentSchedule.next_scheduled_time.isnot(None)).all()
+        redis_client = get_redis_client()
+        indexed = {int(member) for member in redis_client.zrange(SCHEDULE_INDEX_KEY, 0, -1)}
+        scheduled = {schedule.id: schedule.next_scheduled_time.timestamp() for schedule in schedules}
+        pipeline = redis_client.pipeline(transaction=False)
+        # Claimed schedules keep their claim, the others get their fire time from the database
+        missing = {str(schedule_id): fire_time for schedule_id, fire_time in scheduled.items()
+                   if schedule_id not in indexed}
+        if missing:
+            pipeline.zadd(SCHEDULE_INDEX_KEY, missing)
+        stale = [str(schedule_id) for schedule_id in indexed if schedule_id not in scheduled]
+        if stale:
+            pipeline.zrem(SCHEDULE_INDEX_KEY, *stale)
+        pipeline.execute()
+        return len(scheduled)
 
-            self.__execute_schedule(should_execute_agent, interval_in_seconds, session, agent,
-                                   agent_execution_name)
+    def run_scheduled_agents(self):
+        """
+        Execute the scheduled agents that are due, schedules missed by more than five minutes are moved to their
+        next run instead.
+        """
+        from superagi.jobs.scheduling_executor import ScheduledAgentExecutor
 
-        for agent in scheduled_agents:
-            if self.__can_remove_agent(agent, interval):
-                agent.status = "COMPLETED"
-                session.commit()
+        schedule_ids, _ = claim_due_members(get_redis_client(), SCHEDULE_INDEX_KEY,
+                                            get_config_int("SCHEDULE_CLAIM_TIMEOUT", 60))
+        if not schedule_ids:
+            return
+        schedule_ids = [int(schedule_id) for schedule_id in schedule_ids]
+        now = datetime.now()
+        session = Session()
+        try:
+            schedules = session.query(AgentSchedule).filter(
+                AgentSchedule.id.in_(schedule_ids),
+                AgentSchedule.status == "SCHEDULED",
+                AgentSchedule.next_scheduled_time <= now).with_for_update(skip_locked=True).all()
+            self.__reindex_not_due(session, set(schedule_ids) - {schedule.id for schedule in schedules}, now)
+
+            due_schedules = []
+            for schedule in schedules:
+                if (now - schedule.next_scheduled_time).total_seconds() >= self.AGENT_SCHEDULE_TIME_INTERVAL:
+                    self.__reschedule_missed_run(schedule, now)
+                else:
+                    due_schedules.append(schedule)
+
+            schedules_to_execute = [schedule for schedule in due_schedules
+                                    if self.__should_execute_agent(schedule, schedule.recurrence_interval)]
+            execution_names = self.__create_execution_names_for_scheduling(
+                session, {schedule.agent_id for schedule in schedules_to_execute})
+            executor = ScheduledAgentExecutor()
+            executions = executor.create_scheduled_executions(
+                session, [(schedule.agent_id, execution_names[schedule.agent_id]) for schedule in schedules_to_execute])
+
+            for schedule in schedules_to_execute:
+                schedule.current_runs = schedule.current_runs + 1
+                if schedule.recurrence_interval:
+                    schedule.next_scheduled_time = schedule.next_scheduled_time + timedelta(
+                        seconds=parse_interval_to_seconds(schedule.recurrence_interval))
+            for schedule in due_schedules:
+                if self.__can_remove_agent(schedule, schedule.recurrence_interval):
+                    schedule.status = "COMPLETED"
+            session.commit()
 
-        session.close()
+            executor.start_scheduled_executions(session, executions)
+        finally:
+            session.close()
+
+    def __reindex_not_due(self, session, schedule_ids: set, now):
+        # Index entries that are stale fire too early, they get the fire time of the database back. Due schedules
+        # left out are locked by another run, which indexes them once it has fired them.
+        if not schedule_ids:
+            return
+        schedules = session.query(AgentSchedule).filter(AgentSchedule.id.in_(schedule_ids)).all()
+        for schedule in schedules:
+            if schedule.status != "SCHEDULED" or schedule.next_scheduled_time is None \
+                    or schedule.next_scheduled_time > now:
+                self.index_schedule(schedule)
+        for schedule_id in schedule_ids - {schedule.id for schedule in schedules}:
+            self.remove_from_index(schedule_id)
 
     def update_next_scheduled_time(self):
         """
@@ -52,46 +150,56 @@ class AgentScheduleHelper:
         now = datetime.now()
 
         session = Session()
-        scheduled_agents = session.query(AgentSchedule).filter(
-            AgentSchedule.start_time <= now, AgentSchedule.next_scheduled_time <= now,
-            AgentSchedule.status == "SCHEDULED").all()
-
-        for agent in scheduled_agents:
-            if (now - agent.next_scheduled_time).total_seconds() < AgentScheduleHelper.AGENT_SCHEDULE_TIME_INTERVAL:
-                continue
-            if agent.recurrence_interval is not None:
-                interval_in_seconds = parse_interval_to_seconds(agent.recurrence_interval)
-                time_diff = now - agent.start_time
-                num_intervals_passed = time_diff.total_seconds() // interval_in_seconds
-                updated_next_scheduled_time = agent.start_time + timedelta(
-                    seconds=(interval_in_seconds * (num_intervals_passed + 1)))
-                agent.next_scheduled_time = updated_next_scheduled_time
-            else:
-                agent.status = "TERMINATED"
+        try:
+            scheduled_agents = session.query(AgentSchedule).filter(
+                AgentSchedule.start_time <= now,
+                AgentSchedule.next_scheduled_time <= now - timedelta(seconds=self.AGENT_SCHEDULE_TIME_INTERVAL),
+                AgentSchedule.status == "SCHEDULED").with_for_update(skip_locked=True).all()
+
+            for agent in scheduled_agents:
+                self.__reschedule_missed_run(agent, now)
             session.commit()
-        session.close()
-        
-    def __create_execution_name_for_scheduling(self, agent_id) -> str:
+            self.reconcile_index(session)
+        finally:
+            session.close()
+
+    def __reschedule_missed_run(self, agent, now):
+        if agent.recurrence_interval is not None:
+            interval_in_seconds = parse_interval_to_seconds(agent.recurrence_interval)
+            time_diff = now - agent.start_time
+            num_intervals_passed = time_diff.total_seconds() // interval_in_seconds
+            updated_next_scheduled_time = agent.start_time + timedelta(
+                seconds=(interval_in_seconds * (num_intervals_passed + 1)))
+            agent.next_scheduled_time = updated_next_scheduled_time
+        else:
+            agent.status = "TERMINATED"
+
+    def __create_execution_names_for_scheduling(self, session, agent_ids) -> dict:
         """
-        Create name for an agent execution based on current time.
+        Create names for the agent executions based on current time, in the timezone of each agent.
 
         Args:
-            agent_id (str): The id of the agent job to be scheduled.
+            session: The database session.
+            agent_ids (set): The ids of the agents to be scheduled.
 
         Returns:
-            str: Execution name of the agent in the format "Run <timestamp>"
+            dict: Execution name of each agent in the format "Run <timestamp>"
         """
-        session = Session()
-        user_timezone = session.query(AgentConfiguration).filter(AgentConfiguration.key == "user_timezone",
-                                                                 AgentConfiguration.agent_id == agent_id).first()
-
-        if user_timezone and user_timezone.value != "None":
-            current_time = datetime.now().astimezone(pytz.timezone(user_timezone.value))
-        else:
-            current_time = datetime.now().astimezone(pytz.timezone('GMT'))
-
-        timestamp = current_time.strftime(" %d %B %Y %H:%M")
-        return f"Run{timestamp}"
+        if not agent_ids:
+            return {}
+        user_timezones = dict(session.query(AgentConfiguration.agent_id, AgentConfiguration.value).filter(
+            AgentConfiguration.key == "user_timezone", AgentConfiguration.agent_id.in_(agent_ids)).all())
+
+        execution_names = {}
+        for agent_id in agent_ids:
+            user_timezone = user_timezones.get(agent_id)
+            if user_timezone and user_timezone != "None":
+                current_time = datetime.now().astimezone(pytz.timezone(user_timezone))
+            else:
+                current_time = datetime.now().astimezone(pytz.timezone('GMT'))
+            timestamp = current_time.strftime(" %d %B %Y %H:%M")
+            execution_names[agent_id] = f"Run{timestamp}"
+        return execution_names
 
     def __should_execute_agent(self, agent, interval):
         """
@@ -161,24 +269,13 @@ class AgentScheduleHelper:
         # If none of the conditions to keep the agent is met, we return True (i.e., the agent can be removed)
         return True
 
-    def __execute_schedule(self, should_execute_agent, interval_in_seconds, session, agent, agent_execution_name):
-        """
-        Executes a scheduled job, if it should be executed.
-        Args:
-            should_execute_agent (bool): Whether agent should be executed.
-            interval_in_seconds (int): The interval in seconds for the schedule.
-            session (Session): The database session.
-            agent (object): The agent to be scheduled.
-            agent_execution_name (str): The name for the execution.
-        """
-        from superagi.jobs.scheduling_executor import ScheduledAgentExecutor
-        if should_execute_agent:
-            executor = ScheduledAgentExecutor()
-            executor.execute_scheduled_agent(agent.agent_id, agent_execution_name)
-            agent.current_runs = agent.current_runs + 1
 
-            if agent.recurrence_interval:
-                next_scheduled_time = agent.next_scheduled_time + timedelta(seconds=interval_in_seconds)
-                agent.next_scheduled_time = next_scheduled_time
+@event.listens_for(AgentSchedule, "after_insert")
+@event.listens_for(AgentSchedule, "after_update")
+def _schedule_changed(mapper, connection, target):
+    AgentScheduleHelper.index_schedule(target)
+
 
-            session.commit()
\ No newline at end of file
+@event.listens_for(AgentSchedule, "after_delete")
+def _schedule_deleted(mapper, connection, target):
+    AgentScheduleHelper.remove_from_index(target.id)
@@ -1,30 +1,43 @@
 import json
+import re
 from datetime import datetime
 
 from superagi.helper.time_helper import get_time_difference
 from superagi.lib.logger import logger
 
+CURRENT_TIME_FEED_PATTERN = re.compile(
+    r"The current time and date is\s(\w{3}\s\w{3}\s\s?\d{1,2}\s\d{2}:\d{2}:\d{2}\s\d{4})")
 
-def parse_feed(feed):
+
+def is_visible_feed(feed: str) -> bool:
     """
-    Helper function to parse the feed.
+    Whether a feed is shown in the execution feed, the current time prompts and empty feeds are hidden.
 
     Args:
-        feed (AgentExecutionFeed): The feed to be parsed.
+        feed (str): The feed content.
 
     Returns:
-        dict: Parsed feed information with role, feed content, and updated timestamp.
-              If parsing fails, the original feed is returned.
+        bool: True if the feed is shown.
     """
+    return feed != "" and CURRENT_TIME_FEED_PATTERN.search(feed) is None
 
-    # Get the current time
-    feed.time_difference = get_time_difference(feed.updated_at, str(datetime.now()))
 
+def render_feed(role: str, feed: str) -> str:
+    """
+    Helper function to render the content of a feed as it is shown in the execution feed.
+
+    Args:
+        role (str): The role of the feed.
+        feed (str): The feed content.
+
+    Returns:
+        str: The rendered feed. Assistant feeds that cannot be parsed are returned as they are.
+    """
     # Check if the feed belongs to an assistant role
-    if feed.role == "assistant":
+    if role == "assistant":
         try:
             # Parse the feed as JSON
-            parsed = json.loads(feed.feed, strict=False)
+            parsed = json.loads(feed, strict=False)
 
             final_output = ""
             if "reasoning" in parsed["thoughts"]:
@@ -35,24 +48,37 @@ def parse_feed(feed):
                 final_output += "Criticism: " + parsed["thoughts"]["criticism"] + "\n"
             if "tool" in parsed:
                 final_output += "Tool: " + parsed["tool"]["name"] + "\n"
+            if "tools" in parsed:
+                final_output += "Tools: " + ", ".join(tool["name"] for tool in parsed["tools"]) + "\n"
             if "command" in parsed:
                 final_output += "Tool: " + parsed["command"]["name"] + "\n"
-
-            return {"role": "assistant", "feed": final_output, "updated_at": feed.updated_at,
-                    "time_difference": feed.time_difference}
+            return final_output
         except Exception:
-            return {"role": "assistant", "feed": feed.feed, "updated_at": feed.updated_at,
-                "time_difference": feed.time_difference}
+            return feed
 
-    if feed.role == "system":
-        final_output = feed.feed
-        if "json-schema.org" in feed.feed:
-            final_output = feed.feed.split("TOOLS:")[0]
-        return {"role": "system", "feed": final_output, "updated_at": feed.updated_at,
-                "time_difference": feed.time_difference}
-    
-    if feed.role == "user":
-        return {"role": "user", "feed": feed.feed, "updated_at": feed.updated_at,
+    if role == "system" and "json-schema.org" in feed:
+        return feed.split("TOOLS:")[0]
+
+    return feed
+
+
+def parse_feed(feed):
+    """
+    Helper function to parse the feed.
+
+    Args:
+        feed (AgentExecutionFeed): The feed to be parsed.
+
+    Returns:
+        dict: Parsed feed information with role, feed content, and updated timestamp.
+              If parsing fails, the original feed is returned.
+    """
+
+    # Get the current time
+    feed.time_difference = get_time_difference(feed.updated_at, str(datetime.now()))
+
+    if feed.role in ["assistant", "system", "user"]:
+        return {"role": feed.role, "feed": render_feed(feed.role, feed.feed), "updated_at": feed.updated_at,
                 "time_difference": feed.time_difference}
-    
+
     return feed
@@ -0,0 +1,99 @@
+import codecs
+import json
+from typing import Callable, Iterator, Tuple
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARS = "0123456789+-.eE"
+
+
+def iter_json_object_items(read: Callable[[int], bytes], offset: int = 0,
+                           chunk_size: int = 1024 * 1024) -> Iterator[Tuple[str, object, int]]:
+    """
+    Parse the members of a top-level JSON object from a byte stream, holding one member in memory at a time.
+
+    Args:
+        read (Callable): Reads up to the given number of bytes from the stream, an empty result ends the stream.
+        offset (int): The byte offset the stream starts at. 0 for the start of the object, otherwise an offset
+            returned with a previous member, when the stream has been reopened just after that member.
+        chunk_size (int): The number of bytes read at a time.
+
+    Yields:
+        tuple: The key and the value of each member, and the byte offset just after the member.
+
+    Raises:
+        ValueError: If the stream is not a JSON object.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    position = 0
+    # The bytes of buffer up to counted are included in offset
+    counted = 0
+    eof = False
+    # After the opening brace a member is expected, after a member a comma or the closing brace
+    expect_member = offset == 0
+    started = offset > 0
+
+    def count():
+        nonlocal offset, counted
+        offset += len(buffer[counted:position].encode("utf-8"))
+        counted = position
+
+    def fill():
+        nonlocal buffer, position, counted, eof
+        count()
+        data = read(chunk_size)
+        if not data:
+            eof = True
+        buffer = buffer[position:] + decoder.decode(data, final=eof)
+        position = 0
+        counted = 0
+
+    def next_char():
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position] in _WHITESPACE:
+                position += 1
+            if position < len(buffer):
+                return buffer[position]
+            if eof:
+                return None
+            fill()
+
+    def decode_value():
+        while True:
+            try:
+                value, end = _decoder.raw_decode(buffer, position)
+                # A number at the end of the buffer may continue in the next chunk
+                if eof or (end < len(buffer) and buffer[end] not in _NUMBER_CHARS):
+                    return value, end
+            except json.JSONDecodeError:
+                if eof:
+                    raise ValueError(f"Invalid JSON member at byte {offset}")
+            fill()
+
+    if not started:
+        if next_char() != "{":
+            raise ValueError("Expected a JSON object")
+        position += 1
+    while True:
+        char = next_char()
+        if char is None:
+            raise ValueError("Unexpected end of the JSON object")
+        if char == "}":
+            return
+        if not expect_member:
+            if char != ",":
+                raise ValueError(f"Expected ',' or '}}' at byte {offset}")
+            position += 1
+            expect_member = True
+            continue
+        key, position = decode_value()
+        if next_char() != ":":
+            raise ValueError(f"Expected ':' after key {key}")
+        position += 1
+        next_char()
+        value, position = decode_value()
+        count()
+        expect_member = False
+        yield key, value, offset
@@ -0,0 +1,170 @@
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from superagi.config.config import get_config_int
+from superagi.helper.json_stream import iter_json_object_items
+from superagi.helper.s3_helper import S3Helper
+from superagi.lib.logger import logger
+from superagi.models.knowledge_configs import KnowledgeConfigs
+from superagi.models.knowledge_installs import KnowledgeInstalls
+from superagi.models.knowledges import Knowledges
+from superagi.models.marketplace_stats import MarketPlaceStats
+from superagi.models.vector_db_configs import VectordbConfigs
+from superagi.models.vector_db_indices import VectordbIndices
+from superagi.models.vector_dbs import Vectordbs
+from superagi.types.knowledge_install_status import KnowledgeInstallStatus
+from superagi.types.vector_store_types import VectorStoreType
+from superagi.vector_embeddings.vector_embedding_factory import VectorEmbeddingFactory
+from superagi.vector_store.vector_factory import VectorFactory
+
+# Chunks per upsert request and concurrent upsert requests for each vector store
+BATCH_SIZES = {
+    VectorStoreType.PINECONE: 100,
+    VectorStoreType.QDRANT: 256,
+    VectorStoreType.WEAVIATE: 100,
+    VectorStoreType.EMBEDDED: 5000,
+}
+CONCURRENCY = {
+    VectorStoreType.PINECONE: 4,
+    VectorStoreType.QDRANT: 4,
+    # The weaviate client batches through a single shared batch object
+    VectorStoreType.WEAVIATE: 1,
+    # Each upsert of the embedded store writes a segment under a file lock
+    VectorStoreType.EMBEDDED: 1,
+}
+
+
+class KnowledgeInstaller:
+    """
+    Installs a marketplace knowledge into a vector db index in the background.
+
+    The chunk file is streamed from S3 and parsed one chunk at a time, and the chunks are upserted in batches, with
+    a bounded number of batches in flight. The progress is checkpointed after every batch as the number of chunks
+    and the byte offset of the chunk file upserted so far, so an installation that fails resumes with a ranged read
+    just after the last upserted chunk. KNOWLEDGE_INSTALL_BATCH_SIZE and KNOWLEDGE_INSTALL_CONCURRENCY override
+    the defaults of the vector stores.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    @staticmethod
+    def _batch_settings(vector_store: VectorStoreType) -> tuple:
+        batch_size = get_config_int("KNOWLEDGE_INSTALL_BATCH_SIZE") or BATCH_SIZES.get(vector_store, 100)
+        concurrency = get_config_int("KNOWLEDGE_INSTALL_CONCURRENCY") or CONCURRENCY.get(vector_store, 1)
+        return batch_size, concurrency
+
+    def install(self, install_id: int):
+        """
+        Install a knowledge, resuming from the checkpoint of the installation.
+
+        Args:
+            install_id (int): The ID of the KnowledgeInstalls row.
+
+        Raises:
+            Exception: If the installation fails, after recording the error on the installation.
+        """
+        if not KnowledgeInstalls.claim(self.session, install_id,
+                                       get_config_int("KNOWLEDGE_INSTALL_STALE_SECONDS", 600)):
+            logger.info(f"Knowledge install {install_id} is complete or already running")
+            return
+        install = KnowledgeInstalls.find_by_id(self.session, install_id)
+        try:
+            self._install(install)
+        except Exception as e:
+            logger.error(f"Knowledge install {install_id} failed after {install.chunks_installed} chunks: {e}")
+            self.session.rollback()
+            KnowledgeInstalls.update_status(self.session, install_id, KnowledgeInstallStatus.FAILED, str(e))
+            raise
+        KnowledgeInstalls.update_status(self.session, install_id, KnowledgeInstallStatus.COMPLETE)
+        logger.info(f"Knowledge install {install_id} complete with {install.chunks_installed} chunks")
+
+    def _install(self, install: KnowledgeInstalls):
+        selected_knowledge = Knowledges.fetch_knowledge_details_marketplace(install.knowledge_name)
+        if not selected_knowledge:
+            raise ValueError(f"Knowledge {install.knowledge_name} not found in the marketplace")
+        selected_knowledge_config = KnowledgeConfigs.fetch_knowledge_config_details_marketplace(
+            selected_knowledge['id'])
+        vector_db_index = VectordbIndices.get_vector_index_from_id(self.session, install.vector_db_index_id)
+        vector = Vectordbs.get_vector_db_from_id(self.session, vector_db_index.vector_db_id)
+        db_creds = VectordbConfigs.get_vector_db_config_from_db_id(self.session, vector.id)
+        vector_db_storage = VectorFactory.build_vector_storage(vector.db_type, vector_db_index.name, **db_creds)
+
+        if install.bytes_total is None or install.bytes_installed < install.bytes_total:
+            stream, bytes_total = S3Helper().get_file_stream(selected_knowledge_config["file_path"],
+                                                             install.bytes_installed)
+            try:
+                KnowledgeInstalls.update_progress(self.session, install.id, install.chunks_installed,
+                                                  install.bytes_installed, bytes_total)
+                self._upsert_chunks(install, vector.db_type, vector_db_storage, stream)
+            finally:
+                stream.close()
+        self._add_knowledge(install, selected_knowledge, selected_knowledge_config)
+
+    def _upsert_chunks(self, install: KnowledgeInstalls, db_type: str, vector_db_storage, stream):
+        batch_size, concurrency = self._batch_settings(VectorStoreType.get_vector_store_type(db_type))
+        chunks = iter_json_object_items(stream.read, offset=install.bytes_installed)
+        chunks_installed = install.chunks_installed
+        in_flight = deque()
+
+        def complete_oldest_batch():
+            nonlocal chunks_installed
+            future, batch_length, bytes_installed = in_flight.popleft()
+            future.result()
+            # Batches complete in order, so the checkpoint only covers chunks that have all been upserted
+            chunks_installed += batch_length
+            KnowledgeInstalls.update_progress(self.session, install.id, chunks_installed, bytes_installed)
+
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="knowledge_install") as executor:
+            while True:
+                batch = list(islice(chunks, batch_size))
+                if not batch:
+                    break
+                chunk_json = {key: chunk for key, chunk, _ in batch}
+                in_flight.append((executor.submit(self._upsert_batch, vector_db_storage, db_type, chunk_json),
+                                  len(batch), batch[-1][2]))
+                # The next batch is parsed while the pool is busy with the batches in flight
+                while len(in_flight) > concurrency:
+                    complete_oldest_batch()
+            while in_flight:
+                complete_oldest_batch()
+
+    @staticmethod
+    def _upsert_batch(vector_db_storage, db_type: str, chunk_json: dict):
+        upsert_data = VectorEmbeddingFactory.build_vector_storage(db_type, chunk_json) \
+            .get_vector_embeddings_from_chunks()
+        retries = get_config_int("KNOWLEDGE_INSTALL_BATCH_RETRIES", 3)
+        for attempt in range(retries + 1):
+            try:
+                vector_db_storage.add_embeddings_to_vector_db(upsert_data)
+                return
+            except Exception as e:
+                if attempt == retries:
+                    raise
+                logger.info(f"Retrying the upsert of {len(chunk_json)} knowledge chunks: {e}")
+                time.sleep(2 ** attempt)
+
+    def _add_knowledge(self, install: KnowledgeInstalls, selected_knowledge: dict, selected_knowledge_config: dict):
+        # A retry after the knowledge was added updates it instead of adding it twice
+        knowledge = self.session.query(Knowledges).filter(
+            Knowledges.organisation_id == install.organisation_id,
+            Knowledges.name == selected_knowledge["name"],
+            Knowledges.vector_db_index_id == install.vector_db_index_id).first()
+        selected_knowledge_data = {
+            "id": knowledge.id if knowledge is not None else -1,
+            "name": selected_knowledge["name"],
+            "description": selected_knowledge["description"],
+            "index_id": install.vector_db_index_id,
+            "organisation_id": install.organisation_id,
+            "contributed_by": selected_knowledge["contributed_by"],
+        }
+        new_knowledge = Knowledges.add_update_knowledge(self.session, selected_knowledge_data)
+        if knowledge is None:
+            configs = {key: value for key, value in selected_knowledge_config.items() if key != 'file_path'}
+            KnowledgeConfigs.add_update_knowledge_config(self.session, new_knowledge.id, configs)
+            install_number = MarketPlaceStats.get_knowledge_installation_number(selected_knowledge["id"])
+            MarketPlaceStats.update_knowledge_install_number(self.session, selected_knowledge["id"],
+                                                             int(install_number) + 1)
+        VectordbIndices.update_vector_index_state(self.session, install.vector_db_index_id, "Marketplace")
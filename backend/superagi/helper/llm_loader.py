@@ -1,3 +1,5 @@
+import threading
+
 from llama_cpp import Llama
 from llama_cpp import LlamaGrammar
 from superagi.config.config import get_config
@@ -5,13 +7,19 @@ from superagi.lib.logger import logger
 
 
 class LLMLoader:
+    """Loads the local model weights and grammar once per process and shares them across LocalLLM instances."""
     _instance = None
     _model = None
     _grammar = None
+    _load_lock = threading.Lock()
+    # llama.cpp contexts are not thread-safe, completions on the shared model must hold this lock
+    inference_lock = threading.Lock()
 
     def __new__(cls, *args, **kwargs):
         if cls._instance is None:
-            cls._instance = super(LLMLoader, cls).__new__(cls)
+            with cls._load_lock:
+                if cls._instance is None:
+                    cls._instance = super(LLMLoader, cls).__new__(cls)
         return cls._instance
 
     def __init__(self, context_length):
@@ -20,19 +28,23 @@ class LLMLoader:
     @property
     def model(self):
         if self._model is None:
-            try:
-                self._model = Llama(
-                    model_path="/app/local_model_path", n_ctx=self.context_length, n_gpu_layers=int(get_config('GPU_LAYERS', '-1')))
-            except Exception as e:
-                logger.error(e)
+            with self._load_lock:
+                if self._model is None:
+                    try:
+                        LLMLoader._model = Llama(
+                            model_path="/app/local_model_path", n_ctx=self.context_length, n_gpu_layers=int(get_config('GPU_LAYERS', '-1')))
+                    except Exception as e:
+                        logger.error(e)
         return self._model
 
     @property
     def grammar(self):
         if self._grammar is None:
-            try:
-                self._grammar = LlamaGrammar.from_file(
-                    "superagi/llms/grammar/json.gbnf")
-            except Exception as e:
-                logger.error(e)
+            with self._load_lock:
+                if self._grammar is None:
+                    try:
+                        LLMLoader._grammar = LlamaGrammar.from_file(
+                            "superagi/llms/grammar/json.gbnf")
+                    except Exception as e:
+                        logger.error(e)
         return self._grammar
@@ -1,10 +1,54 @@
+import re
+from functools import lru_cache
 from pathlib import Path
 
+PLACEHOLDER_PATTERN = re.compile(r"\{(\w+)\}")
+
+
+class PromptTemplate:
+    """
+    A prompt compiled once into its literal parts and {placeholder} positions.
+
+    render substitutes every placeholder in a single pass, so a value that contains another placeholder is not
+    substituted again. Placeholders without a value are kept as they are.
+    """
+
+    def __init__(self, template: str):
+        self.template = template
+        self._parts = []
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(template):
+            self._parts.append((template[position:match.start()], match.group(1)))
+            position = match.end()
+        self._tail = template[position:]
+        self.placeholders = frozenset(name for _, name in self._parts)
+
+    def render(self, **values) -> str:
+        """
+        Render the prompt.
+
+        Args:
+            **values: The values of the placeholders, converted with str.
+
+        Returns:
+            str: The rendered prompt.
+        """
+        rendered = []
+        for literal, name in self._parts:
+            rendered.append(literal)
+            rendered.append(str(values[name]) if name in values else "{" + name + "}")
+        rendered.append(self._tail)
+        return "".join(rendered)
+
 
 class PromptReader:
     @staticmethod
-    def read_tools_prompt(current_file: str, prompt_file: str) -> str:
-        file_path = str(Path(current_file).resolve().parent) + "/prompts/" + prompt_file
+    def _prompt_path(current_file: str, prompt_file: str) -> str:
+        return str(Path(current_file).resolve().parent) + "/prompts/" + prompt_file
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _read_file(file_path: str) -> str:
         try:
             f = open(file_path, "r")
             file_content = f.read()
@@ -14,14 +58,20 @@ class PromptReader:
             raise e
         return file_content
 
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _compile(file_path: str) -> PromptTemplate:
+        return PromptTemplate(PromptReader._read_file(file_path))
+
+    @staticmethod
+    def read_tools_prompt(current_file: str, prompt_file: str) -> str:
+        return PromptReader._read_file(PromptReader._prompt_path(current_file, prompt_file))
+
     @staticmethod
     def read_agent_prompt(current_file: str, prompt_file: str) -> str:
-        file_path = str(Path(current_file).resolve().parent) + "/prompts/" + prompt_file
-        try:
-            f = open(file_path, "r")
-            file_content = f.read()
-            f.close()
-        except FileNotFoundError as e:
-            print(e.__str__())
-            raise e
-        return file_content
+        return PromptReader._read_file(PromptReader._prompt_path(current_file, prompt_file))
+
+    @staticmethod
+    def read_agent_template(current_file: str, prompt_file: str) -> PromptTemplate:
+        """Get the compiled template of an agent prompt, the prompt file is read and compiled once per process."""
+        return PromptReader._compile(PromptReader._prompt_path(current_file, prompt_file))
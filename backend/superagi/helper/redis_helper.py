@@ -0,0 +1,72 @@
+import time
+
+import redis
+from redis import asyncio as aioredis
+
+from superagi.config.config import get_config
+
+redis_url = get_config('REDIS_URL') or "localhost:6379"
+
+_connection_pools = {}
+
+# Claims the members of a sorted set scored by due time by pushing their score past the claim timeout, so members
+# claimed by a crashed worker are claimed again once the timeout is over. Returns the claimed members.
+CLAIM_DUE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[3]))
+for _, member in ipairs(due) do
+    redis.call('ZADD', KEYS[1], ARGV[2], member)
+end
+return due
+"""
+
+
+def get_redis_client(decode_responses: bool = True):
+    """
+    Get a Redis client backed by a connection pool shared across the process.
+
+    Args:
+        decode_responses (bool): Whether responses are decoded to str, binary values need raw bytes.
+
+    Returns:
+        redis.Redis: The Redis client.
+    """
+    connection_pool = _connection_pools.get(decode_responses)
+    if connection_pool is None:
+        connection_pool = redis.ConnectionPool.from_url("redis://" + redis_url + "/0",
+                                                        decode_responses=decode_responses)
+        _connection_pools[decode_responses] = connection_pool
+    return redis.Redis(connection_pool=connection_pool)
+
+
+def get_async_redis_client():
+    """
+    Get an asyncio Redis client, for use on the event loop of the API server. Connections are pooled per process.
+
+    Returns:
+        redis.asyncio.Redis: The Redis client, responses are decoded to str.
+    """
+    connection_pool = _connection_pools.get("async")
+    if connection_pool is None:
+        connection_pool = aioredis.ConnectionPool.from_url("redis://" + redis_url + "/0", decode_responses=True)
+        _connection_pools["async"] = connection_pool
+    return aioredis.Redis(connection_pool=connection_pool)
+
+
+def claim_due_members(redis_client, key: str, claim_timeout: float, limit: int = 100):
+    """
+    Claim the due members of a sorted set scored by epoch due time.
+
+    Args:
+        redis_client: The Redis client.
+        key (str): The key of the sorted set.
+        claim_timeout (float): Seconds after which claimed members are due again.
+        limit (int): The maximum number of members claimed.
+
+    Returns:
+        tuple: The claimed members and the claim score, the members keep that score until they are rescheduled
+            or removed.
+    """
+    now = time.time()
+    claim = now + claim_timeout
+    members = redis_client.register_script(CLAIM_DUE_SCRIPT)(keys=[key], args=[now, claim, limit])
+    return members, claim
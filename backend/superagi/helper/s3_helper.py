@@ -89,6 +89,26 @@ class S3Helper:
         except:
             raise HTTPException(status_code=500, detail="AWS credentials not found. Check your configuration.")
 
+    def get_file_stream(self, path, start_byte=0):
+        """
+        Open a file in S3 as a stream, from a byte offset.
+        Args:
+            path (str): The path to the file.
+            start_byte (int): The byte offset to start reading from.
+        Raises:
+            HTTPException: If the AWS credentials are not found.
+        Returns:
+            tuple: The streaming body and the size of the whole file.
+        """
+        try:
+            if start_byte:
+                obj = self.s3.get_object(Bucket=self.bucket_name, Key=path, Range=f"bytes={start_byte}-")
+            else:
+                obj = self.s3.get_object(Bucket=self.bucket_name, Key=path)
+            return obj['Body'], start_byte + obj['ContentLength']
+        except:
+            raise HTTPException(status_code=500, detail="AWS credentials not found. Check your configuration.")
+
     def delete_file(self, path):
         """
         Delete a file from S3.
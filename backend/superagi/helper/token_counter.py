@@ -1,12 +1,41 @@
+from functools import lru_cache
 from typing import List
 
 import tiktoken
 
+from superagi.helper.redis_helper import get_redis_client
 from superagi.types.common import BaseMessage
 from superagi.lib.logger import logger
 from superagi.models.models import Models
 from sqlalchemy.orm import Session
 
+DEFAULT_TOKENS_PER_MESSAGE = 4
+MODEL_TOKENS_PER_MESSAGE = {"gpt-3.5-turbo-0301": 4, "gpt-4-0314": 3, "gpt-3.5-turbo": 4, "gpt-4": 3,
+                            "gpt-3.5-turbo-16k": 4, "gpt-4-32k": 3, "gpt-4-32k-0314": 3,
+                            "models/chat-bison-001": 4}
+FEED_TOKENS_TTL = 2 * 24 * 60 * 60
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str):
+    """
+    Get the tiktoken encoding for a model, built once per process.
+
+    Args:
+        model (str): The model or encoding name.
+
+    Returns:
+        tiktoken.Encoding: The encoding, cl100k_base if the model is unknown to tiktoken.
+    """
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        try:
+            return tiktoken.get_encoding(model)
+        except ValueError:
+            logger.warning("Warning: model not found. Using cl100k_base encoding.")
+            return tiktoken.get_encoding("cl100k_base")
+
 
 class TokenCounter:
 
@@ -49,27 +78,8 @@ class TokenCounter:
         Returns:
             int: The number of tokens in the messages.
         """
-        try:
-            default_tokens_per_message = 4
-            model_token_per_message_dict = {"gpt-3.5-turbo-0301": 4, "gpt-4-0314": 3, "gpt-3.5-turbo": 4, "gpt-4": 3,
-                                            "gpt-3.5-turbo-16k": 4, "gpt-4-32k": 3, "gpt-4-32k-0314": 3,
-                                            "models/chat-bison-001": 4}
-            encoding = tiktoken.encoding_for_model(model)
-        except KeyError:
-            logger.warning("Warning: model not found. Using cl100k_base encoding.")
-            encoding = tiktoken.get_encoding("cl100k_base")
-
-        if model in model_token_per_message_dict.keys():
-            tokens_per_message = model_token_per_message_dict[model]
-        else:
-            tokens_per_message = default_tokens_per_message
-
-        if tokens_per_message is None:
-            raise NotImplementedError(
-                f"num_tokens_from_messages() is not implemented for model {model}.\n"
-                " See https://github.com/openai/openai-python/blob/main/chatml.md for"
-                " information on how messages are converted to tokens."
-            )
+        encoding = get_encoding(model)
+        tokens_per_message = MODEL_TOKENS_PER_MESSAGE.get(model, DEFAULT_TOKENS_PER_MESSAGE)
 
         num_tokens = 0
         for message in messages:
@@ -79,7 +89,6 @@ class TokenCounter:
             num_tokens += len(encoding.encode(message['content']))
 
         num_tokens += 3
-        print("tokens",num_tokens)
         return num_tokens
 
     @staticmethod
@@ -93,6 +102,56 @@ class TokenCounter:
         Returns:
             int: The number of tokens in the text.
         """
-        encoding = tiktoken.get_encoding("cl100k_base")
+        encoding = get_encoding("cl100k_base")
         num_tokens = len(encoding.encode(message)) + 4
         return num_tokens
+
+
+class FeedTokenCounter:
+    """Token counts of the feeds of an agent execution, cached in Redis so every feed is tokenized only once."""
+
+    def __init__(self, agent_execution_id: int, model: str):
+        self.model = model
+        self.key = f"agent_execution_{agent_execution_id}_feed_tokens:{model}"
+
+    def count_feed_tokens(self, feeds: List[dict]) -> List[int]:
+        """
+        Count the tokens of each feed, as count_message_tokens would for the feed alone.
+
+        Args:
+            feeds (List[dict]): Messages with 'role', 'content' and the feed id as 'chat_id'.
+
+        Returns:
+            List[int]: The token count of each feed, in the order of the feeds.
+        """
+        if not feeds:
+            return []
+        feed_ids = [str(feed['chat_id']) for feed in feeds]
+        try:
+            db = get_redis_client()
+            cached_counts = db.hmget(self.key, feed_ids)
+        except Exception as e:
+            logger.error(f"Unable to read feed token counts: {e}")
+            db = None
+            cached_counts = [None] * len(feeds)
+
+        counts = []
+        missing_counts = {}
+        for feed, feed_id, cached_count in zip(feeds, feed_ids, cached_counts):
+            if cached_count is not None:
+                counts.append(int(cached_count))
+                continue
+            count = TokenCounter.count_message_tokens([{"role": feed["role"], "content": feed["content"]}],
+                                                      self.model)
+            missing_counts[feed_id] = count
+            counts.append(count)
+
+        if missing_counts and db is not None:
+            try:
+                pipeline = db.pipeline()
+                pipeline.hset(self.key, mapping=missing_counts)
+                pipeline.expire(self.key, FEED_TOKENS_TTL)
+                pipeline.execute()
+            except Exception as e:
+                logger.error(f"Unable to store feed token counts: {e}")
+        return counts
@@ -8,6 +8,7 @@ from urllib.parse import urlparse
 
 import requests
 
+from superagi.agent.tool_registry import ToolRegistry
 from superagi.config.config import get_config
 from superagi.lib.logger import logger
 from superagi.models.tool import Tool
@@ -295,15 +296,9 @@ def add_tool_to_json(repo_link):
 
 
 def handle_tools_import():
-    print("Handling tools import")
-    tool_paths = ["superagi/tools", "superagi/tools/marketplace_tools", "superagi/tools/external_tools"]
-    for tool_path in tool_paths:
-        if not os.path.exists(tool_path):
-            continue
-        for folder_name in os.listdir(tool_path):
-            folder_dir = os.path.join(tool_path, folder_name)
-            if os.path.isdir(folder_dir):
-                sys.path.append(folder_dir)
+    """Add the tool folders to sys.path, the tool directories are scanned at most every
+    TOOL_REGISTRY_CHECK_INTERVAL seconds."""
+    ToolRegistry.check_for_changes()
 
 def compare_tools(tool1, tool2):
     fields = ["name", "description"]
@@ -0,0 +1,67 @@
+from superagi.config.config import get_config_int
+from superagi.helper.encyption_helper import decrypt_data, is_encrypted
+from superagi.helper.redis_helper import get_redis_client
+from superagi.helper.ttl_cache import TTLCache
+from superagi.lib.logger import logger
+from superagi.models.tool_config import ToolConfig
+
+_toolkit_configs_cache = TTLCache(maxsize=get_config_int("TOOLKIT_CONFIG_CACHE_SIZE", 256),
+                                  ttl=get_config_int("TOOLKIT_CONFIG_CACHE_TTL", 300))
+
+
+class ToolkitConfigCache:
+    """
+    In-process cache of the decrypted tool configurations of the toolkits.
+
+    All the keys of a toolkit are loaded with one query and decrypted once, then kept for TOOLKIT_CONFIG_CACHE_TTL
+    seconds. Every toolkit has a version counter in Redis that invalidate increments, so the workers drop their
+    cached configurations as soon as the API changes them instead of waiting for the TTL.
+    """
+
+    @staticmethod
+    def _version_key(toolkit_id: int) -> str:
+        return f"toolkit_{toolkit_id}_config_version"
+
+    @classmethod
+    def _get_version(cls, toolkit_id: int):
+        try:
+            return get_redis_client().get(cls._version_key(toolkit_id))
+        except Exception as e:
+            logger.error(f"Unable to read the config version of toolkit {toolkit_id}: {e}")
+            return None
+
+    @staticmethod
+    def _decrypt(value):
+        if value and is_encrypted(value):
+            return decrypt_data(value)
+        return value
+
+    @classmethod
+    def get_configs(cls, session, toolkit_id: int) -> dict:
+        """
+        Get the decrypted tool configurations of a toolkit.
+
+        Args:
+            session: The database session.
+            toolkit_id (int): The ID of the toolkit.
+
+        Returns:
+            dict: The configuration values by key.
+        """
+        version = cls._get_version(toolkit_id)
+        entry = _toolkit_configs_cache.get(toolkit_id)
+        if entry is not None and entry["version"] == version:
+            return entry["configs"]
+        rows = session.query(ToolConfig.key, ToolConfig.value).filter(ToolConfig.toolkit_id == toolkit_id).all()
+        configs = {row.key: cls._decrypt(row.value) for row in rows}
+        _toolkit_configs_cache.set(toolkit_id, {"version": version, "configs": configs})
+        return configs
+
+    @classmethod
+    def invalidate(cls, toolkit_id: int):
+        """Drop the cached tool configurations of a toolkit in every process, after they have been changed."""
+        _toolkit_configs_cache.pop(toolkit_id)
+        try:
+            get_redis_client().incr(cls._version_key(toolkit_id))
+        except Exception as e:
+            logger.error(f"Unable to invalidate the cached configs of toolkit {toolkit_id}: {e}")
@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread-safe in-process cache with least-recently-used eviction and a per-entry time to live."""
+
+    def __init__(self, maxsize: int = 128, ttl: float = 600):
+        """
+        Args:
+            maxsize (int): The maximum number of entries kept in the cache.
+            ttl (float): Seconds after which an entry expires. None keeps entries until they are evicted.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, key, default=None):
+        """
+        Get a value from the cache.
+
+        Args:
+            key: The cache key.
+            default: The value returned when the key is missing or expired.
+
+        Returns:
+            The cached value or the default.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        """
+        Store a value in the cache, evicting the least recently used entry when full.
+
+        Args:
+            key: The cache key.
+            value: The value to store.
+            ttl (float): Overrides the cache time to live for this entry.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_set(self, key, factory):
+        """
+        Get a value from the cache or build and store it with the factory. The factory runs outside the lock, so
+        concurrent misses on the same key may both build a value; the last one is kept.
+
+        Args:
+            key: The cache key.
+            factory (Callable): Called without arguments to build a missing value. None results are not cached.
+
+        Returns:
+            The cached or newly built value.
+        """
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            if value is not None:
+                self.set(key, value)
+        return value
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return entry[0] if entry is not None else default
+
+    def invalidate(self, predicate):
+        """
+        Remove every entry whose key matches the predicate.
+
+        Args:
+            predicate (Callable): Called with each key, entries for which it returns True are removed.
+        """
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
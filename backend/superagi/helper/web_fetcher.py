@@ -0,0 +1,167 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from superagi.config.config import get_config_int
+from superagi.helper.ttl_cache import TTLCache
+
+
+class FetchedPage:
+    """A fetched web page, as kept in the fetch cache."""
+
+    def __init__(self, url: str, status_code: int, content: bytes, encoding: str = None, headers: dict = None):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.encoding = encoding
+        self.headers = headers or {}
+        self.fetched_at = time.monotonic()
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}")
+
+
+class WebFetcher:
+    """
+    Fetches web pages for the extractor and the search tools.
+
+    Requests go through one pooled HTTP session, at most WEB_FETCH_HOST_CONCURRENCY at a time per host, and
+    fetch_all runs them on a shared thread pool so reading several links takes about as long as the slowest one.
+    Successful responses are cached for WEB_FETCH_CACHE_TTL seconds. Stale entries with an ETag or Last-Modified
+    header are kept up to WEB_FETCH_CACHE_MAX_AGE seconds and revalidated with a conditional request.
+    """
+
+    _session = None
+    _executor = None
+    # Least recently used hosts are dropped, a host fetched again gets a new semaphore
+    _host_semaphores = TTLCache(maxsize=get_config_int("WEB_FETCH_HOST_LIMIT", 1024), ttl=None)
+    _lock = threading.Lock()
+    _cache = TTLCache(maxsize=get_config_int("WEB_FETCH_CACHE_SIZE", 256),
+                      ttl=get_config_int("WEB_FETCH_CACHE_MAX_AGE", 24 * 60 * 60))
+
+    @classmethod
+    def _get_session(cls) -> requests.Session:
+        if cls._session is None:
+            with cls._lock:
+                if cls._session is None:
+                    pool_size = get_config_int("WEB_FETCH_MAX_CONNECTIONS", 32)
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    cls._session = session
+        return cls._session
+
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        if cls._executor is None:
+            with cls._lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(max_workers=get_config_int("WEB_FETCH_MAX_WORKERS", 8),
+                                                       thread_name_prefix="web_fetch")
+        return cls._executor
+
+    @classmethod
+    def _host_semaphore(cls, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc
+        with cls._lock:
+            semaphore = cls._host_semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(get_config_int("WEB_FETCH_HOST_CONCURRENCY", 2))
+                cls._host_semaphores.set(host, semaphore)
+            return semaphore
+
+    @staticmethod
+    def _is_cacheable(response: requests.Response) -> bool:
+        cache_control = response.headers.get("Cache-Control", "").lower()
+        return response.status_code == 200 and "no-store" not in cache_control
+
+    @classmethod
+    def fetch(cls, url: str, headers: dict = None, timeout: float = 10, use_cache: bool = True) -> FetchedPage:
+        """
+        Fetch a web page, from the cache when it is still fresh.
+
+        Args:
+            url (str): The URL of the page.
+            headers (dict): The request headers.
+            timeout (float): The request timeout in seconds.
+            use_cache (bool): False fetches the page again, without a conditional request, and caches the result.
+
+        Returns:
+            FetchedPage: The fetched page.
+
+        Raises:
+            requests.RequestException: If the request fails.
+        """
+        cached = cls._cache.get(url) if use_cache else None
+        if cached is not None and time.monotonic() - cached.fetched_at < get_config_int("WEB_FETCH_CACHE_TTL", 300):
+            return cached
+
+        request_headers = dict(headers or {})
+        if cached is not None:
+            if cached.headers.get("ETag"):
+                request_headers["If-None-Match"] = cached.headers["ETag"]
+            if cached.headers.get("Last-Modified"):
+                request_headers["If-Modified-Since"] = cached.headers["Last-Modified"]
+
+        with cls._host_semaphore(url):
+            response = cls._get_session().get(url, headers=request_headers, timeout=timeout)
+        if cached is not None and response.status_code == 304:
+            cached.fetched_at = time.monotonic()
+            return cached
+
+        page = FetchedPage(url, response.status_code, response.content, response.encoding, dict(response.headers))
+        if cls._is_cacheable(response):
+            if page.headers.get("ETag") or page.headers.get("Last-Modified"):
+                cls._cache.set(url, page)
+            else:
+                # Pages without validators cannot be revalidated, they are only kept while fresh
+                cls._cache.set(url, page, ttl=get_config_int("WEB_FETCH_CACHE_TTL", 300))
+        return page
+
+    @classmethod
+    def map(cls, func: Callable, urls: List[str]) -> list:
+        """
+        Call a function with every URL concurrently on the fetch thread pool.
+
+        Args:
+            func (Callable): Called with each URL, typically fetches and extracts the page.
+            urls (List[str]): The URLs.
+
+        Returns:
+            list: The results of the function, in the order of the URLs.
+        """
+        if len(urls) <= 1:
+            return [func(url) for url in urls]
+        return list(cls._get_executor().map(func, urls))
+
+    @classmethod
+    def fetch_all(cls, urls: List[str], headers: dict = None, timeout: float = 10) -> List[FetchedPage]:
+        """
+        Fetch several web pages concurrently.
+
+        Args:
+            urls (List[str]): The URLs of the pages.
+            headers (dict): The request headers.
+            timeout (float): The request timeout in seconds.
+
+        Returns:
+            List[FetchedPage]: The fetched pages in the order of the URLs, None for the pages that failed.
+        """
+        def fetch_or_none(url):
+            try:
+                return cls.fetch(url, headers=headers, timeout=timeout)
+            except requests.RequestException:
+                return None
+
+        return cls.map(fetch_or_none, urls)
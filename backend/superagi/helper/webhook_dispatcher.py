@@ -0,0 +1,225 @@
+import asyncio
+import json
+import time
+from typing import List, Optional
+from urllib.parse import urlparse
+
+import aiohttp
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from superagi.config.config import get_config_int, get_config_float
+from superagi.helper.redis_helper import get_redis_client
+from superagi.lib.logger import logger
+from superagi.models.agent import Agent
+from superagi.models.agent_execution import AgentExecution
+from superagi.models.project import Project
+from superagi.models.webhook_events import WebhookEvents
+from superagi.models.webhooks import Webhooks
+
+WEBHOOK_TRANSITIONS_KEY = "webhook_transitions"
+WEBHOOK_RETRIES_KEY = "webhook_retries"
+WEBHOOK_DEAD_LETTERS_KEY = "webhook_dead_letters"
+WEBHOOK_DISPATCH_SCHEDULED_KEY = "webhook_dispatch_scheduled"
+WEBHOOK_DISPATCH_LOCK_KEY = "webhook_dispatch_lock"
+WEBHOOK_DEAD_LETTERS_LIMIT = 1000
+
+
+class WebhookDispatcher:
+    """
+    Delivers the agent execution status webhooks of the organisations.
+
+    Status transitions are queued in Redis and dispatched in batches by the dispatch_webhooks task, at most
+    WEBHOOK_COALESCE_WINDOW seconds after the first queued transition. A batch resolves the executions in one
+    query and the organisation webhooks from a Redis cache, then posts every delivery concurrently over one pooled
+    HTTP client, with at most WEBHOOK_ENDPOINT_CONCURRENCY requests per endpoint and a WEBHOOK_TIMEOUT per request.
+    Failed deliveries are retried by later dispatches with exponential backoff and dead-lettered after
+    WEBHOOK_MAX_ATTEMPTS attempts, so a slow endpoint never holds a worker for longer than one timeout.
+    The outcome of every delivery is written to WebhookEvents in bulk.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    @staticmethod
+    def _org_webhooks_key(org_id: int) -> str:
+        return f"org_{org_id}_webhooks"
+
+    @classmethod
+    def enqueue_status_change(cls, agent_execution_id: int, status: str, old_status: str):
+        """
+        Queue a status transition of an agent execution and schedule a dispatch.
+
+        Args:
+            agent_execution_id (int): The ID of the agent execution.
+            status (str): The new status.
+            old_status (str): The previous status, a SQLAlchemy symbol such as NO_VALUE when it is not known.
+        """
+        if not isinstance(old_status, str):
+            old_status = None
+        if status == "CREATED" or agent_execution_id is None or status == old_status:
+            return
+        redis_client = get_redis_client()
+        redis_client.rpush(WEBHOOK_TRANSITIONS_KEY, json.dumps({"agent_execution_id": agent_execution_id,
+                                                                "status": status, "old_status": old_status}))
+        coalesce_window = get_config_int("WEBHOOK_COALESCE_WINDOW", 2)
+        # Transitions queued within the window are delivered by the same dispatch
+        if redis_client.set(WEBHOOK_DISPATCH_SCHEDULED_KEY, 1, nx=True, ex=coalesce_window + 60):
+            from superagi.worker import dispatch_webhooks
+            dispatch_webhooks.apply_async(countdown=coalesce_window)
+
+    @classmethod
+    def invalidate_org_webhooks(cls, org_id: int):
+        """Drop the cached webhooks of an organisation after they have been changed."""
+        try:
+            get_redis_client().delete(cls._org_webhooks_key(org_id))
+        except Exception as e:
+            logger.error(f"Unable to invalidate cached webhooks of organisation {org_id}: {e}")
+
+    def get_org_webhooks(self, org_id: int) -> List[dict]:
+        """
+        Get the webhooks of an organisation, cached in Redis for WEBHOOK_CACHE_TTL seconds.
+
+        Args:
+            org_id (int): The ID of the organisation.
+
+        Returns:
+            List[dict]: The webhooks with 'id', 'url', 'headers' and 'filters'.
+        """
+        redis_client = get_redis_client()
+        cached = redis_client.get(self._org_webhooks_key(org_id))
+        if cached is not None:
+            return json.loads(cached)
+        webhooks = [{"id": webhook.id, "url": webhook.url, "headers": webhook.headers, "filters": webhook.filters}
+                    for webhook in self.session.query(Webhooks).filter(Webhooks.org_id == org_id,
+                                                                        Webhooks.is_deleted.isnot(True)).all()]
+        redis_client.set(self._org_webhooks_key(org_id), json.dumps(webhooks),
+                         ex=get_config_int("WEBHOOK_CACHE_TTL", 300))
+        return webhooks
+
+    def dispatch(self, batch_size: int = 1000) -> int:
+        """
+        Deliver the queued transitions and the retries that are due. Only one dispatch runs at a time.
+
+        Args:
+            batch_size (int): The maximum number of transitions taken from the queue.
+
+        Returns:
+            int: The number of deliveries attempted.
+        """
+        redis_client = get_redis_client()
+        lock_ttl = get_config_int("WEBHOOK_TIMEOUT", 10) * 3 + 60
+        if not redis_client.set(WEBHOOK_DISPATCH_LOCK_KEY, 1, nx=True, ex=lock_ttl):
+            return 0
+        try:
+            # Transitions queued from now on schedule another dispatch
+            redis_client.delete(WEBHOOK_DISPATCH_SCHEDULED_KEY)
+            pipeline = redis_client.pipeline(transaction=True)
+            pipeline.lrange(WEBHOOK_TRANSITIONS_KEY, 0, batch_size - 1)
+            pipeline.ltrim(WEBHOOK_TRANSITIONS_KEY, batch_size, -1)
+            transitions = [json.loads(transition) for transition in pipeline.execute()[0]]
+
+            deliveries = self._build_deliveries(transitions) + self._claim_due_retries(redis_client)
+            if not deliveries:
+                return 0
+            errors = asyncio.run(self._deliver_all(deliveries))
+            self._record_outcomes(redis_client, deliveries, errors)
+            return len(deliveries)
+        finally:
+            redis_client.delete(WEBHOOK_DISPATCH_LOCK_KEY)
+
+    def _build_deliveries(self, transitions: List[dict]) -> List[dict]:
+        # The same transition set several times within the window is delivered once
+        transitions = list({(transition["agent_execution_id"], transition["old_status"], transition["status"]):
+                            transition for transition in transitions}.values())
+        if not transitions:
+            return []
+        executions = {row.id: row for row in self.session.query(
+            AgentExecution.id, AgentExecution.agent_id, Project.organisation_id
+        ).join(Agent, Agent.id == AgentExecution.agent_id).join(Project, Project.id == Agent.project_id)
+            .filter(AgentExecution.id.in_({transition["agent_execution_id"] for transition in transitions})).all()}
+
+        deliveries = []
+        for transition in transitions:
+            execution = executions.get(transition["agent_execution_id"])
+            if execution is None:
+                continue
+            event = f"{transition['old_status']} to {transition['status']}"
+            for webhook in self.get_org_webhooks(execution.organisation_id):
+                filters = webhook["filters"] or {}
+                if "status" not in filters or transition["status"] not in filters["status"]:
+                    continue
+                deliveries.append({
+                    "webhook_id": webhook["id"], "url": webhook["url"].strip(), "headers": webhook["headers"],
+                    "body": {"agent_id": execution.agent_id, "org_id": execution.organisation_id, "event": event},
+                    "agent_id": execution.agent_id, "run_id": execution.id, "event": event, "attempt": 1,
+                })
+        return deliveries
+
+    @staticmethod
+    def _claim_due_retries(redis_client) -> List[dict]:
+        retries = redis_client.zrangebyscore(WEBHOOK_RETRIES_KEY, "-inf", time.time())
+        if not retries:
+            return []
+        redis_client.zrem(WEBHOOK_RETRIES_KEY, *retries)
+        return [json.loads(retry) for retry in retries]
+
+    async def _deliver_all(self, deliveries: List[dict]) -> List[Optional[str]]:
+        connector = aiohttp.TCPConnector(limit=get_config_int("WEBHOOK_MAX_CONNECTIONS", 100))
+        timeout = aiohttp.ClientTimeout(total=get_config_float("WEBHOOK_TIMEOUT", 10))
+        endpoint_concurrency = get_config_int("WEBHOOK_ENDPOINT_CONCURRENCY", 4)
+        semaphores = {}
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as http_session:
+            return await asyncio.gather(*[
+                self._deliver(http_session, semaphores.setdefault(urlparse(delivery["url"]).netloc,
+                                                                  asyncio.Semaphore(endpoint_concurrency)), delivery)
+                for delivery in deliveries
+            ])
+
+    @staticmethod
+    async def _deliver(http_session, semaphore, delivery: dict) -> Optional[str]:
+        """Post a delivery and return its error, None when it was accepted."""
+        async with semaphore:
+            try:
+                async with http_session.post(delivery["url"], data=json.dumps(delivery["body"]),
+                                             headers=delivery["headers"] or None) as response:
+                    if response.status in [200, 201]:
+                        return None
+                    return await response.text() or f"HTTP {response.status}"
+            except Exception as e:
+                logger.error(f"Exception occured in webhooks {e}")
+                return str(e) or type(e).__name__
+
+    def _record_outcomes(self, redis_client, deliveries: List[dict], errors: List[Optional[str]]):
+        max_attempts = get_config_int("WEBHOOK_MAX_ATTEMPTS", 5)
+        backoff = get_config_float("WEBHOOK_RETRY_BACKOFF", 5)
+        events = []
+        retries = {}
+        dead_letters = []
+        for delivery, error in zip(deliveries, errors):
+            if error is not None and delivery["attempt"] < max_attempts:
+                retry_at = time.time() + backoff * 2 ** (delivery["attempt"] - 1)
+                retries[json.dumps({**delivery, "attempt": delivery["attempt"] + 1})] = retry_at
+                continue
+            if error is not None:
+                dead_letters.append(json.dumps({**delivery, "error": error}))
+            events.append({"agent_id": delivery["agent_id"], "run_id": delivery["run_id"], "event": delivery["event"],
+                           "status": "sent" if error is None else "Error", "errors": error})
+
+        pipeline = redis_client.pipeline(transaction=False)
+        if retries:
+            pipeline.zadd(WEBHOOK_RETRIES_KEY, retries)
+        if dead_letters:
+            logger.error(f"Dead-lettering {len(dead_letters)} webhook deliveries")
+            pipeline.lpush(WEBHOOK_DEAD_LETTERS_KEY, *dead_letters)
+            pipeline.ltrim(WEBHOOK_DEAD_LETTERS_KEY, 0, WEBHOOK_DEAD_LETTERS_LIMIT - 1)
+        pipeline.execute()
+
+        if not events:
+            return
+        try:
+            self.session.execute(insert(WebhookEvents), events)
+            self.session.commit()
+        except SQLAlchemyError as err:
+            self.session.rollback()
+            logger.error(f"Error while writing webhook events: {str(err)}")
@@ -1,15 +1,15 @@
 from io import BytesIO
 from PyPDF2 import PdfFileReader
 from PyPDF2 import PdfReader
-import requests
 import re
 from requests.exceptions import RequestException
 from bs4 import BeautifulSoup
 from newspaper import Article, ArticleException, Config
 from requests_html import HTMLSession
-import time
 import random
 from lxml import html
+from superagi.config.config import get_config_int
+from superagi.helper.web_fetcher import WebFetcher
 from superagi.lib.logger import logger
 
 USER_AGENTS = [
@@ -35,9 +35,25 @@ class WebpageExtractor:
         """
         self.num_extracts = num_extracts
 
+    @staticmethod
+    def _render_html(url, timeout):
+        """Render a page with a headless browser, for pages whose content is built by JavaScript."""
+        session = HTMLSession()
+        try:
+            response = session.get(url)
+            response.html.render(timeout=timeout)
+            return response.html.html
+        finally:
+            session.close()
+
+    @staticmethod
+    def _needs_rendering(content):
+        return len(content) < get_config_int("WEB_EXTRACT_MIN_STATIC_LENGTH", 200)
+
     def extract_with_3k(self, url):
         """
-        Extract the text from a webpage using the 3k method.
+        Extract the text from a webpage using the 3k method. The static page is parsed first and only rendered
+        with a headless browser when too little text was found in it.
 
         Args:
             url (str): The URL of the webpage to extract from.
@@ -47,7 +63,7 @@ class WebpageExtractor:
         """
         try:
             if url.lower().endswith(".pdf"):
-                response = requests.get(url)
+                response = WebFetcher.fetch(url)
                 response.raise_for_status()
 
                 with BytesIO(response.content) as pdf_data:
@@ -58,16 +74,13 @@ class WebpageExtractor:
                 config = Config()
                 config.browser_user_agent = random.choice(USER_AGENTS)
                 config.request_timeout = 10
-                session = HTMLSession()
-
-                response = session.get(url)
-                response.html.render(timeout=config.request_timeout)
-                html_content = response.html.html
 
-                article = Article(url, config=config)
-                article.set_html(html_content)
-                article.parse()
-                content = article.text.replace('\t', ' ').replace('\n', ' ').strip()
+                response = WebFetcher.fetch(url, headers={"User-Agent": config.browser_user_agent},
+                                            timeout=config.request_timeout)
+                response.raise_for_status()
+                content = self._parse_with_3k(url, config, response.text)
+                if self._needs_rendering(content):
+                    content = self._parse_with_3k(url, config, self._render_html(url, config.request_timeout))
 
             return content[:1500]
 
@@ -83,12 +96,20 @@ class WebpageExtractor:
             logger.error(f"Unknown error while extracting text from HTML (newspaper3k): {str(e)}")
             return ""
 
-    def extract_with_bs4(self, url):
+    @staticmethod
+    def _parse_with_3k(url, config, html_content):
+        article = Article(url, config=config)
+        article.set_html(html_content)
+        article.parse()
+        return article.text.replace('\t', ' ').replace('\n', ' ').strip()
+
+    def extract_with_bs4(self, url, use_cache=True):
         """
         Extract the text from a webpage using the BeautifulSoup4 method.
 
         Args:
             url (str): The URL of the webpage to extract from.
+            use_cache (bool): Whether a cached fetch of the page can be used.
 
         Returns:
             str: The extracted text.
@@ -98,7 +119,7 @@ class WebpageExtractor:
         }
 
         try:
-            response = requests.get(url, headers=headers, timeout=10)
+            response = WebFetcher.fetch(url, headers=headers, timeout=10, use_cache=use_cache)
             if response.status_code == 200:
                 soup = BeautifulSoup(response.text, 'html.parser')
                 for tag in soup(['script', 'style', 'nav', 'footer', 'head', 'link', 'meta', 'noscript']):
@@ -125,9 +146,32 @@ class WebpageExtractor:
             logger.error(f"Unknown error while extracting text from HTML (bs4): {str(e)}")
             return ""
 
+    def extract_all_with_bs4(self, urls, max_attempts=3):
+        """
+        Extract the text from several webpages concurrently using the BeautifulSoup4 method.
+
+        Args:
+            urls (list): The URLs of the webpages to extract from.
+            max_attempts (int): The number of times a page is fetched while no text is extracted from it. Retries
+                fetch the page again instead of using the cached fetch.
+
+        Returns:
+            list: The extracted texts, in the order of the URLs.
+        """
+        def extract(url):
+            content = ""
+            for attempt in range(max_attempts):
+                content = self.extract_with_bs4(url, use_cache=attempt == 0)
+                if content != "":
+                    break
+            return content
+
+        return WebFetcher.map(extract, urls)
+
     def extract_with_lxml(self, url):
         """
-        Extract the text from a webpage using the lxml method.
+        Extract the text from a webpage using the lxml method. The static page is parsed first and only rendered
+        with a headless browser when too little text was found in it.
 
         Args:
             url (str): The URL of the webpage to extract from.
@@ -139,16 +183,13 @@ class WebpageExtractor:
             config = Config()
             config.browser_user_agent = random.choice(USER_AGENTS)
             config.request_timeout = 10
-            session = HTMLSession()
-
-            response = session.get(url)
-            response.html.render(timeout=config.request_timeout)
-            html_content = response.html.html
 
-            tree = html.fromstring(html_content)
-            paragraphs = tree.cssselect('p, h1, h2, h3, h4, h5, h6')
-            content = ' '.join([para.text_content() for para in paragraphs if para.text_content()])
-            content = content.replace('\t', ' ').replace('\n', ' ').strip()
+            response = WebFetcher.fetch(url, headers={"User-Agent": config.browser_user_agent},
+                                        timeout=config.request_timeout)
+            response.raise_for_status()
+            content = self._parse_with_lxml(response.text)
+            if self._needs_rendering(content):
+                content = self._parse_with_lxml(self._render_html(url, config.request_timeout))
 
             return content
 
@@ -163,4 +204,10 @@ class WebpageExtractor:
         except Exception as e:
             logger.error(f"Unknown error while extracting text from HTML (lxml): {str(e)}")
             return ""
-    
\ No newline at end of file
+
+    @staticmethod
+    def _parse_with_lxml(html_content):
+        tree = html.fromstring(html_content)
+        paragraphs = tree.cssselect('p, h1, h2, h3, h4, h5, h6')
+        content = ' '.join([para.text_content() for para in paragraphs if para.text_content()])
+        return content.replace('\t', ' ').replace('\n', ' ').strip()
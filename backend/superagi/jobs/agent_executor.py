@@ -1,13 +1,18 @@
+import time
 from datetime import datetime, timedelta
 
 from sqlalchemy.orm import sessionmaker
 from superagi.llms.local_llm import LocalLLM
 
 import superagi.worker
+from superagi.agent.agent_execution_context import AgentExecutionContext
 from superagi.agent.agent_iteration_step_handler import AgentIterationStepHandler
+from superagi.agent.agent_message_builder import AgentLlmMessageBuilder
 from superagi.agent.agent_tool_step_handler import AgentToolStepHandler
+from superagi.agent.agent_wait_scheduler import AgentWaitScheduler
 from superagi.agent.agent_workflow_step_wait_handler import AgentWaitStepHandler
 from superagi.agent.types.wait_step_status import AgentWorkflowStepWaitStatus
+from superagi.agent.workflow_graph import WorkflowGraph
 from superagi.apm.event_handler import EventHandler
 from superagi.config.config import get_config
 from superagi.lib.logger import logger
@@ -15,18 +20,18 @@ from superagi.llms.google_palm import GooglePalm
 from superagi.llms.hugging_face import HuggingFace
 from superagi.llms.llm_model_factory import get_model
 from superagi.llms.replicate import Replicate
-from superagi.models.agent import Agent
-from superagi.models.agent_config import AgentConfiguration
 from superagi.models.agent_execution import AgentExecution
 from superagi.models.db import connect_db
 from superagi.models.workflows.agent_workflow_step import AgentWorkflowStep
 from superagi.models.workflows.agent_workflow_step_wait import AgentWorkflowStepWait
 from superagi.types.vector_store_types import VectorStoreType
+from superagi.vector_store.embedding.cached import CachedEmbedding
 from superagi.vector_store.embedding.openai import OpenAiEmbedding
 from superagi.vector_store.vector_factory import VectorFactory
 from superagi.worker import execute_agent
 from superagi.agent.types.agent_workflow_step_action_types import AgentWorkflowStepAction
 from superagi.agent.types.agent_execution_status import AgentExecutionStatus
+from superagi.agent.types.agent_step_outcome import AgentStepOutcome
 
 # from superagi.helper.tool_helper import get_tool_config_by_key
 
@@ -38,88 +43,175 @@ class AgentExecutor:
 
     def execute_next_step(self, agent_execution_id):
         global engine
-        # try:
         engine.dispose()
         session = Session()
         try:
-            agent_execution = session.query(AgentExecution).filter(AgentExecution.id == agent_execution_id).first()
-            '''Avoiding running old agent executions'''
-            if agent_execution and agent_execution.created_at < datetime.utcnow() - timedelta(days=1):
-                logger.error("Older agent execution found, skipping execution")
-                return
+            step_outcome = self._execute_step(session, agent_execution_id, resources={})
+            if step_outcome == AgentStepOutcome.RETRY:
+                superagi.worker.execute_agent.apply_async((agent_execution_id, datetime.now()), countdown=15)
+            elif step_outcome == AgentStepOutcome.CONTINUE:
+                superagi.worker.execute_agent.apply_async((agent_execution_id, datetime.now()), countdown=2)
+            # superagi.worker.execute_agent.delay(agent_execution_id, datetime.now())
+        finally:
+            session.close()
+            engine.dispose()
 
-            agent = session.query(Agent).filter(Agent.id == agent_execution.agent_id).first()
-            agent_config = Agent.fetch_configuration(session, agent.id)
-            if agent.is_deleted or (
-                    agent_execution.status != AgentExecutionStatus.RUNNING.value and agent_execution.status != AgentExecutionStatus.WAITING_FOR_PERMISSION.value):
-                logger.error(f"Agent execution stopped. {agent.id}: {agent_execution.status}")
-                return
+    def execute_run(self, agent_execution_id):
+        """
+        Execute consecutive steps of an agent execution inside the current worker.
 
-            organisation = Agent.find_org_by_agent_id(session, agent_id=agent.id)
-            if self._check_for_max_iterations(session, organisation.id, agent_config, agent_execution_id):
-                logger.error(f"Agent execution stopped. Max iteration exceeded. {agent.id}: {agent_execution.status}")
-                return
+        The session, the LLM client and the memory handle stay warm between steps. The loop ends when the run
+        completes, waits for permission or enters a wait step. After AGENT_RUNNER_MAX_STEPS steps or
+        AGENT_RUNNER_TIME_SLICE seconds the run is re-enqueued, so that other executions get the worker slot.
 
-            try:
-                model_config = AgentConfiguration.get_model_api_key(session, agent_execution.agent_id,
-                                                                    agent_config["model"])
-                model_api_key = model_config['api_key']
-                model_llm_source = model_config['provider']
-            except Exception as e:
-                logger.info(f"Unable to get model config...{e}")
-                return
+        Args:
+            agent_execution_id (int): The ID of the agent execution.
+        """
+        max_steps = int(get_config("AGENT_RUNNER_MAX_STEPS", 10))
+        slice_end = time.monotonic() + int(get_config("AGENT_RUNNER_TIME_SLICE", 300))
+        resources = {}
+        session = Session()
+        try:
+            steps = 0
+            while True:
+                step_outcome = self._execute_step(session, agent_execution_id, resources=resources)
+                if step_outcome == AgentStepOutcome.RETRY:
+                    superagi.worker.execute_agent.apply_async((agent_execution_id, datetime.now()), countdown=15)
+                    return
+                if step_outcome == AgentStepOutcome.STOP:
+                    return
+                steps += 1
+                if steps >= max_steps or time.monotonic() >= slice_end:
+                    logger.info(f"Preempting agent execution {agent_execution_id} after {steps} steps")
+                    superagi.worker.execute_agent.apply_async((agent_execution_id, datetime.now()), countdown=0)
+                    return
+                # Pick up status changes (pause, stop) made by the API between steps
+                session.expire_all()
+        finally:
+            session.close()
 
-            try:
-                memory = None
-                if "OpenAI" in model_llm_source:
-                    vector_store_type = VectorStoreType.get_vector_store_type(get_config("LTM_DB", "Redis"))
-                    memory = VectorFactory.get_vector_storage(vector_store_type, "super-agent-index1",
-                                                              AgentExecutor.get_embedding(model_llm_source,
-                                                                                          model_api_key))
-            except Exception as e:
-                logger.info(f"Unable to setup the connection...{e}")
-                memory = None
-
-            agent_workflow_step = session.query(AgentWorkflowStep).filter(
-                AgentWorkflowStep.id == agent_execution.current_agent_step_id).first()
-            try:
-                self.__execute_workflow_step(agent, agent_config, agent_execution_id, agent_workflow_step, memory,
-                                             model_api_key, organisation, session)
-
-            except Exception as e:
-                logger.info("Exception in executing the step: {}".format(e))
-                superagi.worker.execute_agent.apply_async((agent_execution_id, datetime.now()), countdown=15)
-                return
+    def _execute_step(self, session, agent_execution_id, resources: dict):
+        """
+        Execute a single step of an agent execution.
+
+        Args:
+            session: The database session.
+            agent_execution_id (int): The ID of the agent execution.
+            resources (dict): Clients reused across steps of the same run, filled on first use.
+
+        Returns:
+            AgentStepOutcome: Whether the run should continue, be retried later or stop.
+        """
+        agent_execution = session.query(AgentExecution).filter(AgentExecution.id == agent_execution_id).first()
+        '''Avoiding running old agent executions'''
+        if agent_execution and agent_execution.created_at < datetime.utcnow() - timedelta(days=1):
+            logger.error("Older agent execution found, skipping execution")
+            return AgentStepOutcome.STOP
+
+        context = AgentExecutionContext.load(session, agent_execution.agent_id, agent_execution_id)
+        agent = context.agent
+        agent_config = context.agent_config
+        if agent.is_deleted or (
+                agent_execution.status != AgentExecutionStatus.RUNNING.value and agent_execution.status != AgentExecutionStatus.WAITING_FOR_PERMISSION.value):
+            logger.error(f"Agent execution stopped. {agent.id}: {agent_execution.status}")
+            return AgentStepOutcome.STOP
+
+        organisation = context.organisation
+        if self._check_for_max_iterations(session, organisation.id, agent_config, agent_execution_id):
+            logger.error(f"Agent execution stopped. Max iteration exceeded. {agent.id}: {agent_execution.status}")
+            return AgentStepOutcome.STOP
 
+        if context.model_provider is None:
+            logger.info(f"Unable to get model config...{agent_config['model']}")
+            return AgentStepOutcome.STOP
+        model_api_key = context.model_api_key
+        model_llm_source = context.model_provider
+
+        memory = self._get_memory(resources, model_llm_source, model_api_key)
+        llm = self._get_llm(resources, agent_config["model"], model_api_key, organisation.id)
+
+        agent_workflow_step = WorkflowGraph.get_step(session, agent_execution.current_agent_step_id)
+        try:
+            self.__execute_workflow_step(agent, agent_execution_id, agent_workflow_step, memory, llm, session,
+                                         context)
+
+        except Exception as e:
+            logger.info("Exception in executing the step: {}".format(e))
+            return AgentStepOutcome.RETRY
+
+        agent_execution = session.query(AgentExecution).filter(AgentExecution.id == agent_execution_id).first()
+        if agent_execution.status != AgentExecutionStatus.RUNNING.value:
+            logger.info(f"Agent Execution is {agent_execution.status}, not scheduling the next step")
+            return AgentStepOutcome.STOP
+        return AgentStepOutcome.CONTINUE
+
+    def summarize_history(self, agent_execution_id: int, past_messages: list, output_token_limit: int,
+                          previous_ltm_summary: str = None):
+        """
+        Summarize messages evicted from the history window of an agent execution into its ltm summary.
+
+        The summary lock taken when the summary was scheduled is released once the summary is stored, which also
+        removes the summarised messages from the pending messages of the history window. If the summary fails the
+        lock is kept, so retries of the task do not overlap with a newly scheduled summary, and the task releases
+        it after the last retry so the messages, still pending, are summarised again.
+
+        Args:
+            agent_execution_id (int): The ID of the agent execution.
+            past_messages (list): The evicted messages, oldest first.
+            output_token_limit (int): The token limit of the summary.
+            previous_ltm_summary (str): The last completed summary the messages are merged into.
+        """
+        session = Session()
+        try:
             agent_execution = session.query(AgentExecution).filter(AgentExecution.id == agent_execution_id).first()
-            if agent_execution.status == "COMPLETED" or agent_execution.status == "WAITING_FOR_PERMISSION":
-                logger.info("Agent Execution is completed or waiting for permission")
-                session.close()
+            context = AgentExecutionContext.load(session, agent_execution.agent_id, agent_execution_id)
+            if context.model_provider is None:
+                logger.info(f"Unable to get model config...{context.agent_config['model']}")
+                AgentLlmMessageBuilder.release_ltm_summary_lock(agent_execution_id)
                 return
-            superagi.worker.execute_agent.apply_async((agent_execution_id, datetime.now()), countdown=2)
-            # superagi.worker.execute_agent.delay(agent_execution_id, datetime.now())
+            llm = get_model(model=context.agent_config["model"], api_key=context.model_api_key,
+                            organisation_id=context.organisation.id)
+            AgentLlmMessageBuilder(session, llm, llm.get_model(), context.agent.id, agent_execution_id,
+                                   context=context).build_ltm_summary(past_messages, output_token_limit,
+                                                                      previous_ltm_summary)
+            AgentLlmMessageBuilder.release_ltm_summary_lock(agent_execution_id)
         finally:
             session.close()
-            engine.dispose()
 
-    def __execute_workflow_step(self, agent, agent_config, agent_execution_id, agent_workflow_step, memory,
-                                model_api_key, organisation, session):
+    def _get_llm(self, resources: dict, model: str, model_api_key: str, organisation_id: int):
+        key = ("llm", model, model_api_key, organisation_id)
+        if key not in resources:
+            resources[key] = get_model(model=model, api_key=model_api_key, organisation_id=organisation_id)
+        return resources[key]
+
+    def _get_memory(self, resources: dict, model_llm_source: str, model_api_key: str):
+        if "OpenAI" not in model_llm_source:
+            return None
+        key = ("memory", model_llm_source, model_api_key)
+        if key in resources:
+            return resources[key]
+        try:
+            vector_store_type = VectorStoreType.get_vector_store_type(get_config("LTM_DB", "Redis"))
+            memory = VectorFactory.get_vector_storage(vector_store_type, "super-agent-index1",
+                                                      AgentExecutor.get_embedding(model_llm_source, model_api_key))
+        except Exception as e:
+            logger.info(f"Unable to setup the connection...{e}")
+            return None
+        resources[key] = memory
+        return memory
+
+    def __execute_workflow_step(self, agent, agent_execution_id, agent_workflow_step, memory, llm, session,
+                                context: AgentExecutionContext):
         logger.info("Executing Workflow step : ", agent_workflow_step.action_type)
         if agent_workflow_step.action_type == AgentWorkflowStepAction.TOOL.value:
-            tool_step_handler = AgentToolStepHandler(session,
-                                                     llm=get_model(model=agent_config["model"], api_key=model_api_key,
-                                                                   organisation_id=organisation.id)
-                                                     , agent_id=agent.id, agent_execution_id=agent_execution_id,
-                                                     memory=memory)
+            tool_step_handler = AgentToolStepHandler(session, llm=llm, agent_id=agent.id,
+                                                     agent_execution_id=agent_execution_id, memory=memory,
+                                                     context=context)
             tool_step_handler.execute_step()
         elif agent_workflow_step.action_type == AgentWorkflowStepAction.ITERATION_WORKFLOW.value:
-            iteration_step_handler = AgentIterationStepHandler(session,
-                                                               llm=get_model(model=agent_config["model"],
-                                                                             api_key=model_api_key,
-                                                                             organisation_id=organisation.id)
-                                                               , agent_id=agent.id,
-                                                               agent_execution_id=agent_execution_id, memory=memory)
-            print(get_model(model=agent_config["model"], api_key=model_api_key, organisation_id=organisation.id))
+            iteration_step_handler = AgentIterationStepHandler(session, llm=llm, agent_id=agent.id,
+                                                               agent_execution_id=agent_execution_id, memory=memory,
+                                                               context=context)
             iteration_step_handler.execute_step()
         elif agent_workflow_step.action_type == AgentWorkflowStepAction.WAIT_STEP.value:
             (AgentWaitStepHandler(session=session, agent_id=agent.id,
@@ -129,7 +221,7 @@ class AgentExecutor:
     @classmethod
     def get_embedding(cls, model_source, model_api_key):
         if "OpenAI" in model_source:
-            return OpenAiEmbedding(api_key=model_api_key)
+            return CachedEmbedding(OpenAiEmbedding(api_key=model_api_key))
         if "Google" in model_source:
             return GooglePalm(api_key=model_api_key)
         if "Hugging" in model_source:
@@ -157,30 +249,47 @@ class AgentExecutor:
         return False
 
     def execute_waiting_workflows(self):
-        """Check if wait time of wait workflow step is over and can be resumed."""
+        """Resume the agent executions whose wait step is over."""
 
         session = Session()
-        waiting_agent_executions = session.query(AgentExecution).filter(
-            AgentExecution.status == AgentExecutionStatus.WAIT_STEP.value,
-        ).all()
-        for agent_execution in waiting_agent_executions:
-            workflow_step = session.query(AgentWorkflowStep).filter(
-                AgentWorkflowStep.id == agent_execution.current_agent_step_id).first()
-            step_wait = AgentWorkflowStepWait.find_by_id(session, workflow_step.action_reference_id)
-            if step_wait is not None:
-                wait_time = step_wait.delay if not None else 0
-                logger.info(f"Agent Execution ID: {agent_execution.id}")
-                logger.info(f"Wait time: {wait_time}")
-                logger.info(f"Wait begin time: {step_wait.wait_begin_time}")
-                logger.info(f"Current time: {datetime.now()}")
-                logger.info(f"Wait Difference : {(datetime.now() - step_wait.wait_begin_time).total_seconds()}")
-                if ((datetime.now() - step_wait.wait_begin_time).total_seconds() > wait_time
-                        and step_wait.status == AgentWorkflowStepWaitStatus.WAITING.value):
-                    agent_execution.status = AgentExecutionStatus.RUNNING.value
-                    step_wait.status = AgentWorkflowStepWaitStatus.COMPLETED.value
-                    session.commit()
-                    session.flush()
-                    AgentWaitStepHandler(session=session, agent_id=agent_execution.agent_id,
-                                         agent_execution_id=agent_execution.id).handle_next_step()
-                    execute_agent.delay(agent_execution.id, datetime.now())
-        session.close()
\ No newline at end of file
+        try:
+            for agent_execution_id, claim in AgentWaitScheduler.claim_due():
+                try:
+                    self.resume_waiting_workflow(session, agent_execution_id)
+                except Exception as e:
+                    # The wake-up stays claimed and is retried once the claim times out
+                    session.rollback()
+                    logger.error(f"Unable to resume agent execution {agent_execution_id}: {e}")
+                    continue
+                AgentWaitScheduler.complete(agent_execution_id, claim)
+        finally:
+            session.close()
+
+    def resume_waiting_workflow(self, session, agent_execution_id: int):
+        """
+        Move an agent execution past its wait step if the wait is over, otherwise schedule its wake-up again.
+
+        Args:
+            session: The database session.
+            agent_execution_id (int): The ID of the agent execution.
+        """
+        agent_execution = AgentExecution.get_agent_execution_from_id(session, agent_execution_id)
+        if agent_execution is None or agent_execution.status != AgentExecutionStatus.WAIT_STEP.value:
+            return
+        step_wait = session.query(AgentWorkflowStepWait) \
+            .join(AgentWorkflowStep, AgentWorkflowStep.action_reference_id == AgentWorkflowStepWait.id) \
+            .filter(AgentWorkflowStep.id == agent_execution.current_agent_step_id).first()
+        if step_wait is None or step_wait.status != AgentWorkflowStepWaitStatus.WAITING.value:
+            return
+        deadline = AgentWaitScheduler.deadline(step_wait.wait_begin_time, step_wait.delay)
+        if deadline > time.time():
+            AgentWaitScheduler.schedule(agent_execution_id, deadline)
+            return
+        logger.info(f"Resuming agent execution {agent_execution_id} after its wait of {step_wait.delay}s")
+        agent_execution.status = AgentExecutionStatus.RUNNING.value
+        step_wait.status = AgentWorkflowStepWaitStatus.COMPLETED.value
+        session.commit()
+        session.flush()
+        AgentWaitStepHandler(session=session, agent_id=agent_execution.agent_id,
+                             agent_execution_id=agent_execution.id).handle_next_step()
+        execute_agent.delay(agent_execution.id, datetime.now())
@@ -1,9 +1,9 @@
-import ast
 from datetime import datetime
+from typing import List, Tuple
 
 from fastapi import HTTPException
+from sqlalchemy import insert
 from sqlalchemy.orm import sessionmaker
-from superagi.models.tool import Tool
 
 from superagi.models.workflows.iteration_workflow import IterationWorkflow
 from superagi.worker import execute_agent
@@ -13,8 +13,10 @@ from superagi.models.agent_config import AgentConfiguration
 from superagi.models.agent_execution import AgentExecution
 from superagi.models.agent_execution_config import AgentExecutionConfiguration
 from superagi.apm.event_handler import EventHandler
+from superagi.lib.logger import logger
 from superagi.models.knowledges import Knowledges
 from superagi.models.db import connect_db
+from superagi.models.project import Project
 
 
 engine = connect_db()
@@ -31,55 +33,112 @@ class ScheduledAgentExecutor:
             name: Name of the agent
         """
         session = Session()
-        agent = session.query(Agent).get(agent_id)
-
-        if not agent:
-            raise HTTPException(status_code=404, detail="Agent not found")
-
-
-
-        start_step = AgentWorkflow.fetch_trigger_step_id(session, agent.agent_workflow_id)
-        iteration_step_id = IterationWorkflow.fetch_trigger_step_id(session,
-                                                                    start_step.action_reference_id).id if start_step.action_type == "ITERATION_WORKFLOW" else -1
-
-        db_agent_execution = AgentExecution(status="CREATED", last_execution_time=datetime.now(),
-                                            agent_id=agent_id, name=name, num_of_calls=0,
-                                            num_of_tokens=0,
-                                            current_agent_step_id=start_step.id,
-                                            iteration_workflow_step_id=iteration_step_id)
-
-        session.add(db_agent_execution)
-        session.commit()
-
-        #update status from CREATED to RUNNING
-        db_agent_execution.status = "RUNNING"
-        session.commit()
-
-        agent_execution_id = db_agent_execution.id
-        agent_configurations = session.query(AgentConfiguration).filter(AgentConfiguration.agent_id == agent_id).all()
-        for agent_config in agent_configurations:
-            agent_execution_config = AgentExecutionConfiguration(agent_execution_id=agent_execution_id, key=agent_config.key, value=agent_config.value)
-            session.add(agent_execution_config)
-        organisation = agent.get_agent_organisation(session)
-        model = session.query(AgentConfiguration.value).filter(AgentConfiguration.agent_id == agent_id).filter(AgentConfiguration.key == 'model').first()[0]
-
-        EventHandler(session=session).create_event('run_created',
-                                                   {'agent_execution_id': db_agent_execution.id,
-                                                    'agent_execution_name':db_agent_execution.name},
-                                                    agent_id,
-                                                    organisation.id if organisation else 0)
-        agent_execution_knowledge = AgentConfiguration.get_agent_config_by_key_and_agent_id(session= session, key= 'knowledge', agent_id= agent_id)
-        if agent_execution_knowledge and agent_execution_knowledge.value != 'None':
-            knowledge_name = Knowledges.get_knowledge_from_id(session, int(agent_execution_knowledge.value)).name
-            if knowledge_name is not None:
-                EventHandler(session=session).create_event('knowledge_picked',
-                                                        {'knowledge_name': knowledge_name,
-                                                         'agent_execution_id': db_agent_execution.id},
-                                                        agent_id,
-                                                        organisation.id if organisation else 0)
-        session.commit()
-
-        if db_agent_execution.status == "RUNNING":
-            execute_agent.delay(db_agent_execution.id, datetime.now())
-
-        session.close()
\ No newline at end of file
+        try:
+            executions = self.create_scheduled_executions(session, [(agent_id, name)])
+            if not executions:
+                raise HTTPException(status_code=404, detail="Agent not found")
+            session.commit()
+            self.start_scheduled_executions(session, executions)
+        finally:
+            session.close()
+
+    def create_scheduled_executions(self, session, runs: List[Tuple[int, str]]) -> List[dict]:
+        """
+        Create the executions of scheduled agents and their configurations in bulk, without committing.
+
+        Args:
+            session: The database session.
+            runs (List[Tuple[int, str]]): The agent IDs with the names of their executions.
+
+        Returns:
+            List[dict]: The created executions with 'agent_execution_id', 'agent_id', 'name', 'organisation_id' and
+                'knowledge_name', to pass to start_scheduled_executions once committed.
+        """
+        agent_ids = {agent_id for agent_id, _ in runs}
+        if not agent_ids:
+            return []
+        agents = {agent.id: agent for agent in session.query(Agent).filter(Agent.id.in_(agent_ids)).all()}
+        organisation_ids = dict(session.query(Agent.id, Project.organisation_id)
+                                .join(Project, Project.id == Agent.project_id)
+                                .filter(Agent.id.in_(agent_ids)).all())
+        agent_configurations = {}
+        for agent_config in session.query(AgentConfiguration).filter(AgentConfiguration.agent_id.in_(agent_ids)).all():
+            agent_configurations.setdefault(agent_config.agent_id, []).append(agent_config)
+        knowledge_names = self._fetch_knowledge_names(session, agent_configurations)
+
+        start_steps = {}
+        executions = []
+        for agent_id, name in runs:
+            agent = agents.get(agent_id)
+            if agent is None:
+                logger.error(f"Scheduled agent {agent_id} not found")
+                continue
+            if agent.agent_workflow_id not in start_steps:
+                start_step = AgentWorkflow.fetch_trigger_step_id(session, agent.agent_workflow_id)
+                iteration_step_id = IterationWorkflow.fetch_trigger_step_id(
+                    session, start_step.action_reference_id).id if start_step.action_type == "ITERATION_WORKFLOW" else -1
+                start_steps[agent.agent_workflow_id] = (start_step.id, iteration_step_id)
+            start_step_id, iteration_step_id = start_steps[agent.agent_workflow_id]
+            executions.append(AgentExecution(status="CREATED", last_execution_time=datetime.now(),
+                                             agent_id=agent_id, name=name, num_of_calls=0,
+                                             num_of_tokens=0,
+                                             current_agent_step_id=start_step_id,
+                                             iteration_workflow_step_id=iteration_step_id))
+        if not executions:
+            return []
+        session.add_all(executions)
+        session.flush()
+
+        # update status from CREATED to RUNNING
+        for db_agent_execution in executions:
+            db_agent_execution.status = "RUNNING"
+
+        execution_configs = [{"agent_execution_id": db_agent_execution.id, "key": agent_config.key,
+                              "value": agent_config.value}
+                             for db_agent_execution in executions
+                             for agent_config in agent_configurations.get(db_agent_execution.agent_id, [])]
+        if execution_configs:
+            session.execute(insert(AgentExecutionConfiguration), execution_configs)
+
+        return [{"agent_execution_id": db_agent_execution.id, "agent_id": db_agent_execution.agent_id,
+                 "name": db_agent_execution.name,
+                 "organisation_id": organisation_ids.get(db_agent_execution.agent_id) or 0,
+                 "knowledge_name": knowledge_names.get(db_agent_execution.agent_id)}
+                for db_agent_execution in executions]
+
+    @staticmethod
+    def _fetch_knowledge_names(session, agent_configurations: dict) -> dict:
+        knowledge_ids = {}
+        for agent_id, agent_configs in agent_configurations.items():
+            for agent_config in agent_configs:
+                if agent_config.key == "knowledge" and agent_config.value not in [None, "None", ""]:
+                    knowledge_ids[agent_id] = int(agent_config.value)
+        if not knowledge_ids:
+            return {}
+        names = dict(session.query(Knowledges.id, Knowledges.name)
+                     .filter(Knowledges.id.in_(set(knowledge_ids.values()))).all())
+        return {agent_id: names.get(knowledge_id) for agent_id, knowledge_id in knowledge_ids.items()}
+
+    def start_scheduled_executions(self, session, executions: List[dict]):
+        """
+        Record the run events of committed scheduled executions and queue them.
+
+        Args:
+            session: The database session.
+            executions (List[dict]): The executions returned by create_scheduled_executions.
+        """
+        event_handler = EventHandler(session=session)
+        for execution in executions:
+            event_handler.create_event('run_created',
+                                       {'agent_execution_id': execution["agent_execution_id"],
+                                        'agent_execution_name': execution["name"]},
+                                       execution["agent_id"],
+                                       execution["organisation_id"])
+            if execution["knowledge_name"] is not None:
+                event_handler.create_event('knowledge_picked',
+                                           {'knowledge_name': execution["knowledge_name"],
+                                            'agent_execution_id': execution["agent_execution_id"]},
+                                           execution["agent_id"],
+                                           execution["organisation_id"])
+        for execution in executions:
+            execute_agent.delay(execution["agent_execution_id"], datetime.now())
@@ -60,6 +60,8 @@ class GooglePalm(BaseLlm):
         if len(messages) == 1:
             prompt = messages[0]['content']
         try:
+            # The palm client is configured globally, cached instances of other organisations may have reconfigured it
+            palm.configure(api_key=self.api_key)
             # NOTE: Default chat based palm bison model has different issues. We will switch to it once it gets fixed.
             final_model = "models/text-bison-001" if self.model == "models/chat-bison-001" else self.model
             completion = palm.generate_text(
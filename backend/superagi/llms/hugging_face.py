@@ -25,6 +25,8 @@ class HuggingFace(BaseLlm):
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
         }
+        self.http_session = requests.Session()
+        self.http_session.headers.update(self.headers)
 
     def get_source(self):
             return "hugging face"
@@ -79,19 +81,19 @@ class HuggingFace(BaseLlm):
         try:
             if isinstance(messages, list):
                 messages = messages[0]["content"] + "\nThe response in json schema:"
-            params = self.task_params
+            params = dict(self.task_params)
             if self.task == Tasks.TEXT_GENERATION:
                 params["max_new_tokens"] = max_tokens
             params['return_full_text'] = False
             payload = {
                 "inputs": messages,
-                "parameters": self.task_params,
+                "parameters": params,
                 "options": {
                     "use_cache": False,
                     "wait_for_model": True,
                 }
             }
-            response = requests.post(self.end_point, headers=self.headers, data=json.dumps(payload))
+            response = self.http_session.post(self.end_point, data=json.dumps(payload))
             completion = json.loads(response.content.decode("utf-8"))
             logger.info(f"{completion=}")
             if self.task == Tasks.TEXT_GENERATION:
@@ -1,3 +1,7 @@
+import hashlib
+
+from superagi.config.config import get_config
+from superagi.helper.ttl_cache import TTLCache
 from superagi.llms.google_palm import GooglePalm
 from superagi.llms.local_llm import LocalLLM
 from superagi.llms.openai import OpenAi
@@ -8,38 +12,86 @@ from superagi.models.models import Models
 from sqlalchemy.orm import sessionmaker
 from superagi.models.db import connect_db
 
+# Model rows and the clients built from them are reused across steps, tools and executions of the same worker
+_model_details_cache = TTLCache(maxsize=int(get_config("LLM_CLIENT_CACHE_SIZE", 128)),
+                                ttl=int(get_config("LLM_CLIENT_CACHE_TTL", 600)))
+_model_client_cache = TTLCache(maxsize=int(get_config("LLM_CLIENT_CACHE_SIZE", 128)),
+                               ttl=int(get_config("LLM_CLIENT_CACHE_TTL", 600)))
 
-def get_model(organisation_id, api_key, model="gpt-3.5-turbo", **kwargs):
+
+def _fetch_model_details(organisation_id, model):
     print("Fetching model details from database...")
     engine = connect_db()
     Session = sessionmaker(bind=engine)
     session = Session()
+    try:
+        model_instance = session.query(Models).filter(Models.org_id == organisation_id, Models.model_name == model).first()
+        response = session.query(ModelsConfig.provider).filter(ModelsConfig.org_id == organisation_id,
+                                                               ModelsConfig.id == model_instance.model_provider_id).first()
+        return {"model_name": model_instance.model_name, "version": model_instance.version,
+                "end_point": model_instance.end_point, "context_length": model_instance.context_length,
+                "provider": response.provider}
+    finally:
+        session.close()
 
-    model_instance = session.query(Models).filter(Models.org_id == organisation_id, Models.model_name == model).first()
-    response = session.query(ModelsConfig.provider).filter(ModelsConfig.org_id == organisation_id,
-                                                                   ModelsConfig.id == model_instance.model_provider_id).first()
-    provider_name = response.provider
-
-    session.close()
 
+def _build_model(details, api_key, **kwargs):
+    provider_name = details["provider"]
     if provider_name == 'OpenAI':
         print("Provider is OpenAI")
-        return OpenAi(model=model_instance.model_name, api_key=api_key, **kwargs)
+        return OpenAi(model=details["model_name"], api_key=api_key, **kwargs)
     elif provider_name == 'Replicate':
         print("Provider is Replicate")
-        return Replicate(model=model_instance.model_name, version=model_instance.version, api_key=api_key, **kwargs)
+        return Replicate(model=details["model_name"], version=details["version"], api_key=api_key, **kwargs)
     elif provider_name == 'Google Palm':
         print("Provider is Google Palm")
-        return GooglePalm(model=model_instance.model_name, api_key=api_key, **kwargs)
+        return GooglePalm(model=details["model_name"], api_key=api_key, **kwargs)
     elif provider_name == 'Hugging Face':
         print("Provider is Hugging Face")
-        return HuggingFace(model=model_instance.model_name, end_point=model_instance.end_point, api_key=api_key, **kwargs)
+        return HuggingFace(model=details["model_name"], end_point=details["end_point"], api_key=api_key, **kwargs)
     elif provider_name == 'Local LLM':
         print("Provider is Local LLM")
-        return LocalLLM(model=model_instance.model_name, context_length=model_instance.context_length)
+        return LocalLLM(model=details["model_name"], context_length=details["context_length"])
     else:
         print('Unknown provider.')
 
+
+def get_model(organisation_id, api_key, model="gpt-3.5-turbo", **kwargs):
+    """
+    Get an LLM client for a model of the organisation. Clients are cached per organisation, model, provider,
+    API key and sampling parameters.
+
+    Args:
+        organisation_id (int): The ID of the organisation.
+        api_key (str): The API key of the model provider.
+        model (str): The model name.
+        **kwargs: Sampling parameters passed to the client, e.g. temperature.
+
+    Returns:
+        BaseLlm: The LLM client, None if the provider is unknown.
+    """
+    details = _model_details_cache.get_or_set((organisation_id, model),
+                                              lambda: _fetch_model_details(organisation_id, model))
+    api_key_hash = hashlib.sha256(str(api_key).encode()).hexdigest()
+    cache_key = (organisation_id, model, details["provider"], api_key_hash, tuple(sorted(kwargs.items())))
+    return _model_client_cache.get_or_set(cache_key, lambda: _build_model(details, api_key, **kwargs))
+
+
+def invalidate_model_cache(organisation_id=None):
+    """
+    Drop cached model details and clients, e.g. after models or provider keys are changed.
+
+    Args:
+        organisation_id (int): Only drop entries of this organisation. All entries are dropped if None.
+    """
+    if organisation_id is None:
+        _model_details_cache.clear()
+        _model_client_cache.clear()
+        return
+    _model_details_cache.invalidate(lambda key: key[0] == organisation_id)
+    _model_client_cache.invalidate(lambda key: key[0] == organisation_id)
+
+
 def build_model_with_api_key(provider_name, api_key):
     if provider_name.lower() == 'openai':
         return OpenAi(api_key=api_key)
@@ -31,6 +31,7 @@ class LocalLLM(BaseLlm):
         llm_loader = LLMLoader(self.context_length)
         self.llm_model = llm_loader.model
         self.llm_grammar = llm_loader.grammar
+        self.inference_lock = llm_loader.inference_lock
 
     def chat_completion(self, messages, max_tokens=get_config("MAX_MODEL_TOKEN_LIMIT")):
         """
@@ -48,8 +49,9 @@ class LocalLLM(BaseLlm):
                 logger.error("Model not found.")
                 return {"error": "Model loading error", "message": "Model not found. Please check your model path and try again."}
             else:
-                response = self.llm_model.create_chat_completion(messages=messages, functions=None, function_call=None, temperature=self.temperature, top_p=self.top_p,
-                                                                 max_tokens=int(max_tokens), presence_penalty=self.presence_penalty, frequency_penalty=self.frequency_penalty, grammar=self.llm_grammar)
+                with self.inference_lock:
+                    response = self.llm_model.create_chat_completion(messages=messages, functions=None, function_call=None, temperature=self.temperature, top_p=self.top_p,
+                                                                     max_tokens=int(max_tokens), presence_penalty=self.presence_penalty, frequency_penalty=self.frequency_penalty, grammar=self.llm_grammar)
                 content = response["choices"][0]["message"]["content"]
                 logger.info(content)
                 return {"response": response, "content": content}
@@ -39,8 +39,9 @@ class OpenAi(BaseLlm):
         self.presence_penalty = presence_penalty
         self.number_of_results = number_of_results
         self.api_key = api_key
+        self.api_base = get_config("OPENAI_API_BASE", "https://api.openai.com/v1")
         openai.api_key = api_key
-        openai.api_base = get_config("OPENAI_API_BASE", "https://api.openai.com/v1")
+        openai.api_base = self.api_base
 
     def get_source(self):
         return "openai"
@@ -83,7 +84,10 @@ class OpenAi(BaseLlm):
         """
         try:
             # openai.api_key = get_config("OPENAI_API_KEY")
+            # Key and base are passed per request, cached clients of other organisations may have reset the globals
             response = openai.ChatCompletion.create(
+                api_key=self.api_key,
+                api_base=self.api_base,
                 n=self.number_of_results,
                 model=self.model,
                 messages=messages,
@@ -122,7 +126,7 @@ class OpenAi(BaseLlm):
             bool: True if the access key is valid, False otherwise.
         """
         try:
-            models = openai.Model.list()
+            models = openai.Model.list(api_key=self.api_key, api_base=self.api_base)
             return True
         except Exception as exception:
             logger.info("OpenAi Exception:", exception)
@@ -136,7 +140,7 @@ class OpenAi(BaseLlm):
             list: The models.
         """
         try:
-            models = openai.Model.list()
+            models = openai.Model.list(api_key=self.api_key, api_base=self.api_base)
             models = [model["id"] for model in models["data"]]
             models_supported = ['gpt-4', 'gpt-3.5-turbo', 'gpt-3.5-turbo-16k', 'gpt-4-32k']
             models = [model for model in models if model in models_supported]
@@ -67,3 +67,24 @@ class AgentExecutionFeed(DBBaseModel):
             return agent_feeds
         else:
             return agent_feeds[2:]
+
+    @classmethod
+    def fetch_feeds_after(cls, session, agent_execution_id: int, feed_group_id: str, last_feed_id: int = 0):
+        """
+        Fetches the feeds of a feed group of an agent execution that were added after the given feed.
+
+        Args:
+            session: The database session.
+            agent_execution_id (int): The ID of the agent execution.
+            feed_group_id (str): The feed group to fetch.
+            last_feed_id (int): Only feeds with a greater ID are returned.
+
+        Returns:
+            list: Rows with role, feed and id, in creation order.
+        """
+        return session.query(AgentExecutionFeed.role, AgentExecutionFeed.feed, AgentExecutionFeed.id) \
+            .filter(AgentExecutionFeed.agent_execution_id == agent_execution_id,
+                    AgentExecutionFeed.feed_group_id == feed_group_id,
+                    AgentExecutionFeed.id > last_feed_id) \
+            .order_by(asc(AgentExecutionFeed.created_at)) \
+            .all()
@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Integer, String, Float, BigInteger, UniqueConstraint
+
+from superagi.models.base_model import DBBaseModel
+
+
+class AnalyticsAgentRollup(DBBaseModel):
+    """
+    Per agent totals of the analytics events, maintained incrementally as events are ingested.
+
+    Attributes:
+        id (Integer): The unique identifier of the rollup.
+        org_id (Integer): The ID of the organisation.
+        agent_id (Integer): The ID of the agent.
+        agent_name (String): The agent name of the last agent_created event.
+        model (String): The model of the last agent_created event.
+        runs_completed (Integer): The number of run_completed and run_iteration_limit_crossed events.
+        total_tokens (BigInteger): The tokens consumed by the completed runs.
+        total_calls (BigInteger): The calls made by the completed runs.
+        run_time_total (Float): The sum of the run times, in seconds, of the completed runs with a known start.
+        run_time_count (Integer): The number of runs summed in run_time_total.
+    """
+    __tablename__ = 'analytics_agent_rollups'
+    __table_args__ = (UniqueConstraint('org_id', 'agent_id', name='uq_analytics_agent_rollups_agent'),)
+
+    id = Column(Integer, primary_key=True)
+    org_id = Column(Integer, nullable=False, index=True)
+    agent_id = Column(Integer, nullable=False)
+    agent_name = Column(String, nullable=True)
+    model = Column(String, nullable=True)
+    runs_completed = Column(Integer, nullable=False, default=0)
+    total_tokens = Column(BigInteger, nullable=False, default=0)
+    total_calls = Column(BigInteger, nullable=False, default=0)
+    run_time_total = Column(Float, nullable=False, default=0)
+    run_time_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"AnalyticsAgentRollup(org_id={self.org_id}, agent_id={self.agent_id}, model={self.model}, " \
+               f"runs_completed={self.runs_completed}, total_tokens={self.total_tokens})"
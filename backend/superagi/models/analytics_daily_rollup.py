@@ -0,0 +1,47 @@
+from sqlalchemy import Column, Integer, String, Date, BigInteger, UniqueConstraint
+
+from superagi.models.base_model import DBBaseModel
+
+
+class AnalyticsDailyRollup(DBBaseModel):
+    """
+    Daily counters of the analytics events per organisation, agent, model, tool and knowledge.
+
+    Run counters are kept on the rows without a tool and knowledge, tool_used events are counted on the row of
+    their tool and knowledge_picked events on the row of their knowledge. Empty strings stand for no value, so
+    the rows can be upserted on the unique key.
+
+    Attributes:
+        id (Integer): The unique identifier of the rollup.
+        org_id (Integer): The ID of the organisation.
+        day (Date): The UTC day of the events.
+        agent_id (Integer): The ID of the agent.
+        model (String): The model of the agent.
+        tool_name (String): The name of the tool.
+        knowledge_name (String): The name of the knowledge.
+        runs_completed (Integer): The number of run end events.
+        tokens (BigInteger): The tokens consumed by the completed runs.
+        calls (BigInteger): The calls made by the completed runs.
+        tool_calls (Integer): The number of tool_used events.
+        knowledge_picks (Integer): The number of knowledge_picked events.
+    """
+    __tablename__ = 'analytics_daily_rollups'
+    __table_args__ = (UniqueConstraint('org_id', 'day', 'agent_id', 'model', 'tool_name', 'knowledge_name',
+                                       name='uq_analytics_daily_rollups_key'),)
+
+    id = Column(Integer, primary_key=True)
+    org_id = Column(Integer, nullable=False, index=True)
+    day = Column(Date, nullable=False)
+    agent_id = Column(Integer, nullable=False)
+    model = Column(String, nullable=False, default='')
+    tool_name = Column(String, nullable=False, default='')
+    knowledge_name = Column(String, nullable=False, default='')
+    runs_completed = Column(Integer, nullable=False, default=0)
+    tokens = Column(BigInteger, nullable=False, default=0)
+    calls = Column(BigInteger, nullable=False, default=0)
+    tool_calls = Column(Integer, nullable=False, default=0)
+    knowledge_picks = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"AnalyticsDailyRollup(org_id={self.org_id}, day={self.day}, agent_id={self.agent_id}, " \
+               f"tool_name={self.tool_name}, knowledge_name={self.knowledge_name})"
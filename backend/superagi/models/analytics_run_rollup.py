@@ -0,0 +1,36 @@
+from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint
+
+from superagi.models.base_model import DBBaseModel
+
+
+class AnalyticsRunRollup(DBBaseModel):
+    """
+    One row per agent execution, combining its run_created and run end events.
+
+    Attributes:
+        id (Integer): The unique identifier of the rollup.
+        org_id (Integer): The ID of the organisation.
+        agent_id (Integer): The ID of the agent.
+        agent_execution_id (Integer): The ID of the agent execution.
+        agent_execution_name (String): The name of the agent execution.
+        started_at (DateTime): The time of the first run_created event, None if it was not seen.
+        ended_at (DateTime): The time of the last run end event, None while the run is active.
+        tokens_consumed (Integer): The tokens consumed reported by the last run end event.
+        calls (Integer): The calls reported by the last run end event.
+    """
+    __tablename__ = 'analytics_run_rollups'
+    __table_args__ = (UniqueConstraint('org_id', 'agent_execution_id', name='uq_analytics_run_rollups_execution'),)
+
+    id = Column(Integer, primary_key=True)
+    org_id = Column(Integer, nullable=False, index=True)
+    agent_id = Column(Integer, nullable=False, index=True)
+    agent_execution_id = Column(Integer, nullable=False)
+    agent_execution_name = Column(String, nullable=True)
+    started_at = Column(DateTime, nullable=True)
+    ended_at = Column(DateTime, nullable=True)
+    tokens_consumed = Column(Integer, nullable=True)
+    calls = Column(Integer, nullable=True)
+
+    def __repr__(self):
+        return f"AnalyticsRunRollup(org_id={self.org_id}, agent_execution_id={self.agent_execution_id}, " \
+               f"started_at={self.started_at}, ended_at={self.ended_at})"
@@ -1,7 +1,8 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect
 from superagi.config.config import get_config
 from urllib.parse import urlparse
 from superagi.lib.logger import logger
+from superagi.models.base_model import Base
 
 engine = None
 
@@ -50,3 +51,20 @@ def connect_db():
     except Exception as e:
         logger.error(f"Unable to connect to the database:{e}")
     return engine
+
+
+def create_tables(models):
+    """
+    Creates the tables of the given models that do not exist yet. Existing tables are left unchanged.
+
+    Args:
+        models: The SQLAlchemy models of the tables.
+
+    Returns:
+        list: The names of the tables that were created.
+    """
+    db_engine = connect_db()
+    inspector = inspect(db_engine)
+    missing_tables = [model.__table__ for model in models if not inspector.has_table(model.__tablename__)]
+    Base.metadata.create_all(bind=db_engine, tables=missing_tables, checkfirst=True)
+    return [table.name for table in missing_tables]
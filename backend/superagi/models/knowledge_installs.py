@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import BigInteger, Column, Integer, String, Text, and_, or_
+
+from superagi.models.base_model import DBBaseModel
+from superagi.types.knowledge_install_status import KnowledgeInstallStatus
+
+
+class KnowledgeInstalls(DBBaseModel):
+    """
+    The installation of a marketplace knowledge into a vector db index, with its progress checkpoint.
+
+    Attributes:
+        id (int): The unique identifier of the installation.
+        organisation_id (int): The identifier of the organisation installing the knowledge.
+        knowledge_name (str): The marketplace name of the knowledge.
+        vector_db_index_id (int): The identifier of the index the knowledge is installed into.
+        status (str): The KnowledgeInstallStatus of the installation.
+        chunks_installed (int): The number of chunks upserted, in the order of the chunk file.
+        bytes_installed (int): The byte offset of the chunk file just after the last upserted chunk.
+        bytes_total (int): The size of the chunk file, None until the installation starts.
+        error (str): The error of the last failed attempt.
+    """
+
+    __tablename__ = 'knowledge_installs'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    organisation_id = Column(Integer, index=True)
+    knowledge_name = Column(String)
+    vector_db_index_id = Column(Integer)
+    status = Column(String)
+    chunks_installed = Column(Integer, default=0)
+    bytes_installed = Column(BigInteger, default=0)
+    bytes_total = Column(BigInteger, nullable=True)
+    error = Column(Text, nullable=True)
+
+    def __repr__(self):
+        return f"KnowledgeInstalls(id={self.id}, knowledge_name='{self.knowledge_name}', " \
+               f"vector_db_index_id={self.vector_db_index_id}, status={self.status}, " \
+               f"chunks_installed={self.chunks_installed})"
+
+    @classmethod
+    def find_by_id(cls, session, install_id: int):
+        return session.query(KnowledgeInstalls).filter(KnowledgeInstalls.id == install_id).first()
+
+    @classmethod
+    def find_or_create(cls, session, organisation_id: int, knowledge_name: str, vector_db_index_id: int):
+        """
+        Get the unfinished installation of a knowledge into an index, or create one.
+
+        Returns:
+            KnowledgeInstalls: The installation, a failed one is pending again and resumes from its checkpoint.
+        """
+        install = session.query(KnowledgeInstalls).filter(
+            KnowledgeInstalls.organisation_id == organisation_id,
+            KnowledgeInstalls.knowledge_name == knowledge_name,
+            KnowledgeInstalls.vector_db_index_id == vector_db_index_id,
+            KnowledgeInstalls.status != KnowledgeInstallStatus.COMPLETE.value).order_by(
+            KnowledgeInstalls.id.desc()).first()
+        if install is None:
+            install = KnowledgeInstalls(organisation_id=organisation_id, knowledge_name=knowledge_name,
+                                        vector_db_index_id=vector_db_index_id,
+                                        status=KnowledgeInstallStatus.PENDING.value, chunks_installed=0,
+                                        bytes_installed=0)
+            session.add(install)
+        elif install.status == KnowledgeInstallStatus.FAILED.value:
+            install.status = KnowledgeInstallStatus.PENDING.value
+        session.commit()
+        return install
+
+    @classmethod
+    def claim(cls, session, install_id: int, stale_after_seconds: int) -> bool:
+        """
+        Atomically mark an installation as running, if it is pending, failed or running without recent progress.
+
+        Returns:
+            bool: True if the installation was claimed, False if another worker is running it or it is complete.
+        """
+        now = datetime.utcnow()
+        claimed = session.query(KnowledgeInstalls).filter(
+            KnowledgeInstalls.id == install_id,
+            or_(KnowledgeInstalls.status.in_([KnowledgeInstallStatus.PENDING.value,
+                                              KnowledgeInstallStatus.FAILED.value]),
+                and_(KnowledgeInstalls.status == KnowledgeInstallStatus.RUNNING.value,
+                     KnowledgeInstalls.updated_at < now - timedelta(seconds=stale_after_seconds)))
+        ).update({"status": KnowledgeInstallStatus.RUNNING.value, "error": None, "updated_at": now},
+                 synchronize_session=False)
+        session.commit()
+        return claimed == 1
+
+    def is_stale(self, stale_after_seconds: int) -> bool:
+        """Check if a running installation has not made progress recently, its worker has likely died."""
+        return self.status == KnowledgeInstallStatus.RUNNING.value and self.updated_at is not None and \
+            datetime.utcnow() - self.updated_at > timedelta(seconds=stale_after_seconds)
+
+    @classmethod
+    def update_status(cls, session, install_id: int, status: KnowledgeInstallStatus, error: str = None):
+        install = cls.find_by_id(session, install_id)
+        install.status = status.value
+        install.error = error
+        session.commit()
+
+    @classmethod
+    def update_progress(cls, session, install_id: int, chunks_installed: int, bytes_installed: int,
+                        bytes_total: int = None):
+        install = cls.find_by_id(session, install_id)
+        install.chunks_installed = chunks_installed
+        install.bytes_installed = bytes_installed
+        if bytes_total is not None:
+            install.bytes_total = bytes_total
+        session.commit()
+
+    def get_progress(self) -> dict:
+        progress = None
+        if self.status == KnowledgeInstallStatus.COMPLETE.value:
+            progress = 100.0
+        elif self.bytes_total:
+            progress = round(100.0 * self.bytes_installed / self.bytes_total, 2)
+        return {
+            "id": self.id,
+            "knowledge_name": self.knowledge_name,
+            "vector_db_index_id": self.vector_db_index_id,
+            "status": self.status,
+            "chunks_installed": self.chunks_installed,
+            "progress": progress,
+            "error": self.error,
+        }
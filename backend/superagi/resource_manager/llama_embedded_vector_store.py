@@ -0,0 +1,54 @@
+from typing import Any, List
+
+from llama_index.schema import MetadataMode
+from llama_index.vector_stores.types import VectorStore, VectorStoreQuery, VectorStoreQueryResult
+from llama_index.vector_stores.utils import metadata_dict_to_node, node_to_metadata_dict
+
+from superagi.types.vector_store_types import VectorStoreType
+from superagi.vector_store.embedded_index import EmbeddedIndex
+from superagi.vector_store.vector_store_registry import VectorStoreRegistry
+
+
+class LlamaEmbeddedVectorStore(VectorStore):
+    """
+    Llama index vector store backed by an EmbeddedIndex, so resources can be stored and queried without an external
+    vector database. The node metadata is stored flat, so the agent_id and resource_id filters match it directly.
+    """
+
+    stores_text: bool = True
+
+    def __init__(self, index_name: str):
+        self._index = VectorStoreRegistry.get_client((VectorStoreType.EMBEDDED, index_name),
+                                                     lambda: EmbeddedIndex.open(index_name))
+
+    @property
+    def client(self) -> Any:
+        return self._index
+
+    def add(self, nodes: List[Any]) -> List[str]:
+        """Add nodes with their embeddings, older llama index versions pass NodeWithEmbedding results."""
+        ids, embeddings, texts, metadatas = [], [], [], []
+        for result in nodes:
+            node = getattr(result, "node", result)
+            embedding = result.embedding if hasattr(result, "node") else node.get_embedding()
+            ids.append(node.node_id)
+            embeddings.append(embedding)
+            texts.append(node.get_content(metadata_mode=MetadataMode.NONE))
+            metadatas.append(node_to_metadata_dict(node, remove_text=True, flat_metadata=False))
+        self._index.add(ids, embeddings, texts, metadatas)
+        return ids
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        self._index.delete_where({"ref_doc_id": ref_doc_id})
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        filters = {metadata_filter.key: metadata_filter.value for metadata_filter in query.filters.filters} \
+            if query.filters is not None else None
+        matches = self._index.search(query.query_embedding, query.similarity_top_k, filters)
+        nodes = []
+        for match in matches:
+            node = metadata_dict_to_node(match["metadata"])
+            node.set_content(match["text"])
+            nodes.append(node)
+        return VectorStoreQueryResult(nodes=nodes, similarities=[match["score"] for match in matches],
+                                      ids=[match["id"] for match in matches])
@@ -0,0 +1,36 @@
+from typing import List
+
+from llama_index.embeddings.base import BaseEmbedding
+
+
+class LlamaEmbedding(BaseEmbedding):
+    """
+    Llama index embedding model backed by a SuperAGI embedding model, so that resources are embedded through the
+    same batching and embedding cache as the vector stores.
+    """
+
+    def __init__(self, embedding_model, **kwargs):
+        super().__init__(**kwargs)
+        self._embedding_model = embedding_model
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._get_text_embedding(query)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._get_text_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return self._get_text_embedding(text)
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        embeddings = self._embedding_model.get_embeddings(texts)
+        for embedding in embeddings:
+            if isinstance(embedding, dict) and "error" in embedding:
+                raise embedding["error"]
+        return embeddings
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._get_text_embeddings(texts)
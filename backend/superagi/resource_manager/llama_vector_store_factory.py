@@ -56,4 +56,8 @@ class LlamaVectorStoreFactory:
             qdrant_client = QdrantClient(host=qdrant_host_name, port=qdrant_port)
             return QdrantVectorStore(client=qdrant_client, collection_name=self.index_name)
 
+        if self.vector_store_name == VectorStoreType.EMBEDDED:
+            from superagi.resource_manager.llama_embedded_vector_store import LlamaEmbeddedVectorStore
+            return LlamaEmbeddedVectorStore(self.index_name)
+
         raise ValueError(str(self.vector_store_name) + " vector store is not supported yet.")
@@ -6,9 +6,12 @@ from sqlalchemy.orm import Session
 from superagi.config.config import get_config
 from superagi.helper.resource_helper import ResourceHelper
 from superagi.lib.logger import logger
+from superagi.resource_manager.llama_embedding import LlamaEmbedding
 from superagi.resource_manager.llama_vector_store_factory import LlamaVectorStoreFactory
 from superagi.types.model_source_types import ModelSourceType
 from superagi.types.vector_store_types import VectorStoreType
+from superagi.vector_store.embedding.cached import CachedEmbedding
+from superagi.vector_store.embedding.openai import OpenAiEmbedding
 from superagi.models.agent import Agent
 
 
@@ -78,13 +81,15 @@ class ResourceManager:
         :param resource_id: The resource id to use when saving the documents to the vector store.
         :param mode_api_key: The mode api key to use when creating embedding to the vector store.
         """
-        from llama_index import VectorStoreIndex, StorageContext
+        from llama_index import VectorStoreIndex, StorageContext, ServiceContext
         if ModelSourceType.GooglePalm.value in model_source or ModelSourceType.Replicate.value in model_source:
             logger.info("Resource embedding not supported for Google Palm..")
             return
         import openai
         openai.api_key = get_config("OPENAI_API_KEY") or mode_api_key
         os.environ["OPENAI_API_KEY"] = get_config("OPENAI_API_KEY", "") or mode_api_key
+        embedding_model = CachedEmbedding(OpenAiEmbedding(api_key=get_config("OPENAI_API_KEY") or mode_api_key))
+        service_context = ServiceContext.from_defaults(embed_model=LlamaEmbedding(embedding_model))
         for docs in documents:
             if docs.metadata is None:
                 docs.metadata = {}
@@ -100,7 +105,8 @@ class ResourceManager:
         except ValueError as e:
             logger.error(f"Vector store not found{e}")
         try:
-            index = VectorStoreIndex.from_documents(documents, storage_context=storage_context)
+            index = VectorStoreIndex.from_documents(documents, storage_context=storage_context,
+                                                    service_context=service_context)
             index.set_index_id(f'Agent {self.agent_id}')
         except Exception as e:
             logger.error("save_document_to_vector_store - unable to create documents from vector", e)
@@ -1,3 +1,4 @@
+import os
 from abc import abstractmethod
 from functools import wraps
 from inspect import signature
@@ -13,6 +14,24 @@ from superagi.types.key_type import ToolConfigKeyType
 from superagi.config.config import get_config
 
 
+# Argument properties of the tools, by args schema or by (tool class, tool name) for schemas built from execute
+_args_properties_cache = {}
+
+
+def get_args_properties(tool) -> dict:
+    """Get the argument properties of a tool, building its schema once per args schema or tool class."""
+    key = tool.args_schema if tool.args_schema is not None else (type(tool), tool.name)
+    properties = _args_properties_cache.get(key)
+    if properties is None:
+        if tool.args_schema is not None:
+            properties = tool.args_schema.schema()["properties"]
+        else:
+            args_schema = create_function_schema(f"{tool.name}Schema", tool.execute)
+            properties = args_schema.schema()["properties"]
+        _args_properties_cache[key] = properties
+    return properties
+
+
 class SchemaSettings:
     """Configuration for the pydantic model."""
     extra = Extra.forbid
@@ -59,6 +78,22 @@ def create_function_schema(
     )
 
 
+# Parsed config files by path, with the modification time they were parsed at
+_config_files = {}
+
+
+def _load_config_file(path: str) -> dict:
+    """Parse a YAML config file, the parsed file is reused until the file is modified."""
+    mtime = os.stat(path).st_mtime
+    cached = _config_files.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with open(path) as file:
+        config = yaml.safe_load(file) or {}
+    _config_files[path] = (mtime, config)
+    return config
+
+
 class BaseToolkitConfiguration:
 
     def __init__(self):
@@ -66,8 +101,7 @@ class BaseToolkitConfiguration:
 
     def get_tool_config(self, key: str):
         # Default implementation of the tool configuration retrieval logic
-        with open("config.yaml") as file:
-            config = yaml.safe_load(file)
+        config = _load_config_file("config.yaml")
 
         # Retrieve the value associated with the given key
         return config.get(key)
@@ -85,12 +119,7 @@ class BaseTool(BaseModel):
 
     @property
     def args(self):
-        if self.args_schema is not None:
-            return self.args_schema.schema()["properties"]
-        else:
-            name = self.name
-            args_schema = create_function_schema(f"{name}Schema", self.execute)
-            return args_schema.schema()["properties"]
+        return get_args_properties(self)
 
     @abstractmethod
     def _execute(self, *args: Any, **kwargs: Any):
@@ -161,12 +190,7 @@ class FunctionalTool(BaseTool):
 
     @property
     def args(self):
-        if self.args_schema is not None:
-            return self.args_schema.schema()["properties"]
-        else:
-            name = self.name
-            args_schema = create_function_schema(f"{name}Schema", self.execute)
-            return args_schema.schema()["properties"]
+        return get_args_properties(self)
 
     def _execute(self, *args: Any, **kwargs: Any):
         return self.func(*args, kwargs)
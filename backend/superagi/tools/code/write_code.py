@@ -3,6 +3,7 @@ from typing import Type, Optional, List
 
 from pydantic import BaseModel, Field
 
+from superagi.agent.agent_execution_context import AgentExecutionContext
 from superagi.agent.agent_prompt_builder import AgentPromptBuilder
 from superagi.helper.error_handler import ErrorHandler
 from superagi.helper.prompt_reader import PromptReader
@@ -14,7 +15,6 @@ from superagi.models.agent_execution_feed import AgentExecutionFeed
 from superagi.resource_manager.file_manager import FileManager
 from superagi.tools.base_tool import BaseTool
 from superagi.tools.tool_response_query_manager import ToolResponseQueryManager
-from superagi.models.agent import Agent
 
 class CodingSchema(BaseModel):
     code_description: str = Field(
@@ -38,6 +38,7 @@ class CodingTool(BaseTool):
     llm: Optional[BaseLlm] = None
     agent_id: int = None
     agent_execution_id: int = None
+    agent_execution_context: Optional[AgentExecutionContext] = None
     name = "CodingTool"
     description = (
         "You will get instructions for code to write. You will write a very long answer. "
@@ -74,9 +75,9 @@ class CodingTool(BaseTool):
         logger.info(prompt)
         messages = [{"role": "system", "content": prompt}]
 
-        organisation = Agent.find_org_by_agent_id(session=self.toolkit_config.session, agent_id=self.agent_id)
         total_tokens = TokenCounter.count_message_tokens(messages, self.llm.get_model())
-        token_limit = TokenCounter(session=self.toolkit_config.session, organisation_id=organisation.id).token_limit(self.llm.get_model())
+        token_limit = AgentExecutionContext.model_token_limit(
+            self.agent_execution_context, self.toolkit_config.session, self.agent_id, self.llm.get_model())
 
         result = self.llm.chat_completion(messages, max_tokens=(token_limit - total_tokens - 100))
         
@@ -1,7 +1,6 @@
 import json
 import requests
 from typing import Type, Optional,Union
-import time
 from superagi.helper.error_handler import ErrorHandler
 from superagi.lib.logger import logger
 from pydantic import BaseModel, Field
@@ -113,17 +112,12 @@ class DuckDuckGoSearchTool(BaseTool):
         webpages=[]                                                                         #webpages array for storing the contents extracted from the links
         
         if links:
-            for i in range(0, MAX_LINKS_TO_SCRAPE):                                         #using first 3 (Value of MAX_LINKS_TO_SCRAPE) links
-                time.sleep(3)
-                content = WebpageExtractor().extract_with_bs4(links[i])                     #takes in the link and returns content extracted from Webpage extractor
-                max_length = len(' '.join(content.split(" ")[:500]))    
-                content = content[:max_length]                                              #formatting the content
-                attempts = 0
-                while content == "" and attempts < WEBPAGE_EXTRACTOR_MAX_ATTEMPTS:
-                    attempts += 1
-                    content = WebpageExtractor().extract_with_bs4(links[i])
-                    content = content[:max_length]
-                webpages.append(content)
+            #using first 3 (Value of MAX_LINKS_TO_SCRAPE) links, fetched concurrently by the webpage extractor
+            contents = WebpageExtractor().extract_all_with_bs4(links[:MAX_LINKS_TO_SCRAPE],
+                                                               max_attempts=WEBPAGE_EXTRACTOR_MAX_ATTEMPTS + 1)
+            for content in contents:
+                max_length = len(' '.join(content.split(" ")[:500]))
+                webpages.append(content[:max_length])                                       #formatting the content
 
         return webpages
 
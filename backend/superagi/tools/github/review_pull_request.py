@@ -2,6 +2,7 @@ import ast
 from typing import Type, Optional
 
 from pydantic import BaseModel, Field
+from superagi.agent.agent_execution_context import AgentExecutionContext
 from superagi.helper.error_handler import ErrorHandler
 
 from superagi.helper.github_helper import GithubHelper
@@ -9,7 +10,6 @@ from superagi.helper.json_cleaner import JsonCleaner
 from superagi.helper.prompt_reader import PromptReader
 from superagi.helper.token_counter import TokenCounter
 from superagi.llms.base_llm import BaseLlm
-from superagi.models.agent import Agent
 from superagi.models.agent_execution import AgentExecution
 from superagi.models.agent_execution_feed import AgentExecutionFeed
 from superagi.tools.base_tool import BaseTool
@@ -45,6 +45,7 @@ class GithubReviewPullRequest(BaseTool):
     description: str = "Add pull request for the github repository"
     agent_id: int = None
     agent_execution_id: int = None
+    agent_execution_context: Optional[AgentExecutionContext] = None
 
     def _execute(self, repository_name: str, repository_owner: str, pull_request_number: int) -> str:
         """
@@ -69,26 +70,22 @@ class GithubReviewPullRequest(BaseTool):
                                                                                   pull_request_number)
 
             pull_request_arr = pull_request_content.split("diff --git")
-            organisation = Agent.find_org_by_agent_id(session=self.toolkit_config.session, agent_id=self.agent_id)
-
-            model_token_limit = TokenCounter(session=self.toolkit_config.session,
-                                       organisation_id=organisation.id).token_limit(self.llm.get_model())
+            model_token_limit = AgentExecutionContext.model_token_limit(
+                self.agent_execution_context, self.toolkit_config.session, self.agent_id, self.llm.get_model())
             pull_request_arr_parts = self.split_pull_request_content_into_multiple_parts(model_token_limit, pull_request_arr)
             for content in pull_request_arr_parts:
-                self.run_code_review(github_helper, content, latest_commit_id, organisation, pull_request_number,
+                self.run_code_review(github_helper, content, latest_commit_id, model_token_limit, pull_request_number,
                                      repository_name, repository_owner)
             return "Added comments to the pull request:" + str(pull_request_number)
         except Exception as err:
             return f"Error: Unable to add comments to the pull request {err}"
 
-    def run_code_review(self, github_helper, content, latest_commit_id, organisation, pull_request_number,
+    def run_code_review(self, github_helper, content, latest_commit_id, token_limit, pull_request_number,
                         repository_name, repository_owner):
         prompt = PromptReader.read_tools_prompt(__file__, "code_review.txt")
         prompt = prompt.replace("{{DIFF_CONTENT}}", content)
         messages = [{"role": "system", "content": prompt}]
         total_tokens = TokenCounter.count_message_tokens(messages, self.llm.get_model())
-        token_limit = TokenCounter(session=self.toolkit_config.session,
-                                   organisation_id=organisation.id).token_limit(self.llm.get_model())
         result = self.llm.chat_completion(messages, max_tokens=(token_limit - total_tokens - 100))
         
         if 'error' in result and result['message'] is not None:
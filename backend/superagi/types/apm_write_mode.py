@@ -0,0 +1,15 @@
+from enum import Enum
+
+
+class ApmWriteMode(Enum):
+    SYNC = 'SYNC'
+    BUFFERED = 'BUFFERED'
+
+    @classmethod
+    def get_apm_write_mode(cls, mode):
+        if mode is None:
+            raise ValueError("APM write mode cannot be None.")
+        mode = mode.upper()
+        if mode in cls.__members__:
+            return cls[mode]
+        raise ValueError(f"{mode} is not a valid APM write mode.")
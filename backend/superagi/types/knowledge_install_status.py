@@ -0,0 +1,17 @@
+from enum import Enum
+
+
+class KnowledgeInstallStatus(Enum):
+    PENDING = 'PENDING'
+    RUNNING = 'RUNNING'
+    COMPLETE = 'COMPLETE'
+    FAILED = 'FAILED'
+
+    @classmethod
+    def get_knowledge_install_status(cls, status):
+        if status is None:
+            raise ValueError("Knowledge install status cannot be None.")
+        status = status.upper()
+        if status in cls.__members__:
+            return cls[status]
+        raise ValueError(f"{status} is not a valid knowledge install status.")
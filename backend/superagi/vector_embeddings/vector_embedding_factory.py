@@ -2,6 +2,7 @@
 import pinecone
 from typing import Optional
 from pinecone import UnauthorizedException
+from superagi.vector_embeddings.embedded import Embedded
 from superagi.vector_embeddings.pinecone import Pinecone
 from superagi.vector_embeddings.qdrant import Qdrant
 from superagi.vector_embeddings.weaviate import Weaviate
@@ -44,4 +45,7 @@ class VectorEmbeddingFactory:
             return Qdrant(uuid, embeds, metadata)
         
         if vector_store == VectorStoreType.WEAVIATE:
-            return Weaviate(uuid, embeds, metadata)
\ No newline at end of file
+            return Weaviate(uuid, embeds, metadata)
+
+        if vector_store == VectorStoreType.EMBEDDED:
+            return Embedded(uuid, embeds, metadata)
\ No newline at end of file
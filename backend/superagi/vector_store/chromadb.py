@@ -64,6 +64,7 @@ class ChromaDB(VectorStore):
         collection = self.client.get_collection(name=self.collection_name)
         collection.add(
             documents=texts,
+            embeddings=self.embedding_model.get_embeddings(texts),
             metadatas=metadatas,
             ids=ids
         )
@@ -0,0 +1,85 @@
+import uuid
+from typing import Any, Iterable, List, Optional
+
+from superagi.vector_store.base import VectorStore
+from superagi.vector_store.document import Document
+from superagi.vector_store.embedded_index import EmbeddedIndex
+
+
+class Embedded(VectorStore):
+    """
+    Embedded vector store, kept on the local disk by an EmbeddedIndex instead of an external service.
+
+    Attributes:
+        index : The embedded index.
+        embedding_model : The embedding model.
+        text_field : The metadata field the text of a marketplace embedding is read from.
+    """
+
+    def __init__(self, index: EmbeddedIndex, embedding_model: Optional[Any] = None, text_field: str = 'text'):
+        self.index = index
+        self.embedding_model = embedding_model
+        self.text_field = text_field
+
+    def add_texts(
+            self,
+            texts: Iterable[str],
+            metadatas: Optional[List[dict]] = None,
+            ids: Optional[List[str]] = None,
+            **kwargs: Any,
+    ) -> List[str]:
+        """
+        Add texts to the vector store.
+
+        Args:
+            texts : The texts to add.
+            metadatas : The metadatas to add.
+            ids : The ids to add.
+
+        Returns:
+            The list of ids of the added texts.
+        """
+        texts = list(texts)
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        if len(ids) < len(texts):
+            raise ValueError("Number of ids must match number of texts.")
+        metadatas = metadatas or [{} for _ in texts]
+        embeddings = self.embedding_model.get_embeddings(texts)
+        self.index.add(ids[:len(texts)], embeddings, texts, metadatas)
+        return ids
+
+    def get_matching_text(self, query: str, top_k: int = 5, metadata: Optional[dict] = None, **kwargs: Any) -> dict:
+        """
+        Return docs most similar to query using specified search type.
+
+        Args:
+            query : The query to search.
+            top_k : The top k to search.
+            metadata : Only match the texts with these metadata values.
+
+        Returns:
+            The list of documents most similar to the query
+        """
+        matches = self.index.search(self.embedding_model.get_embedding(query), top_k, metadata)
+        documents = [Document(text_content=match["text"], metadata=match["metadata"]) for match in matches]
+        search_res = f"Query: {query}\n"
+        for i, match in enumerate(matches):
+            search_res += f"Chunk{i}: \n{match['text']}\n"
+        return {"documents": documents, "search_res": search_res}
+
+    def get_index_stats(self) -> dict:
+        """
+        Returns:
+            Stats or Information about an index
+        """
+        return self.index.get_stats()
+
+    def add_embeddings_to_vector_db(self, embeddings: dict) -> None:
+        """Adds the ids, vectors and payloads of precomputed embeddings to the given vector store"""
+        payloads = embeddings.get("payload") or [{} for _ in embeddings["ids"]]
+        texts = [payload.get(self.text_field, "") for payload in payloads]
+        self.index.add(embeddings["ids"], embeddings["vectors"], texts, payloads)
+
+    def delete_embeddings_from_vector_db(self, ids: List[str]) -> None:
+        """Deletes embeddings from the given vector store"""
+        self.index.delete(ids)
@@ -0,0 +1,409 @@
+import fcntl
+import json
+import os
+import re
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import List, Optional
+
+import numpy as np
+
+from superagi.config.config import get_config, get_config_int
+from superagi.lib.logger import logger
+
+COSINE = "cosine"
+DOT = "dot"
+MANIFEST_FILE = "manifest.json"
+LOCK_FILE = ".lock"
+_ASSIGN_CHUNK_SIZE = 65536
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+def _column_value(value):
+    """Key of a metadata value in a column, unhashable values are keyed by their JSON."""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, sort_keys=True)
+    return value
+
+
+class IVFPartition:
+    """
+    Inverted file partition of the rows of a segment: a coarse k-means clustering of the vectors, with the rows
+    sorted by cluster so the rows of a cluster are a slice of order.
+    """
+
+    def __init__(self, centroids: np.ndarray, order: np.ndarray, offsets: np.ndarray):
+        self.centroids = centroids
+        self.order = order
+        self.offsets = offsets
+
+    @classmethod
+    def train(cls, vectors: np.ndarray, nlist: int, iterations: int = 10, sample_per_list: int = 64):
+        """
+        Cluster the vectors with spherical k-means trained on a sample, then assign every row to a cluster.
+
+        Args:
+            vectors (np.ndarray): The vectors of the segment.
+            nlist (int): The number of clusters.
+            iterations (int): The number of k-means iterations.
+            sample_per_list (int): The number of sampled vectors per cluster used for training.
+
+        Returns:
+            IVFPartition: The partition.
+        """
+        rng = np.random.default_rng(0)
+        sample_size = min(len(vectors), nlist * sample_per_list)
+        sample = _normalize(np.asarray(vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))],
+                                       dtype=np.float32))
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            empty = np.bincount(assignments, minlength=nlist) == 0
+            sums[empty] = centroids[empty]
+            centroids = _normalize(sums)
+
+        assignments = np.concatenate([np.argmax(vectors[start:start + _ASSIGN_CHUNK_SIZE] @ centroids.T, axis=1)
+                                      for start in range(0, len(vectors), _ASSIGN_CHUNK_SIZE)])
+        order = np.argsort(assignments, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=nlist))])
+        return cls(centroids.astype(np.float32), order, offsets)
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        """Get the rows of the nprobe clusters closest to the query."""
+        nprobe = max(1, min(nprobe, len(self.centroids)))
+        lists = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        return np.concatenate([self.order[self.offsets[i]:self.offsets[i + 1]] for i in lists])
+
+    def save(self, path: str):
+        with open(path, "wb") as f:
+            np.savez(f, centroids=self.centroids, order=self.order, offsets=self.offsets)
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path) as data:
+            return cls(data["centroids"], data["order"], data["offsets"])
+
+
+class Segment:
+    """
+    An immutable segment of an embedded index. Its vectors are memory-mapped from a float32 .npy file and its ids,
+    texts and metadata are stored as columns next to it. The rows of a metadata field are indexed by value on the
+    first filter on that field.
+    """
+
+    def __init__(self, directory: str, name: str):
+        self.name = name
+        self.vectors = np.load(os.path.join(directory, f"{name}.vectors.npy"), mmap_mode="r")
+        with open(os.path.join(directory, f"{name}.columns.json"), "r") as f:
+            columns = json.load(f)
+        self.ids = columns["ids"]
+        self.texts = columns["texts"]
+        self.metadatas = columns["metadatas"]
+        ivf_path = os.path.join(directory, f"{name}.ivf.npz")
+        self.ivf = IVFPartition.load(ivf_path) if os.path.exists(ivf_path) else None
+        self.rows = {row_id: row for row, row_id in enumerate(self.ids)}
+        # None while every row is live, otherwise a boolean mask of the live rows
+        self.live = None
+        self._postings = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def live_count(self) -> int:
+        return len(self) if self.live is None else int(self.live.sum())
+
+    def postings(self, field: str) -> dict:
+        """Get the rows of every value of a metadata field."""
+        postings = self._postings.get(field)
+        if postings is None:
+            rows_by_value = {}
+            for row, metadata in enumerate(self.metadatas):
+                if field in metadata:
+                    rows_by_value.setdefault(_column_value(metadata[field]), []).append(row)
+            postings = {value: np.asarray(rows, dtype=np.int64) for value, rows in rows_by_value.items()}
+            self._postings[field] = postings
+        return postings
+
+    def mask(self, metadata: Optional[dict]) -> Optional[np.ndarray]:
+        """Get the mask of the live rows matching every metadata value, None if every row matches."""
+        if not metadata:
+            return self.live
+        mask = np.ones(len(self), dtype=bool) if self.live is None else self.live.copy()
+        for field, value in metadata.items():
+            matching = np.zeros(len(self), dtype=bool)
+            matching[self.postings(field).get(_column_value(value), [])] = True
+            mask &= matching
+        return mask
+
+    def search(self, query: np.ndarray, top_k: int, mask: Optional[np.ndarray], nprobe: int):
+        """
+        Score the rows of the segment against a query.
+
+        Returns:
+            tuple: The scores and the rows of the top_k best rows, unsorted.
+        """
+        candidates = None
+        # Filters that keep fewer rows than the probed clusters hold are cheaper to score exactly
+        if self.ivf is not None and (mask is None or mask.sum() > len(self) * nprobe / len(self.ivf.centroids)):
+            candidates = self.ivf.candidates(query, nprobe)
+            if mask is not None:
+                candidates = candidates[mask[candidates]]
+        elif mask is not None:
+            candidates = np.flatnonzero(mask)
+        vectors = self.vectors if candidates is None else self.vectors[candidates]
+        if len(vectors) == 0:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+        scores = vectors @ query
+        top_k = min(top_k, len(scores))
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        return scores[top], (top if candidates is None else candidates[top])
+
+
+class EmbeddedIndex:
+    """
+    In-process vector index stored in a directory, shared by every process of the node.
+
+    Writes append an immutable segment and search scores every segment with one matrix product, or only the rows of
+    the EMBEDDED_VECTOR_STORE_IVF_NPROBE closest clusters for the segments of at least
+    EMBEDDED_VECTOR_STORE_IVF_MIN_ROWS rows. A later row replaces the earlier rows with the same ID and deletes
+    are recorded in the manifest, until the segments are compacted into one once there are more than
+    EMBEDDED_VECTOR_STORE_MAX_SEGMENTS of them. Writers hold a file lock, and readers reload the manifest when
+    another process has replaced it.
+    """
+
+    def __init__(self, directory: str, metric: str = COSINE):
+        if metric not in (COSINE, DOT):
+            raise ValueError(f"Unsupported metric {metric}, use {COSINE} or {DOT}")
+        self.directory = directory
+        self.metric = metric
+        self.dimension = None
+        self.segments = []
+        self._manifest_stat = None
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+        os.makedirs(directory, exist_ok=True)
+        self._refresh()
+
+    @classmethod
+    def open(cls, index_name: str):
+        """Open an index in the EMBEDDED_VECTOR_STORE_PATH directory, creating it on the first write."""
+        root = get_config("EMBEDDED_VECTOR_STORE_PATH", "workspace/vector_store")
+        directory = os.path.join(root, re.sub(r"[^A-Za-z0-9_.-]", "_", index_name))
+        return cls(directory, get_config("EMBEDDED_VECTOR_STORE_METRIC", COSINE))
+
+    def _path(self, file_name: str) -> str:
+        return os.path.join(self.directory, file_name)
+
+    @contextmanager
+    def _file_lock(self, operation: int):
+        with self._lock:
+            if self._lock_depth:
+                # flock locks belong to the open file, so a nested lock of this thread would wait for itself
+                yield
+                return
+            with open(self._path(LOCK_FILE), "a") as lock_file:
+                fcntl.flock(lock_file, operation)
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _manifest_file_stat(self):
+        try:
+            stat = os.stat(self._path(MANIFEST_FILE))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _read_manifest(self) -> dict:
+        try:
+            with open(self._path(MANIFEST_FILE), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"dimension": None, "metric": self.metric, "segments": []}
+
+    def _write_manifest(self, manifest: dict):
+        tmp_path = self._path(f"{MANIFEST_FILE}.{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self._path(MANIFEST_FILE))
+
+    def _refresh(self, force: bool = False):
+        if not force and self._manifest_file_stat() == self._manifest_stat:
+            return
+        with self._file_lock(fcntl.LOCK_SH):
+            stat = self._manifest_file_stat()
+            if force or stat != self._manifest_stat:
+                self._load(self._read_manifest())
+                self._manifest_stat = stat
+
+    def _load(self, manifest: dict):
+        if manifest["dimension"] is not None and manifest["metric"] != self.metric:
+            logger.info(f"Embedded index {self.directory} uses the {manifest['metric']} metric")
+            self.metric = manifest["metric"]
+        opened = {segment.name: segment for segment in self.segments}
+        segments = [opened.get(entry["name"]) or Segment(self.directory, entry["name"])
+                    for entry in manifest["segments"]]
+
+        # The last row of an ID is the live one, unless it has been deleted
+        seen = set()
+        for segment, entry in zip(reversed(segments), reversed(manifest["segments"])):
+            deleted = set(entry["deleted"])
+            live = np.ones(len(segment), dtype=bool)
+            for row in range(len(segment) - 1, -1, -1):
+                row_id = segment.ids[row]
+                if row_id in seen or row_id in deleted:
+                    live[row] = False
+                seen.add(row_id)
+            segment.live = None if live.all() else live
+
+        self.dimension = manifest["dimension"]
+        self.segments = segments
+
+    def _prepare(self, vectors) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        return _normalize(vectors) if self.metric == COSINE else vectors
+
+    def _write_segment(self, vectors: np.ndarray, ids: List[str], texts: List[str], metadatas: List[dict]) -> str:
+        name = uuid.uuid4().hex
+        tmp_suffix = ".tmp"
+        vectors_path = self._path(f"{name}.vectors.npy")
+        with open(vectors_path + tmp_suffix, "wb") as f:
+            np.save(f, np.ascontiguousarray(vectors, dtype=np.float32))
+        columns_path = self._path(f"{name}.columns.json")
+        with open(columns_path + tmp_suffix, "w") as f:
+            json.dump({"ids": ids, "texts": texts, "metadatas": metadatas}, f, default=str)
+        ivf_path = None
+        if len(ids) >= get_config_int("EMBEDDED_VECTOR_STORE_IVF_MIN_ROWS", 50000):
+            ivf_path = self._path(f"{name}.ivf.npz")
+            IVFPartition.train(vectors, nlist=max(1, int(np.sqrt(len(ids))))).save(ivf_path + tmp_suffix)
+        for path in [vectors_path, columns_path, ivf_path]:
+            if path is not None:
+                os.replace(path + tmp_suffix, path)
+        return name
+
+    def _remove_segment_files(self, name: str):
+        for suffix in ["vectors.npy", "columns.json", "ivf.npz"]:
+            try:
+                os.remove(self._path(f"{name}.{suffix}"))
+            except FileNotFoundError:
+                pass
+
+    def add(self, ids: List[str], vectors, texts: List[str], metadatas: List[dict]):
+        """
+        Add rows to the index as a new segment, replacing the rows with the same IDs.
+
+        Args:
+            ids (List[str]): The IDs of the rows.
+            vectors: The vectors of the rows.
+            texts (List[str]): The texts of the rows.
+            metadatas (List[dict]): The metadata of the rows.
+        """
+        if len(ids) == 0:
+            return
+        vectors = self._prepare(vectors)
+        if vectors.ndim != 2 or len(vectors) != len(ids):
+            raise ValueError("Expected one vector per ID")
+        with self._file_lock(fcntl.LOCK_EX):
+            manifest = self._read_manifest()
+            if manifest["dimension"] is None:
+                manifest["dimension"] = int(vectors.shape[1])
+                manifest["metric"] = self.metric
+            elif manifest["dimension"] != vectors.shape[1]:
+                raise ValueError(f"Expected vectors of dimension {manifest['dimension']}, got {vectors.shape[1]}")
+            name = self._write_segment(vectors, list(ids), list(texts), [metadata or {} for metadata in metadatas])
+            manifest["segments"].append({"name": name, "deleted": []})
+            self._write_manifest(manifest)
+            self._refresh(force=True)
+            if len(manifest["segments"]) > get_config_int("EMBEDDED_VECTOR_STORE_MAX_SEGMENTS", 16):
+                self._compact(manifest)
+
+    def delete(self, ids: List[str]):
+        """Delete the rows with the given IDs."""
+        ids = set(ids)
+        with self._file_lock(fcntl.LOCK_EX):
+            self._refresh(force=True)
+            manifest = self._read_manifest()
+            for segment, entry in zip(self.segments, manifest["segments"]):
+                entry["deleted"] = sorted(set(entry["deleted"]) | {row_id for row_id in ids if row_id in segment.rows})
+            self._write_manifest(manifest)
+            self._refresh(force=True)
+
+    def delete_where(self, metadata: dict):
+        """Delete the rows matching every metadata value."""
+        self._refresh()
+        self.delete([segment.ids[row] for segment in self.segments
+                     for row in np.flatnonzero(self._full_mask(segment, metadata))])
+
+    @staticmethod
+    def _full_mask(segment: Segment, metadata: Optional[dict]) -> np.ndarray:
+        mask = segment.mask(metadata)
+        return np.ones(len(segment), dtype=bool) if mask is None else mask
+
+    def compact(self):
+        """Merge the live rows of every segment into a single segment."""
+        with self._file_lock(fcntl.LOCK_EX):
+            self._refresh(force=True)
+            self._compact(self._read_manifest())
+
+    def _compact(self, manifest: dict):
+        segments = self.segments
+        rows = [np.flatnonzero(self._full_mask(segment, None)) for segment in segments]
+        ids, texts, metadatas = [], [], []
+        for segment, segment_rows in zip(segments, rows):
+            for row in segment_rows:
+                ids.append(segment.ids[row])
+                texts.append(segment.texts[row])
+                metadatas.append(segment.metadatas[row])
+        if ids:
+            vectors = np.concatenate([segment.vectors[segment_rows] for segment, segment_rows in zip(segments, rows)])
+            manifest["segments"] = [{"name": self._write_segment(vectors, ids, texts, metadatas), "deleted": []}]
+        else:
+            manifest["segments"] = []
+        self._write_manifest(manifest)
+        self._refresh(force=True)
+        # Processes holding the old segments keep their memory maps until they reload the manifest
+        for segment in segments:
+            self._remove_segment_files(segment.name)
+        logger.info(f"Compacted {len(segments)} segments of embedded index {self.directory} into {len(ids)} rows")
+
+    def search(self, vector, top_k: int, metadata: Optional[dict] = None) -> List[dict]:
+        """
+        Get the rows most similar to a vector.
+
+        Args:
+            vector: The query vector.
+            top_k (int): The number of rows to return.
+            metadata (dict): Only return the rows matching every metadata value.
+
+        Returns:
+            List[dict]: The id, text, metadata and score of the rows, best first.
+        """
+        self._refresh()
+        segments = self.segments
+        if not segments or top_k <= 0:
+            return []
+        query = self._prepare(vector)
+        nprobe = get_config_int("EMBEDDED_VECTOR_STORE_IVF_NPROBE", 8)
+        matches = []
+        for segment in segments:
+            scores, rows = segment.search(query, top_k, segment.mask(metadata), nprobe)
+            matches.extend(zip(scores.tolist(), [segment] * len(rows), rows.tolist()))
+        matches.sort(key=lambda match: match[0], reverse=True)
+        return [{"id": segment.ids[row], "text": segment.texts[row], "metadata": segment.metadatas[row],
+                 "score": score} for score, segment, row in matches[:top_k]]
+
+    def get_stats(self) -> dict:
+        self._refresh()
+        return {"dimensions": self.dimension, "vector_count": sum(segment.live_count() for segment in self.segments),
+                "segments": len(self.segments)}
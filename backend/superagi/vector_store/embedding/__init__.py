@@ -1,4 +1,5 @@
+from superagi.vector_store.embedding.cached import CachedEmbedding
 from superagi.vector_store.embedding.openai import OpenAiEmbedding
 from superagi.vector_store.embedding.palm import PalmEmbedding
 
-__all__ = ['OpenAiEmbedding', 'PalmEmbedding']
\ No newline at end of file
+__all__ = ['CachedEmbedding', 'OpenAiEmbedding', 'PalmEmbedding']
\ No newline at end of file
@@ -1,8 +1,42 @@
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from superagi.config.config import get_config
 
 
 class BaseEmbedding(ABC):
+    # Number of texts the provider embeds in a single request
+    max_batch_size = 1
 
     @abstractmethod
     def get_embedding(self, text):
         pass
+
+    def get_embeddings(self, texts: List[str]) -> list:
+        """
+        Get the embeddings of multiple texts.
+
+        Texts are split into batches of up to EMBEDDING_BATCH_SIZE texts, bounded by what the provider accepts in a
+        single request, and up to EMBEDDING_CONCURRENCY batches are embedded at the same time.
+
+        Args:
+            texts (List[str]): The texts to embed.
+
+        Returns:
+            list: The embeddings in the order of the texts.
+        """
+        texts = list(texts)
+        batch_size = max(1, min(int(get_config("EMBEDDING_BATCH_SIZE", 100)), self.max_batch_size))
+        concurrency = int(get_config("EMBEDDING_CONCURRENCY", 4))
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        if len(batches) <= 1 or concurrency <= 1:
+            batch_embeddings = [self.get_embedding_batch(batch) for batch in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=min(concurrency, len(batches))) as executor:
+                batch_embeddings = list(executor.map(self.get_embedding_batch, batches))
+        return [embedding for embeddings in batch_embeddings for embedding in embeddings]
+
+    def get_embedding_batch(self, texts: List[str]) -> list:
+        """Embed a single batch of texts, providers with a batch endpoint override this."""
+        return [self.get_embedding(text) for text in texts]
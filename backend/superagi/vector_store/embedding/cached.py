@@ -0,0 +1,133 @@
+import hashlib
+import threading
+from typing import List
+
+import numpy as np
+
+from superagi.config.config import get_config
+from superagi.helper.redis_helper import get_redis_client
+from superagi.helper.ttl_cache import TTLCache
+from superagi.lib.logger import logger
+from superagi.vector_store.embedding.base import BaseEmbedding
+
+EMBEDDING_CACHE_KEY_PREFIX = "embedding_cache"
+
+
+class EmbeddingCacheMetrics:
+    """Hit and miss counters of the embedding cache."""
+
+    def __init__(self):
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def record(self, local_hits: int = 0, redis_hits: int = 0, misses: int = 0):
+        with self._lock:
+            self.local_hits += local_hits
+            self.redis_hits += redis_hits
+            self.misses += misses
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lookups = self.local_hits + self.redis_hits + self.misses
+            return {
+                "local_hits": self.local_hits,
+                "redis_hits": self.redis_hits,
+                "misses": self.misses,
+                "hit_rate": (self.local_hits + self.redis_hits) / lookups if lookups else 0.0,
+            }
+
+
+embedding_cache_metrics = EmbeddingCacheMetrics()
+
+# Embeddings are content addressed, so the local tier is shared by every embedding model of the process
+_local_cache = TTLCache(maxsize=int(get_config("EMBEDDING_CACHE_SIZE", 2048)), ttl=None)
+
+
+class CachedEmbedding(BaseEmbedding):
+    """
+    Embedding model that caches the embeddings of another embedding model by model and text hash.
+
+    Embeddings are looked up in an in-process LRU first and then in Redis, where they are stored as float32 bytes
+    for EMBEDDING_CACHE_REDIS_TTL seconds. Setting EMBEDDING_CACHE_REDIS_TTL to 0 disables the Redis tier.
+    Only the texts missing from both tiers are sent to the wrapped model, in a single batch.
+    """
+
+    def __init__(self, embedding_model: BaseEmbedding):
+        self.embedding_model = embedding_model
+        self.model = getattr(embedding_model, "model", None)
+        self.redis_ttl = int(get_config("EMBEDDING_CACHE_REDIS_TTL", 7 * 24 * 60 * 60))
+
+    def __getattr__(self, name):
+        # Expose the attributes of the wrapped model, like api_key or get_embedding_async
+        if name == "embedding_model":
+            raise AttributeError(name)
+        return getattr(self.embedding_model, name)
+
+    def get_embedding(self, text):
+        return self.get_embeddings([text])[0]
+
+    def get_embedding_batch(self, texts: List[str]) -> list:
+        return self.get_embeddings(texts)
+
+    def get_embeddings(self, texts: List[str]) -> list:
+        texts = list(texts)
+        keys = [self._cache_key(text) for text in texts]
+        embeddings = [_local_cache.get(key) for key in keys]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        local_hits = len(texts) - len(missing)
+
+        redis_hits = 0
+        if missing and self.redis_ttl > 0:
+            for i, embedding in zip(missing, self._redis_get([keys[i] for i in missing])):
+                if embedding is not None:
+                    embeddings[i] = embedding
+                    _local_cache.set(keys[i], embedding)
+                    redis_hits += 1
+            missing = [i for i in missing if embeddings[i] is None]
+
+        # Texts repeated within the call are embedded once
+        missing_texts = {keys[i]: texts[i] for i in missing}
+        misses = len(missing_texts)
+        if missing_texts:
+            computed = self.embedding_model.get_embeddings(list(missing_texts.values()))
+            computed_by_key = {}
+            for key, embedding in zip(missing_texts.keys(), computed):
+                if isinstance(embedding, dict):
+                    # Errors are returned as they are and not cached
+                    computed_by_key[key] = embedding
+                    continue
+                computed_by_key[key] = np.asarray(embedding, dtype=np.float32)
+                _local_cache.set(key, computed_by_key[key])
+            for i in missing:
+                embeddings[i] = computed_by_key[keys[i]]
+            if self.redis_ttl > 0:
+                self._redis_set({key: embedding for key, embedding in computed_by_key.items()
+                                 if isinstance(embedding, np.ndarray)})
+
+        embedding_cache_metrics.record(local_hits=local_hits, redis_hits=redis_hits, misses=misses)
+        return [embedding.tolist() if isinstance(embedding, np.ndarray) else embedding for embedding in embeddings]
+
+    def _cache_key(self, text: str) -> str:
+        text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{EMBEDDING_CACHE_KEY_PREFIX}:{type(self.embedding_model).__name__}:{self.model}:{text_hash}"
+
+    def _redis_get(self, keys: List[str]) -> list:
+        try:
+            values = get_redis_client(decode_responses=False).mget(keys)
+        except Exception as e:
+            logger.error(f"Unable to read cached embeddings: {e}")
+            return [None] * len(keys)
+        return [np.frombuffer(value, dtype=np.float32) if value is not None else None for value in values]
+
+    def _redis_set(self, embeddings: dict):
+        if not embeddings:
+            return
+        try:
+            pipeline = get_redis_client(decode_responses=False).pipeline(transaction=False)
+            for key, embedding in embeddings.items():
+                pipeline.set(key, embedding.tobytes(), ex=self.redis_ttl)
+            pipeline.execute()
+        except Exception as e:
+            logger.error(f"Unable to cache embeddings: {e}")
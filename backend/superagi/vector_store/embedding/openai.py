@@ -1,7 +1,13 @@
+from typing import List
+
 import openai
 
+from superagi.vector_store.embedding.base import BaseEmbedding
+
+
+class OpenAiEmbedding(BaseEmbedding):
+    max_batch_size = 2048
 
-class OpenAiEmbedding:
     def __init__(self, api_key, model="text-embedding-ada-002"):
         self.model = model
         self.api_key = api_key
@@ -29,3 +35,14 @@ class OpenAiEmbedding:
             return response['data'][0]['embedding']
         except Exception as exception:
             return {"error": exception}
+
+    def get_embedding_batch(self, texts: List[str]) -> list:
+        try:
+            response = openai.Embedding.create(
+                api_key=self.api_key,
+                input=texts,
+                engine=self.model
+            )
+            return [data['embedding'] for data in sorted(response['data'], key=lambda data: data['index'])]
+        except Exception as exception:
+            return [{"error": exception} for _ in texts]
@@ -5,11 +5,13 @@ from typing import Any, List, Iterable, Mapping
 from typing import Optional, Pattern
 import traceback
 import numpy as np
-import redis
 from redis.commands.search.field import TagField, VectorField
 from redis.commands.search.indexDefinition import IndexDefinition, IndexType
+from redis.commands.search.query import Query
+from redis.commands.search.result import Result
 
-from superagi.config.config import get_config
+from superagi.config.config import get_config, get_config_int
+from superagi.helper.redis_helper import get_redis_client
 from superagi.lib.logger import logger
 from superagi.vector_store.base import VectorStore
 from superagi.vector_store.document import Document
@@ -19,6 +21,8 @@ DOC_PREFIX = "doc:"
 CONTENT_KEY = "content"
 METADATA_KEY = "metadata"
 VECTOR_SCORE_KEY = "vector_score"
+# Metadata keys indexed as TAG fields, searches filtered on them only scan the matching documents
+FILTER_FIELDS = ["agent_execution_id", "agent_id"]
 
 
 class Redis(VectorStore):
@@ -41,8 +45,7 @@ class Redis(VectorStore):
         embedding_model: An instance of a BaseEmbedding model.
         vector_group_id: vector group id used to index similar vectors.
         """
-        redis_url = get_config('REDIS_URL')
-        self.redis_client = redis.Redis.from_url("redis://" + redis_url + "/0", decode_responses=True)
+        self.redis_client = get_redis_client()
         # self.redis_client = redis.Redis(host=redis_host, port=redis_port)
         self.index = index
         self.embedding_model = embedding_model
@@ -63,93 +66,180 @@ class Redis(VectorStore):
         pipe = self.redis_client.pipeline()
         prefix = DOC_PREFIX + str(self.index)
         keys = []
-        for i, text in enumerate(texts):
+        texts = list(texts)
+        if embeddings is None:
+            embeddings = self.embedding_model.get_embeddings(texts)
+        for i, (text, embedding) in enumerate(zip(texts, embeddings)):
             id = ids[i] if ids else self.build_redis_key(prefix)
             metadata = metadatas[i] if metadatas else {}
-            embedding = self.embedding_model.get_embedding(text)
             embedding_arr = np.array(embedding, dtype=np.float32)
 
             pipe.hset(id, mapping={CONTENT_KEY: text, self.vector_key: embedding_arr.tobytes(),
-                                   METADATA_KEY: json.dumps(metadata)})
+                                   METADATA_KEY: json.dumps(metadata), **self._filter_values(metadata)})
 
             keys.append(id)
         pipe.execute()
         return keys
 
+    @staticmethod
+    def _filter_values(metadata: dict) -> dict:
+        return {key: str(metadata[key]) for key in FILTER_FIELDS if metadata.get(key) is not None}
+
+    @staticmethod
+    def _is_hnsw() -> bool:
+        return get_config("REDIS_VECTOR_INDEX_ALGORITHM", "HNSW").upper() == "HNSW"
+
+    def _build_query(self, top_k: int, metadata: Optional[dict] = None) -> Query:
+        hybrid_fields = self._convert_to_redis_filters(metadata)
+        ef_runtime = " EF_RUNTIME $ef_runtime" if self._is_hnsw() else ""
+        base_query = f"{hybrid_fields}=>[KNN {top_k} @{self.vector_key} $vector{ef_runtime} AS {VECTOR_SCORE_KEY}]"
+        return_fields = [METADATA_KEY, CONTENT_KEY, VECTOR_SCORE_KEY, 'id']
+        return (
+            Query(base_query)
+            .return_fields(*return_fields)
+            .sort_by(VECTOR_SCORE_KEY)
+            .paging(0, top_k)
+            .dialect(2)
+        )
+
+    def _query_params(self, embedding: List[float]) -> Mapping[str, Any]:
+        params_dict = {"vector": np.array(embedding).astype(dtype=np.float32).tobytes()}
+        if self._is_hnsw():
+            params_dict["ef_runtime"] = max(get_config_int("REDIS_HNSW_EF_RUNTIME", 10), 1)
+        return params_dict
+
+    @staticmethod
+    def _to_documents(results) -> dict:
+        return {"documents": [Document(text_content=result.content, metadata=json.loads(result.metadata))
+                              for result in results.docs]}
+
     def get_matching_text(self, query: str, top_k: int = 5, metadata: Optional[dict] = None, **kwargs: Any) -> List[Document]:
-        
-            embed_text = self.embedding_model.get_embedding(query)
-            from redis.commands.search.query import Query
-            hybrid_fields = self._convert_to_redis_filters(metadata)
-            
-            base_query = f"{hybrid_fields}=>[KNN {top_k} @{self.vector_key} $vector AS vector_score]"
-            return_fields = [METADATA_KEY,CONTENT_KEY, "vector_score",'id']          
-            query = (
-                Query(base_query)
-                .return_fields(*return_fields)
-                .sort_by("vector_score")
-                .paging(0, top_k)
-                .dialect(2)
-            )
-
-            params_dict: Mapping[str, str] = {
-                "vector": np.array(embed_text)
-                .astype(dtype=np.float32)
-                .tobytes()
-            }
-
-            # print(self.index)
-            results = self.redis_client.ft(self.index).search(query,params_dict)
-            
-                # Prepare document results
-            documents = []
-            for result in results.docs:
-                documents.append(
-                    Document(
-                        text_content=result.content,
-                        metadata=json.loads(result.metadata)
-                    )
-                )
-            return {"documents": documents}
-        
-        
+        embed_text = self.embedding_model.get_embedding(query)
+        results = self.redis_client.ft(self.index).search(self._build_query(top_k, metadata),
+                                                          self._query_params(embed_text))
+        return self._to_documents(results)
+
+    def get_matching_texts(self, queries: List[str], top_k: int = 5, metadata: Optional[dict] = None,
+                           **kwargs: Any) -> List[dict]:
+        """
+        Search several queries at once. The queries are embedded in one batch and searched in one pipeline.
+
+        Args:
+            queries (List[str]): The query texts.
+            top_k (int): The number of documents returned per query.
+            metadata (dict): The metadata filter applied to every query, see FILTER_FIELDS.
+
+        Returns:
+            List[dict]: The results of get_matching_text for each query, in the order of the queries.
+        """
+        if not queries:
+            return []
+        embeddings = self.embedding_model.get_embeddings(list(queries))
+        search_query = self._build_query(top_k, metadata)
+        pipeline = self.redis_client.ft(self.index).pipeline(transaction=False)
+        for embedding in embeddings:
+            pipeline.search(search_query, self._query_params(embedding))
+        return [self._to_documents(Result(response, True, duration=0, has_payload=False, with_scores=False))
+                for response in pipeline.execute()]
 
     def _convert_to_redis_filters(self, metadata: Optional[dict] = None) -> str:
-        if metadata is not None or len(metadata) == 0:
+        # Only the TAG fields of the index can be filtered on
+        filters = self._filter_values(metadata or {})
+        if not filters:
             return "*"
         filter_strings = []
-        for key in metadata.keys():
-            filter_string = "@%s:{%s}" % (key, self.escape_token(str(metadata[key])))
+        for key, value in filters.items():
+            filter_string = "@%s:{%s}" % (key, self.escape_token(value))
             filter_strings.append(filter_string)
 
-        joined_filter_strings = " & ".join(filter_strings)
+        joined_filter_strings = " ".join(filter_strings)
         return f"({joined_filter_strings})"
 
-    def create_index(self):
+    def _vector_field(self, dimension: int) -> VectorField:
+        attributes = {
+            "TYPE": "FLOAT32",  # FLOAT32 or FLOAT64
+            "DIM": dimension,  # Number of Vector Dimensions
+            "DISTANCE_METRIC": "COSINE",  # Vector Search Distance Metric
+        }
+        if self._is_hnsw():
+            attributes.update({
+                "M": get_config_int("REDIS_HNSW_M", 16),
+                "EF_CONSTRUCTION": get_config_int("REDIS_HNSW_EF_CONSTRUCTION", 200),
+                "EF_RUNTIME": get_config_int("REDIS_HNSW_EF_RUNTIME", 10),
+            })
+            return VectorField(self.vector_key, "HNSW", attributes)
+        return VectorField(self.vector_key, "FLAT", attributes)
+
+    def create_index(self, dimension: int = None):
+        """
+        Create the index unless it exists. An index created before the filter fields were indexed is dropped,
+        keeping its documents, and created again with the configured vector algorithm, see migrate_documents.
+
+        Args:
+            dimension (int): The dimension of the embeddings, learnt from a sample embedding if None.
+        """
         try:
             # check to see if index exists
-            temp = self.redis_client.ft(self.index).info()
-            logger.info(temp)
-            logger.info("Index already exists!")
-        except:
-            vector_dimensions = self.embedding_model.get_embedding("sample")
-            # schema
-            schema = (
-                TagField("tag"),  # Tag Field Name
-                VectorField(self.vector_key,  # Vector Field Name
-                            "FLAT", {  # Vector Index Type: FLAT or HNSW
-                                "TYPE": "FLOAT32",  # FLOAT32 or FLOAT64
-                                "DIM": len(vector_dimensions),  # Number of Vector Dimensions
-                                "DISTANCE_METRIC": "COSINE",  # Vector Search Distance Metric
-                            }
-                            )
-            )
-
-            # index Definition
-            definition = IndexDefinition(prefix=[DOC_PREFIX], index_type=IndexType.HASH)
-
-            # create Index
-            self.redis_client.ft(self.index).create_index(fields=schema, definition=definition)
+            info = self.redis_client.ft(self.index).info()
+        except Exception:
+            info = None
+        if info is not None:
+            if all(any(field in attribute for attribute in info.get("attributes", [])) for field in FILTER_FIELDS):
+                logger.info("Index already exists!")
+                return
+            logger.info(f"Index {self.index} has no filter fields, creating it again")
+            self.redis_client.ft(self.index).dropindex(delete_documents=False)
+            self.migrate_documents()
+
+        if dimension is None:
+            dimension = len(self.embedding_model.get_embedding("sample"))
+        # schema
+        schema = (
+            TagField("tag"),  # Tag Field Name
+            *[TagField(field) for field in FILTER_FIELDS],
+            self._vector_field(dimension),
+        )
+
+        # index Definition
+        definition = IndexDefinition(prefix=[DOC_PREFIX], index_type=IndexType.HASH)
+
+        # create Index
+        self.redis_client.ft(self.index).create_index(fields=schema, definition=definition)
+
+    def migrate_documents(self, batch_size: int = 1000) -> int:
+        """
+        Copy the filter fields of the documents written before they were indexed out of their metadata.
+
+        Args:
+            batch_size (int): The number of documents read per round trip.
+
+        Returns:
+            int: The number of documents updated.
+        """
+        updated = 0
+        keys = []
+        for key in self.redis_client.scan_iter(match=DOC_PREFIX + str(self.index) + ":*", count=batch_size):
+            keys.append(key)
+            if len(keys) >= batch_size:
+                updated += self._migrate_batch(keys)
+                keys = []
+        if keys:
+            updated += self._migrate_batch(keys)
+        return updated
+
+    def _migrate_batch(self, keys: List[str]) -> int:
+        pipe = self.redis_client.pipeline(transaction=False)
+        for key in keys:
+            pipe.hget(key, METADATA_KEY)
+        metadatas = pipe.execute()
+        updated = 0
+        for key, metadata in zip(keys, metadatas):
+            filters = self._filter_values(json.loads(metadata)) if metadata else {}
+            if filters:
+                pipe.hset(key, mapping=filters)
+                updated += 1
+        pipe.execute()
+        return updated
 
     def escape_token(self, value: str) -> str:
         """
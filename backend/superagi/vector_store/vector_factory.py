@@ -7,9 +7,12 @@ from superagi.config.config import get_config
 from superagi.lib.logger import logger
 from superagi.types.vector_store_types import VectorStoreType
 from superagi.vector_store import qdrant
+from superagi.vector_store.embedded import Embedded
+from superagi.vector_store.embedded_index import EmbeddedIndex
 from superagi.vector_store.redis import Redis
 from superagi.vector_store.embedding.openai import OpenAiEmbedding
 from superagi.vector_store.qdrant import Qdrant
+from superagi.vector_store.vector_store_registry import VectorStoreRegistry
 
 
 class VectorFactory:
@@ -17,7 +20,8 @@ class VectorFactory:
     @classmethod
     def get_vector_storage(cls, vector_store: VectorStoreType, index_name, embedding_model):
         """
-        Get the vector storage.
+        Get the vector storage. Clients, index checks and embedding dimensions are cached by VectorStoreRegistry,
+        and are set up again once if using the cached state fails.
 
         Args:
             vector_store : The vector store name.
@@ -29,58 +33,73 @@ class VectorFactory:
         """
         if isinstance(vector_store, str):
             vector_store = VectorStoreType.get_vector_store_type(vector_store)
+        try:
+            return cls._get_vector_storage(vector_store, index_name, embedding_model)
+        except ValueError:
+            raise
+        except Exception as e:
+            logger.error(f"Unable to use the cached {vector_store} vector store, connecting again: {e}")
+            VectorStoreRegistry.invalidate(vector_store)
+            return cls._get_vector_storage(vector_store, index_name, embedding_model)
+
+    @classmethod
+    def _get_vector_storage(cls, vector_store: VectorStoreType, index_name, embedding_model):
         if vector_store == VectorStoreType.PINECONE:
             try:
-                api_key = get_config("PINECONE_API_KEY")
-                env = get_config("PINECONE_ENVIRONMENT")
-                if api_key is None or env is None:
-                    raise ValueError("PineCone API key not found")
-                pinecone.init(api_key=api_key, environment=env)
-
-                if index_name not in pinecone.list_indexes():
-                    sample_embedding = embedding_model.get_embedding("sample")
-                    if "error" in sample_embedding:
-                        logger.error(f"Error in embedding model {sample_embedding}")
-
-                    # if does not exist, create index
-                    pinecone.create_index(
-                        index_name,
-                        dimension=len(sample_embedding),
-                        metric='dotproduct'
-                    )
-                index = pinecone.Index(index_name)
+                VectorStoreRegistry.get_client(vector_store, cls._init_pinecone)
+
+                def validate_index():
+                    if index_name not in pinecone.list_indexes():
+                        # if does not exist, create index
+                        pinecone.create_index(
+                            index_name,
+                            dimension=VectorStoreRegistry.get_dimension(embedding_model),
+                            metric='dotproduct'
+                        )
+
+                VectorStoreRegistry.ensure_index(vector_store, index_name, embedding_model, validate_index)
+                index = VectorStoreRegistry.get_client((vector_store, index_name),
+                                                       lambda: pinecone.Index(index_name))
                 return Pinecone(index, embedding_model, 'text')
             except UnauthorizedException:
                 raise ValueError("PineCone API key not found")
 
         if vector_store == VectorStoreType.WEAVIATE:
-            use_embedded = get_config("WEAVIATE_USE_EMBEDDED")
-            url = get_config("WEAVIATE_URL")
-            api_key = get_config("WEAVIATE_API_KEY")
-
-            client = weaviate.create_weaviate_client(
-                use_embedded=use_embedded,
-                url=url,
-                api_key=api_key
-            )
+            client = VectorStoreRegistry.get_client(vector_store, lambda: weaviate.create_weaviate_client(
+                use_embedded=get_config("WEAVIATE_USE_EMBEDDED"),
+                url=get_config("WEAVIATE_URL"),
+                api_key=get_config("WEAVIATE_API_KEY")
+            ))
             return weaviate.Weaviate(client, embedding_model, index_name, 'text')
 
         if vector_store == VectorStoreType.QDRANT:
-            client = qdrant.create_qdrant_client()
-            sample_embedding = embedding_model.get_embedding("sample")
-            if "error" in sample_embedding:
-                logger.error(f"Error in embedding model {sample_embedding}")
-
-            Qdrant.create_collection(client, index_name, len(sample_embedding))
+            client = VectorStoreRegistry.get_client(vector_store, qdrant.create_qdrant_client)
+            VectorStoreRegistry.ensure_index(
+                vector_store, index_name, embedding_model,
+                lambda: Qdrant.create_collection(client, index_name,
+                                                 VectorStoreRegistry.get_dimension(embedding_model)))
             return qdrant.Qdrant(client, embedding_model, index_name)
         
         if vector_store == VectorStoreType.REDIS:
             index_name = "super-agent-index1"
             redis = Redis(index_name, embedding_model)
-            redis.create_index()
+            VectorStoreRegistry.ensure_index(vector_store, index_name, embedding_model, redis.create_index)
             return redis
 
+        if vector_store == VectorStoreType.EMBEDDED:
+            index = VectorStoreRegistry.get_client((vector_store, index_name), lambda: EmbeddedIndex.open(index_name))
+            return Embedded(index, embedding_model)
+
         raise ValueError(f"Vector store {vector_store} not supported")
+
+    @staticmethod
+    def _init_pinecone():
+        api_key = get_config("PINECONE_API_KEY")
+        env = get_config("PINECONE_ENVIRONMENT")
+        if api_key is None or env is None:
+            raise ValueError("PineCone API key not found")
+        pinecone.init(api_key=api_key, environment=env)
+        return pinecone
     
     @classmethod
     def build_vector_storage(cls, vector_store: VectorStoreType, index_name, embedding_model = None, **creds):
@@ -108,3 +127,7 @@ class VectorFactory:
                 return weaviate.Weaviate(client, embedding_model, index_name)
             except:
                 raise ValueError("Weaviate API key not found")
+
+        if vector_store == VectorStoreType.EMBEDDED:
+            index = VectorStoreRegistry.get_client((vector_store, index_name), lambda: EmbeddedIndex.open(index_name))
+            return Embedded(index, embedding_model)
@@ -0,0 +1,108 @@
+import threading
+from typing import Any, Callable
+
+from superagi.config.config import get_config_int
+from superagi.helper.ttl_cache import TTLCache
+from superagi.lib.logger import logger
+
+_validated_indexes = TTLCache(maxsize=get_config_int("VECTOR_STORE_REGISTRY_SIZE", 256),
+                              ttl=get_config_int("VECTOR_STORE_VALIDATION_TTL", 600))
+
+
+class VectorStoreRegistry:
+    """
+    Process-wide registry of the vector store clients, the validated indexes and the embedding dimensions.
+
+    A client is connected once per vector store and an index is checked or created once per vector store, index
+    and embedding model, then trusted for VECTOR_STORE_VALIDATION_TTL seconds. The dimension of an embedding model
+    is learnt from one sample embedding per process. invalidate drops the cached state of a vector store after an
+    error, so it is connected and validated again on the next use.
+    """
+
+    _clients = {}
+    _dimensions = {}
+    _lock = threading.RLock()
+
+    @staticmethod
+    def embedding_key(embedding_model: Any) -> tuple:
+        """Identify an embedding model by its class and model name, whatever its API key."""
+        embedding_model = getattr(embedding_model, "embedding_model", embedding_model)
+        return type(embedding_model).__name__, getattr(embedding_model, "model", None)
+
+    @classmethod
+    def get_client(cls, vector_store, connect: Callable[[], Any]) -> Any:
+        """
+        Get the client of a vector store, connecting it on the first use.
+
+        Args:
+            vector_store: The vector store type, or a tuple starting with it for per index handles.
+            connect (Callable): Called without arguments to connect the client.
+
+        Returns:
+            The client.
+        """
+        client = cls._clients.get(vector_store)
+        if client is None:
+            with cls._lock:
+                client = cls._clients.get(vector_store)
+                if client is None:
+                    client = connect()
+                    cls._clients[vector_store] = client
+        return client
+
+    @classmethod
+    def get_dimension(cls, embedding_model: Any) -> int:
+        """
+        Get the dimension of the embeddings of an embedding model, embedding a sample text on the first use.
+
+        Args:
+            embedding_model: The embedding model.
+
+        Returns:
+            int: The dimension.
+        """
+        key = cls.embedding_key(embedding_model)
+        dimension = cls._dimensions.get(key)
+        if dimension is None:
+            sample_embedding = embedding_model.get_embedding("sample")
+            if "error" in sample_embedding:
+                logger.error(f"Error in embedding model {sample_embedding}")
+                return len(sample_embedding)
+            dimension = len(sample_embedding)
+            cls._dimensions[key] = dimension
+        return dimension
+
+    @classmethod
+    def ensure_index(cls, vector_store, index_name: str, embedding_model: Any, validate: Callable[[], None]):
+        """
+        Check or create an index unless it has been validated recently.
+
+        Args:
+            vector_store: The vector store type.
+            index_name (str): The index name.
+            embedding_model: The embedding model the index is used with.
+            validate (Callable): Called without arguments to check or create the index.
+        """
+        key = (vector_store, index_name, cls.embedding_key(embedding_model))
+        if _validated_indexes.get(key):
+            return
+        validate()
+        _validated_indexes.set(key, True)
+
+    @classmethod
+    def invalidate(cls, vector_store=None):
+        """
+        Drop the cached clients and validated indexes.
+
+        Args:
+            vector_store: Only drop the state of this vector store type. Everything is dropped if None.
+        """
+        with cls._lock:
+            if vector_store is None:
+                cls._clients.clear()
+                _validated_indexes.clear()
+                return
+            for key in [key for key in cls._clients
+                        if key == vector_store or (isinstance(key, tuple) and key[0] == vector_store)]:
+                del cls._clients[key]
+            _validated_indexes.invalidate(lambda key: key[0] == vector_store)
@@ -53,17 +53,16 @@ class Weaviate(VectorStore):
     def add_texts(
         self, texts: Iterable[str], metadatas: List[dict] | None = None, **kwargs: Any
     ) -> List[str]:
-        result = {}
-        collected_ids = []
+        texts = list(texts)
+        data_objects = []
         for i, text in enumerate(texts):
             metadata = metadatas[i] if metadatas else {}
             data_object = metadata.copy()
             data_object[self.text_field] = text
-            vector = self.embedding_model.get_embedding(text)
-            id = str(uuid4())
-            result = {"ids": id, "data_object": data_object, "vectors": vector}
-            collected_ids.append(id)
-            self.add_embeddings_to_vector_db(result)
+            data_objects.append(data_object)
+        collected_ids = [str(uuid4()) for _ in texts]
+        vectors = self.embedding_model.get_embeddings(texts)
+        self.add_embeddings_to_vector_db({"ids": collected_ids, "data_object": data_objects, "vectors": vectors})
         return collected_ids
 
     def get_matching_text(
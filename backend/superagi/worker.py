@@ -3,22 +3,26 @@ import sys
 
 from sqlalchemy.orm import sessionmaker
 
+from superagi.agent.types.agent_execution_mode import AgentExecutionMode
 from superagi.helper.tool_helper import handle_tools_import
 from superagi.lib.logger import logger
 
 from datetime import timedelta
 from celery import Celery
+from celery.signals import worker_process_init, worker_ready
 
-from superagi.config.config import get_config
+from superagi.config.config import get_config, get_config_int, watch_config
 from superagi.helper.agent_schedule_helper import AgentScheduleHelper
 from superagi.models.configuration import Configuration
 from superagi.models.agent import Agent
-from superagi.models.db import connect_db
+from superagi.models.db import connect_db, create_tables
 from superagi.types.model_source_types import ModelSourceType
 
 from sqlalchemy import event
 from superagi.models.agent_execution import AgentExecution
-from superagi.helper.webhook_manager import WebHookManager
+from superagi.helper.webhook_dispatcher import WebhookDispatcher
+# Registers the listeners that publish the feeds, permissions and status changes of the executions
+import superagi.helper.agent_execution_stream  # noqa: F401
 
 redis_url = get_config('REDIS_URL', 'super__redis:6379')
 
@@ -34,33 +38,108 @@ beat_schedule = {
         'task': 'initialize-schedule-agent',
         'schedule': timedelta(minutes=5),
     },
+    'run-scheduled-agents': {
+        'task': 'run-scheduled-agents',
+        'schedule': timedelta(seconds=int(get_config("SCHEDULE_POLL_INTERVAL", 5))),
+    },
     'execute_waiting_workflows': {
         'task': 'execute_waiting_workflows',
-        'schedule': timedelta(minutes=2),
+        'schedule': timedelta(seconds=int(get_config("WAIT_STEP_POLL_INTERVAL", 15))),
+    },
+    'reconcile_waiting_workflows': {
+        'task': 'reconcile_waiting_workflows',
+        'schedule': timedelta(minutes=10),
+    },
+    'flush_apm_buffer': {
+        'task': 'flush_apm_buffer',
+        'schedule': timedelta(seconds=int(get_config("APM_FLUSH_INTERVAL", 10))),
+    },
+    'dispatch_webhooks': {
+        'task': 'dispatch_webhooks',
+        'schedule': timedelta(seconds=int(get_config("WEBHOOK_DISPATCH_INTERVAL", 10))),
     },
 }
 app.conf.beat_schedule = beat_schedule
 
-@event.listens_for(AgentExecution.status, "set")
+# The previous status is loaded when the execution has been expired by a commit, so transitions carry it
+@event.listens_for(AgentExecution.status, "set", active_history=True)
 def agent_status_change(target, val,old_val,initiator):
     if not hasattr(sys, '_called_from_test'):
-        webhook_callback.delay(target.id,val,old_val)
+        try:
+            WebhookDispatcher.enqueue_status_change(target.id, val, old_val)
+        except Exception as e:
+            logger.error(f"Unable to queue webhook status change: {e}")
 
 @app.task(name="execute_waiting_workflows", autoretry_for=(Exception,), retry_backoff=2, max_retries=5)
 def execute_waiting_workflows():
-    """Check if wait time of wait workflow step is over and can be resumed."""
+    """Resume the executions whose wait step is over."""
 
     from superagi.jobs.agent_executor import AgentExecutor
-    logger.info("Executing waiting workflows job")
     AgentExecutor().execute_waiting_workflows()
 
+@app.task(name="reconcile_waiting_workflows", autoretry_for=(Exception,), retry_backoff=2, max_retries=5)
+def reconcile_waiting_workflows():
+    """Schedule the wake-ups of waiting executions that are missing from Redis."""
+    from superagi.agent.agent_wait_scheduler import AgentWaitScheduler
+    engine = connect_db()
+    Session = sessionmaker(bind=engine)
+    with Session() as session:
+        added = AgentWaitScheduler.reconcile(session)
+    if added:
+        logger.info(f"Scheduled {added} missing wait step wake-ups")
+
+@worker_process_init.connect
+def on_worker_process_init(**kwargs):
+    # Every pool process watches the config file, CONFIG_WATCH_INTERVAL seconds apart, when it is set
+    watch_interval = get_config_int("CONFIG_WATCH_INTERVAL", 0)
+    if watch_interval > 0:
+        watch_config(watch_interval)
+
+@worker_ready.connect
+def on_worker_ready(**kwargs):
+    from superagi.apm.analytics_rollup import AnalyticsRollup
+    from superagi.models.knowledge_installs import KnowledgeInstalls
+    try:
+        create_tables([KnowledgeInstalls])
+        if AnalyticsRollup.create_tables():
+            backfill_analytics_rollups.delay()
+    except Exception as e:
+        logger.error(f"Unable to create the analytics rollup and knowledge install tables: {e}")
+    reconcile_waiting_workflows.delay()
+
+@app.task(name="backfill_analytics_rollups", autoretry_for=(Exception,), retry_backoff=2, max_retries=5)
+def backfill_analytics_rollups():
+    """Fill the analytics rollups from the existing events once, after the rollup tables have been created."""
+    from superagi.apm.analytics_rollup import AnalyticsRollup
+    engine = connect_db()
+    Session = sessionmaker(bind=engine)
+    with Session() as session:
+        applied = AnalyticsRollup(session).backfill_if_pending()
+    if applied:
+        logger.info(f"Backfilled the analytics rollups from {applied} events")
+
+@app.task(name="flush_apm_buffer", autoretry_for=(Exception,), retry_backoff=2, max_retries=5)
+def flush_apm_buffer():
+    """Write the buffered APM events and call logs to the database."""
+    from superagi.apm.apm_writer import ApmWriter
+    engine = connect_db()
+    Session = sessionmaker(bind=engine)
+    with Session() as session:
+        written = ApmWriter.flush(session)
+    if written:
+        logger.info(f"Flushed {written} APM rows")
+
 @app.task(name="initialize-schedule-agent", autoretry_for=(Exception,), retry_backoff=2, max_retries=5)
 def initialize_schedule_agent_task():
-    """Executing agent scheduling in the background."""
+    """Move missed schedules to their next run and rebuild the schedule index."""
+
+    AgentScheduleHelper().update_next_scheduled_time()
 
-    schedule_helper = AgentScheduleHelper()
-    schedule_helper.update_next_scheduled_time()
-    schedule_helper.run_scheduled_agents()
+@app.task(name="run-scheduled-agents", autoretry_for=(Exception,), retry_backoff=2, max_retries=5)
+def run_scheduled_agents_task():
+    """Execute the scheduled agents that are due."""
+
+    AgentScheduleHelper().run_scheduled_agents()
 
 
 @app.task(name="execute_agent", autoretry_for=(Exception,), retry_backoff=2, max_retries=5)
@@ -69,7 +148,28 @@ def execute_agent(agent_execution_id: int, time):
     from superagi.jobs.agent_executor import AgentExecutor
     handle_tools_import()
     logger.info("Execute agent:" + str(time) + "," + str(agent_execution_id))
-    AgentExecutor().execute_next_step(agent_execution_id=agent_execution_id)
+    execution_mode = AgentExecutionMode.get_agent_execution_mode(get_config("AGENT_EXECUTION_MODE", "STEP"))
+    if execution_mode == AgentExecutionMode.PERSISTENT:
+        AgentExecutor().execute_run(agent_execution_id=agent_execution_id)
+    else:
+        AgentExecutor().execute_next_step(agent_execution_id=agent_execution_id)
+
+
+@app.task(name="summarize_agent_history", bind=True, autoretry_for=(Exception,), retry_backoff=2, max_retries=3)
+def summarize_agent_history(self, agent_execution_id: int, past_messages: list, output_token_limit: int,
+                            previous_ltm_summary: str = None):
+    """Summarize the history evicted from the prompt of an agent execution in background."""
+    from superagi.agent.agent_message_builder import AgentLlmMessageBuilder
+    from superagi.jobs.agent_executor import AgentExecutor
+    logger.info("Summarize agent history:" + str(agent_execution_id))
+    try:
+        AgentExecutor().summarize_history(agent_execution_id, past_messages, output_token_limit,
+                                          previous_ltm_summary)
+    except Exception:
+        # The messages are still pending in the history window, a later step schedules them again
+        if self.request.retries >= self.max_retries:
+            AgentLlmMessageBuilder.release_ltm_summary_lock(agent_execution_id)
+        raise
 
 
 @app.task(name="summarize_resource", autoretry_for=(Exception,), retry_backoff=2, max_retries=5,serializer='pickle')
@@ -103,10 +203,28 @@ def summarize_resource(agent_id: int, resource_id: int):
                                                                documents=documents)
     session.close()
 
+@app.task(name="install_knowledge", autoretry_for=(Exception,), retry_backoff=2, max_retries=5)
+def install_knowledge(knowledge_install_id: int):
+    """Install a marketplace knowledge in background, each retry resumes from the last checkpoint."""
+    from superagi.helper.knowledge_installer import KnowledgeInstaller
+
+    engine = connect_db()
+    Session = sessionmaker(bind=engine)
+    with Session() as session:
+        KnowledgeInstaller(session).install(knowledge_install_id)
+
 @app.task(name="webhook_callback", autoretry_for=(Exception,), retry_backoff=2, max_retries=5,serializer='pickle')
 def webhook_callback(agent_execution_id,val,old_val):
+    """Hand status changes queued as tasks by earlier releases over to the webhook dispatcher."""
+    WebhookDispatcher.enqueue_status_change(agent_execution_id, val, old_val)
+
+@app.task(name="dispatch_webhooks", autoretry_for=(Exception,), retry_backoff=2, max_retries=5)
+def dispatch_webhooks():
+    """Deliver the queued agent execution status webhooks and the retries that are due."""
     engine = connect_db()
     Session = sessionmaker(bind=engine)
     with Session() as session:
-        WebHookManager(session).agent_status_change_callback(agent_execution_id, val, old_val)
+        delivered = WebhookDispatcher(session).dispatch()
+    if delivered:
+        logger.info(f"Dispatched {delivered} webhook deliveries")
     